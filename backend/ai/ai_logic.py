@@ -1,58 +1,404 @@
-import os
 import json
-import requests
-from dotenv import load_dotenv
 from PyPDF2 import PdfReader
-from pdf2image import convert_from_path
-import pytesseract
-import tempfile
 import re
 import logging
 import time
+import xml.sax
+import zipfile
+from contextlib import ExitStack
+
+import httpx
+import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .cache import (
+    content_sha256,
+    get_cached_extraction,
+    get_cached_match,
+    get_cached_questions,
+    store_extraction,
+    store_match,
+    store_questions,
+    text_sha256,
+)
+from . import minhash, scoring, similarity, singleflight
+from .circuit import CircuitOpenError
+from .compaction import compact_cv_text, normalize_text
+from .documents import DocumentSource, UnsupportedDocumentError
+from .llm import achat_completion, chat_completion, stream_chat_completion
+from .ocr import OCR_FAILURES, iter_ocr_pages
+from .skills import tag_questions
+from .workers import submit
 
 # Setup logging instead of print statements
 logger = logging.getLogger(__name__)
 
-# Load API key
-load_dotenv()
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 
 # -- Extract Text --
+# Bump whenever extraction output changes so cached texts are re-extracted.
+EXTRACTOR_VERSION = "3"
+# Only this much CV text is ever read; extraction stops once it is reached.
+# Prompts get a compacted version that fits CV_PROMPT_TOKEN_BUDGET.
+MAX_CV_CHARS = 12000
+WORD_NAMESPACE = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+DOCX_CHUNK_SIZE = 64 * 1024
+
+
 def extract_text_from_pdf(file):
-    """Extract text from a PDF file (supports OCR for scanned resumes)."""
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
-        for chunk in file.chunks():
-            tmp_file.write(chunk)
-        temp_path = tmp_file.name
+    """Extract text from a PDF or DOCX CV (supports OCR for scanned resumes)."""
+    return extract_cv_text(file)["text"]
+
+
+def extract_cv_text(file):
+    """Extract CV text, reusing the cached result for previously seen files.
+
+    The format is detected from the file's magic bytes, not its extension.
+    Returns a dict with ``text``, ``method`` ("text", "ocr", "hybrid" or
+    "docx"),
+    ``timings`` (seconds per method), ``pages`` (method, characters and
+    seconds for each page read), ``failed_pages`` (pages whose OCR timed
+    out or failed, left with their text layer) and ``cached``. Reports with
+    failed pages are not cached, so the next attempt OCRs them again.
+    """
+    with DocumentSource(file) as source:
+        content_hash = content_sha256(source.data)
+        cached = get_cached_extraction(content_hash, EXTRACTOR_VERSION)
+        if cached is not None:
+            logger.info(f"Extraction cache hit for {content_hash[:12]}")
+            return cached
+
+        kind = source.sniff_format()
+        if kind == "pdf":
+            report = _extract_pdf(source)
+        elif kind == "docx":
+            report = _extract_docx(source)
+        else:
+            raise UnsupportedDocumentError("Unsupported file type. Only PDF and DOCX files are allowed.")
+    if report["failed_pages"]:
+        logger.warning(f"OCR incomplete for {content_hash[:12]} (pages {report['failed_pages']}); not caching")
+    else:
+        store_extraction(content_hash, EXTRACTOR_VERSION, report)
+    return report
+
+
+def iter_pdf_pages(source):
+    """Yield ``(page_number, method, text, seconds)`` for each PDF page, lazily.
 
-    text = ""
+    Pages whose text layer has at least ``OCR_MIN_PAGE_CHARS`` characters
+    use it as is; sparser pages (scans, certificates pasted as images) are
+    OCR'd individually. Mixed documents keep all their content while OCR is
+    spent only where it is needed.
+    """
+    reader = PdfReader(source.stream)
+    min_chars = settings.OCR_MIN_PAGE_CHARS
+
+    def text_layer():
+        for number, page in enumerate(reader.pages, start=1):
+            started = time.perf_counter()
+            page_text = page.extract_text() or ""
+            seconds = time.perf_counter() - started
+            yield number, page_text, seconds, len(page_text.strip()) < min_chars
+
+    with ExitStack() as stack:
+        yield from iter_ocr_pages(text_layer(), lambda: stack.enter_context(source.local_path()))
+
+
+def _extract_pdf(source, max_chars=MAX_CV_CHARS):
+    """Stream page text until ``max_chars`` is reached; later pages are never read."""
+    started = time.perf_counter()
+    timings = {}
+    page_reports = []
+    failed_pages = []
+    parts = []
+    length = 0
+
+    pages = iter_pdf_pages(source)
     try:
-        reader = PdfReader(temp_path)
-        for page in reader.pages:
-            text += page.extract_text() or ""
-
-        if not text.strip():
-            logger.info("No text detected — switching to OCR mode...")
-            images = convert_from_path(temp_path)
-            for img in images:
-                text += pytesseract.image_to_string(img)
-
-        logger.info(f"Extracted text preview: {text[:400]}")
-        return text[:4000]
+        for number, method, page_text, seconds in pages:
+            page_report = {"page": number, "method": method}
+            if method in OCR_FAILURES:
+                failed_pages.append(number)
+                page_report = {"page": number, "method": "text", "ocr_error": method}
+                method = "text"
+            timings[method] = timings.get(method, 0) + seconds
+            page_report.update(chars=len(page_text), seconds=round(seconds, 4))
+            page_reports.append(page_report)
+            parts.append(page_text)
+            length += len(page_text)
+            if length >= max_chars:
+                break
     finally:
-        os.remove(temp_path)
+        pages.close()
+
+    text = "".join(parts)[:max_chars]
+    logger.info(f"Extracted text preview: {text[:400]}")
+    timings["total"] = time.perf_counter() - started
+    timings = {stage: round(seconds, 4) for stage, seconds in timings.items()}
+
+    used = {p["method"] for p in page_reports if p["chars"]}
+    method = "hybrid" if len(used) > 1 else (used.pop() if used else "text")
+    return {
+        "text": text,
+        "method": method,
+        "timings": timings,
+        "pages": page_reports,
+        "failed_pages": failed_pages,
+        "cached": False,
+    }
+
+
+class _DocxTextHandler(xml.sax.handler.ContentHandler):
+    """Collects run text from ``word/document.xml`` without building a tree."""
+
+    def __init__(self):
+        super().__init__()
+        self.parts = []
+        self.length = 0
+        self._in_text = False
+
+    def _append(self, value):
+        self.parts.append(value)
+        self.length += len(value)
+
+    def startElementNS(self, name, qname, attrs):
+        uri, local = name
+        if uri != WORD_NAMESPACE:
+            return
+        if local == "t":
+            self._in_text = True
+        elif local == "tab":
+            self._append("\t")
+        elif local in ("br", "cr"):
+            self._append("\n")
+
+    def endElementNS(self, name, qname):
+        uri, local = name
+        if uri != WORD_NAMESPACE:
+            return
+        if local == "t":
+            self._in_text = False
+        elif local == "p":
+            self._append("\n")
+
+    def characters(self, content):
+        if self._in_text:
+            self._append(content)
+
+
+def _extract_docx(source, max_chars=MAX_CV_CHARS):
+    """Stream ``word/document.xml`` through an incremental SAX parser.
+
+    Only the document part is decompressed, chunk by chunk, so embedded
+    images are never read, and parsing stops once ``max_chars`` is reached.
+    """
+    started = time.perf_counter()
+    handler = _DocxTextHandler()
+    parser = xml.sax.make_parser()
+    parser.setFeature(xml.sax.handler.feature_namespaces, True)
+    parser.setFeature(xml.sax.handler.feature_external_ges, False)
+    parser.setContentHandler(handler)
+
+    with zipfile.ZipFile(source.stream) as archive:
+        with archive.open("word/document.xml") as document:
+            for chunk in iter(lambda: document.read(DOCX_CHUNK_SIZE), b""):
+                parser.feed(chunk)
+                if handler.length >= max_chars:
+                    break
+
+    text = "".join(handler.parts)[:max_chars]
+    logger.info(f"Extracted text preview: {text[:400]}")
+    seconds = round(time.perf_counter() - started, 4)
+    return {
+        "text": text,
+        "method": "docx",
+        "timings": {"docx": seconds, "total": seconds},
+        "pages": [],
+        "failed_pages": [],
+        "cached": False,
+    }
+
+
+# --- LLM models ---
+QUESTIONS_MODEL = "groq/compound"
+FEEDBACK_MODEL = "groq/compound-mini"
+MATCH_MODEL = "groq/compound"
+# Bump when a prompt changes so cached results are regenerated.
+QUESTIONS_PROMPT_VERSION = "2"
+MATCH_PROMPT_VERSION = "2"
 
 
 # --- Generate Quiz Questions ---
 def generate_questions_from_cv(cv_text):
-    """Send resume text to Groq API and generate professional questions."""
-    url = "https://api.groq.com/openai/v1/chat/completions"
-    headers = {
-        "Authorization": f"Bearer {GROQ_API_KEY}",
-        "Content-Type": "application/json"
+    """Send resume text to Groq API and generate professional questions.
+
+    Concurrent calls for the same text share one request.
+    """
+    return singleflight.do(_questions_flight_key(cv_text), _request_questions, cv_text)
+
+
+async def agenerate_questions_from_cv(cv_text):
+    """Async version of ``generate_questions_from_cv``."""
+    return await singleflight.ado(_questions_flight_key(cv_text), _arequest_questions, cv_text)
+
+
+def _questions_flight_key(cv_text):
+    return text_sha256(f"questions|{QUESTIONS_MODEL}|{QUESTIONS_PROMPT_VERSION}|{cv_text}")
+
+
+def _request_questions(cv_text):
+    messages = [{"role": "user", "content": _questions_prompt(cv_text)}]
+    response = chat_completion(QUESTIONS_MODEL, messages, timeout=45)
+    return _parse_questions_response(response)
+
+
+async def _arequest_questions(cv_text):
+    messages = [{"role": "user", "content": _questions_prompt(cv_text)}]
+    response = await achat_completion(QUESTIONS_MODEL, messages, timeout=45)
+    return _parse_questions_response(response)
+
+
+def build_questions(text, refresh=False, exact=False):
+    """Generate quiz questions for CV text and fill in missing skill/category.
+
+    Returns ``(questions, cached)``. Results are cached per CV text, model
+    and prompt version; ``refresh`` skips the cache lookup and overwrites it.
+    Questions cached for a near-identical text are reused unless ``exact``.
+    """
+    if not refresh:
+        questions = lookup_questions(text, exact)
+        if questions is not None:
+            return questions, True
+
+    questions = finalize_questions(generate_questions_from_cv(text))
+    if questions:
+        store_cv_questions(text, questions)
+    return questions, False
+
+
+async def abuild_questions(text, refresh=False, exact=False):
+    """Async version of ``build_questions``."""
+    if not refresh:
+        questions = await sync_to_async(lookup_questions)(text, exact)
+        if questions is not None:
+            return questions, True
+
+    questions = finalize_questions(await agenerate_questions_from_cv(text))
+    if questions:
+        await sync_to_async(store_cv_questions)(text, questions)
+    return questions, False
+
+
+def lookup_questions(text, exact=False):
+    """Unexpired questions cached for ``text``, or else for a near-identical CV text unless ``exact``."""
+    key = question_cache_key(text)
+    questions = get_cached_questions(**key)
+    if questions is None and not exact:
+        for text_hash in minhash.similar_keys(text, "questions"):
+            questions = get_cached_questions(**{**key, "text_hash": text_hash})
+            if questions is not None:
+                break
+    return questions
+
+
+def store_cv_questions(text, questions):
+    """Cache the questions generated for ``text``."""
+    key = question_cache_key(text)
+    store_questions(questions=questions, **key)
+    # Let near-identical CVs find these questions later
+    submit(minhash.remember, text, questions=key["text_hash"])
+
+
+def question_cache_key(text):
+    """Cache key for a CV's questions: hash of its (truncated) text plus model/prompt version."""
+    return {
+        "text_hash": text_sha256((text or "")[:MAX_CV_CHARS]),
+        "model": QUESTIONS_MODEL,
+        "prompt_version": QUESTIONS_PROMPT_VERSION,
     }
 
-    prompt = f"""
+
+def finalize_questions(raw):
+    """Normalize a model response into a question list and add inferred skill + category if missing."""
+    return tag_questions(_normalize_questions(raw))
+
+
+def _normalize_questions(raw):
+    """Accepts dict/list/JSON-string and returns list[dict]."""
+    if raw is None:
+        return []
+    if isinstance(raw, list):
+        return raw
+    if isinstance(raw, dict):
+        if isinstance(raw.get("questions"), list):
+            return raw["questions"]
+        if isinstance(raw.get("data"), list):
+            return raw["data"]
+        return []
+    if isinstance(raw, str):
+        try:
+            parsed = json.loads(raw)
+            return _normalize_questions(parsed)
+        except Exception:
+            return [{"question": raw}]
+    return []
+
+
+def stream_questions_from_cv(cv_text):
+    """Like ``generate_questions_from_cv``, but yield each question dict as soon
+    as the model finishes writing it. Upstream errors are raised."""
+    messages = [{"role": "user", "content": _questions_prompt(cv_text)}]
+    deltas = stream_chat_completion(QUESTIONS_MODEL, messages, timeout=45)
+    for count, item in enumerate(iter_json_objects(deltas), start=1):
+        yield item
+        if count >= 25:
+            return
+
+
+def iter_json_objects(chunks):
+    """Yield each top-level JSON object found in a stream of text chunks.
+
+    Objects are decoded as soon as their closing brace arrives, so the items
+    of a JSON array can be used before the array is complete. Anything
+    outside an object (brackets, commas, markdown fences) is skipped, as are
+    objects that fail to decode.
+    """
+    buffer = []
+    depth = 0
+    in_string = escaped = False
+    for chunk in chunks:
+        for char in chunk:
+            if depth == 0:
+                if char == "{":
+                    buffer = [char]
+                    depth = 1
+                continue
+
+            buffer.append(char)
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif char == "\\":
+                    escaped = True
+                elif char == '"':
+                    in_string = False
+            elif char == '"':
+                in_string = True
+            elif char == "{":
+                depth += 1
+            elif char == "}":
+                depth -= 1
+                if depth == 0:
+                    text = "".join(buffer)
+                    try:
+                        yield json.loads(text)
+                    except json.JSONDecodeError:
+                        logger.warning(f"Skipping malformed streamed object: {text[:200]}")
+
+
+def _questions_prompt(cv_text):
+    cv_text = compact_cv_text(cv_text)["text"]
+    return f"""
 You are an experienced HR and technical interviewer working for an AI-powered resume assessment platform called VeriCV.
 Analyze the following resume content carefully:
 ---
@@ -86,16 +432,9 @@ Output format example:
 ]
 Return ONLY this JSON array — no markdown, no extra text.
 """
-    data = {"model": "groq/compound", "messages": [{"role": "user", "content": prompt}]}
 
-    for attempt in range(3):
-        response = requests.post(url, headers=headers, json=data, timeout=45)
-        if response.status_code == 429:
-            logger.warning(":warning: Groq rate limit hit. Retrying in 3 seconds...")
-            time.sleep(3)
-            continue
-        break
 
+def _parse_questions_response(response):
     if response.status_code == 200:
         content = response.json()["choices"][0]["message"]["content"]
         logger.info(f"Raw model output: {content[:500]}")
@@ -129,13 +468,32 @@ def generate_feedback_from_ai(wrong_answers, percent):
     if not wrong_answers:
         return "Excellent work! You answered all questions correctly. "
 
+    messages = [{"role": "user", "content": _feedback_prompt(wrong_answers, percent)}]
+    try:
+        response = chat_completion(FEEDBACK_MODEL, messages, timeout=30)
+    except CircuitOpenError as e:
+        return f"Feedback is temporarily unavailable: {e}"
+    return _parse_feedback_response(response)
+
+
+async def agenerate_feedback_from_ai(wrong_answers, percent):
+    """Async version of ``generate_feedback_from_ai``."""
+    if not wrong_answers:
+        return "Excellent work! You answered all questions correctly. "
+
+    messages = [{"role": "user", "content": _feedback_prompt(wrong_answers, percent)}]
+    try:
+        response = await achat_completion(FEEDBACK_MODEL, messages, timeout=30)
+    except CircuitOpenError as e:
+        return f"Feedback is temporarily unavailable: {e}"
+    return _parse_feedback_response(response)
+
+
+def _feedback_prompt(wrong_answers, percent):
     summary = f"Score: {percent:.1f}%\nIncorrect answers:\n"
     for w in wrong_answers:
         summary += f"- Question: {w['question']}\nYour answer: {w['chosen']}\nCorrect: {w['correct']}\n"
 
-    url = "https://api.groq.com/openai/v1/chat/completions"
-    headers = {"Authorization": f"Bearer {GROQ_API_KEY}", "Content-Type": "application/json"}
-
     prompt = f"""
 You are a career coach and HR expert.
 
@@ -148,10 +506,10 @@ Write feedback that:
 - Gives clear, practical advice.
 - Encourages and motivates the candidate.
 """
+    return prompt
 
-    data = {"model": "groq/compound-mini", "messages": [{"role": "user", "content": prompt}]}
-    response = requests.post(url, headers=headers, json=data, timeout=30)
 
+def _parse_feedback_response(response):
     if response.status_code == 200:
         return response.json()["choices"][0]["message"]["content"]
     else:
@@ -176,59 +534,175 @@ def _parse_match_score(value):
     return None
 
 
-def _tokenize(text):
-    tokens = re.findall(r"[A-Za-z0-9+#\.\-]+", (text or "").lower())
-    # Lightweight stopword filter to reduce noise
-    stop = {
-        "the","and","for","with","that","this","your","you","are","our","job","role","a","an","to","of","in","on","as","by","be","is","at","we","us","they","he","she","it","from","or","will","have","has","had","not","but","if","then","than","into","within","per","about","over","under","across","into","out","up","down"
-    }
-    return {t for t in tokens if len(t) > 2 and t not in stop}
-
-
 def _compute_fallback_match(cv_text, job_description, position):
     """Heuristic match score and missing keywords if AI is unavailable.
 
-    Computes overlap between JD and CV tokens + position bonus.
+    Blends BM25 over the stored CV/job description corpus (``ai.scoring``)
+    with hashed n-gram similarity (``ai.similarity``), which also credits
+    spelling variants and synonyms. Missing keywords come from BM25.
     """
-    cv_tokens = _tokenize(cv_text)
-    jd_tokens = _tokenize(job_description)
-    pos_tokens = _tokenize(position)
-
-    if not jd_tokens:
-        return 0, []
+    bm25, missing = scoring.score_match(cv_text, job_description, position)
+    weight = settings.SIMILARITY_FALLBACK_WEIGHT
+    local = similarity.match_score(cv_text, job_description, position)
+    return int(round((1 - weight) * bm25 + weight * local)), missing
 
-    overlap = len(cv_tokens & jd_tokens)
-    base = int(round((overlap / max(len(jd_tokens), 1)) * 100))
 
-    # Small bonus if position tokens appear in CV
-    pos_overlap = len(cv_tokens & pos_tokens)
-    bonus = min(10, pos_overlap * 3)
+# --- Job Match Analysis (AI-Powered + Improvement Advice) ---
+def analyze_job_match(cv_text, job_description, position):
+    """
+    Compare a candidate’s CV with a job posting and return an AI-based match report.
+    Includes match score, missing keywords, professional feedback, and advice for improvement.
+    """
+    report, _ = _request_job_match(cv_text, job_description, position)
+    return report
 
-    score = max(0, min(100, base + bonus))
 
-    # Missing keywords: top terms in JD not present in CV (limit 10)
-    missing = [t for t in jd_tokens if t not in cv_tokens]
-    # Prefer more "important" looking tokens (longer first)
-    missing.sort(key=lambda x: (-len(x), x))
-    missing = missing[:10]
+async def aanalyze_job_match(cv_text, job_description, position):
+    """Async version of ``analyze_job_match``."""
+    report, _ = await _arequest_job_match(cv_text, job_description, position)
+    return report
 
-    return score, missing
 
+def cached_job_match(cv_text, job_description, position, refresh=False, exact=False):
+    """``analyze_job_match`` behind the match report cache.
 
-# --- Job Match Analysis (AI-Powered + Improvement Advice) ---
-def analyze_job_match(cv_text, job_description, position):
+    Returns ``(report, cached)``. Only reports produced by the model are
+    cached, never heuristic fallbacks; ``refresh`` skips the lookup. A
+    report cached for a near-identical CV and the same job is reused
+    unless ``exact``.
     """
-    Compare a candidate’s CV with a job posting and return an AI-based match report.
-    Includes match score, missing keywords, professional feedback, and advice for improvement.
+    key = match_cache_key(cv_text, job_description, position)
+    if not refresh:
+        report = _cached_match(cv_text, key, exact)
+        if report is not None:
+            return report, True
+
+    _add_to_corpus(job_description)
+    report, from_ai = _request_job_match(cv_text, job_description, position)
+    if from_ai:
+        _store_match(cv_text, key, report)
+    return report, False
+
+
+async def acached_job_match(cv_text, job_description, position, refresh=False, exact=False):
+    """Async version of ``cached_job_match``."""
+    key = match_cache_key(cv_text, job_description, position)
+    if not refresh:
+        report = await sync_to_async(_cached_match)(cv_text, key, exact)
+        if report is not None:
+            return report, True
+
+    _add_to_corpus(job_description)
+    report, from_ai = await _arequest_job_match(cv_text, job_description, position)
+    if from_ai:
+        await sync_to_async(_store_match)(cv_text, key, report)
+    return report, False
+
+
+def _cached_match(cv_text, key, exact=False):
+    """Report cached for this CV, or else for a near-identical CV unless ``exact``."""
+    report = get_cached_match(**key)
+    if report is None and not exact:
+        for cv_hash in minhash.similar_keys(cv_text, "match"):
+            report = get_cached_match(**{**key, "cv_hash": cv_hash})
+            if report is not None:
+                logger.info(f"Reusing match report of near-duplicate CV {cv_hash[:12]}")
+                break
+    return report
+
+
+def _store_match(cv_text, key, report):
+    store_match(report=report, **key)
+    submit(minhash.remember, cv_text, match=key["cv_hash"])
+
+
+def _add_to_corpus(job_description):
+    """Count a job description in the fallback scorer's corpus statistics, off the request path.
+
+    Stored CVs are counted when they are extracted; uploaded ones are not.
     """
-    url = "https://api.groq.com/openai/v1/chat/completions"
-    headers = {
-        "Authorization": f"Bearer {GROQ_API_KEY}",
-        "Content-Type": "application/json"
+    submit(scoring.add_document, job_description, "jd")
+
+
+def match_cache_key(cv_text, job_description, position):
+    """Cache key for a match report: hashes of the normalized inputs plus model/prompt version."""
+    def normalized_hash(text):
+        return text_sha256(" ".join((text or "").split()).casefold())
+
+    return {
+        "cv_hash": normalized_hash(cv_text),
+        "job_hash": normalized_hash(job_description),
+        "position_hash": normalized_hash(position),
+        "model": MATCH_MODEL,
+        "prompt_version": MATCH_PROMPT_VERSION,
     }
 
-    # --- AI Prompt ---
-    prompt = f"""
+
+def _match_flight_key(cv_text, job_description, position):
+    key = match_cache_key(cv_text, job_description, position)
+    return text_sha256("match|" + "|".join(key.values()))
+
+
+# --- Send Request to Groq ---
+# Concurrent identical matches share one request; results come back as
+# ``(report, from_ai)``. Heuristic fallbacks are not shared across workers.
+def _from_ai(result):
+    return result[1]
+
+
+def _request_job_match(cv_text, job_description, position):
+    report, from_ai = singleflight.do(
+        _match_flight_key(cv_text, job_description, position),
+        _post_job_match,
+        cv_text,
+        job_description,
+        position,
+        share=_from_ai,
+    )
+    return report, from_ai
+
+
+async def _arequest_job_match(cv_text, job_description, position):
+    report, from_ai = await singleflight.ado(
+        _match_flight_key(cv_text, job_description, position),
+        _apost_job_match,
+        cv_text,
+        job_description,
+        position,
+        share=_from_ai,
+    )
+    return report, from_ai
+
+
+# An open circuit or a network failure falls back to the heuristic at once.
+def _post_job_match(cv_text, job_description, position):
+    messages = [{"role": "user", "content": _match_prompt(cv_text, job_description, position)}]
+    try:
+        response = chat_completion(MATCH_MODEL, messages, timeout=60)
+    except (CircuitOpenError, requests.RequestException) as e:
+        logger.warning(f"Job match falling back to heuristic: {e}")
+        return _fallback_match(cv_text, job_description, position, "AI service unavailability")
+    return _parse_match_response(response, cv_text, job_description, position)
+
+
+async def _apost_job_match(cv_text, job_description, position):
+    messages = [{"role": "user", "content": _match_prompt(cv_text, job_description, position)}]
+    try:
+        response = await achat_completion(MATCH_MODEL, messages, timeout=60)
+    except (CircuitOpenError, httpx.HTTPError) as e:
+        logger.warning(f"Job match falling back to heuristic: {e}")
+        return await sync_to_async(_fallback_match)(
+            cv_text, job_description, position, "AI service unavailability"
+        )
+    # The heuristic fallback reads the scoring statistics from the database.
+    return await sync_to_async(_parse_match_response)(response, cv_text, job_description, position)
+
+
+# --- AI Prompt ---
+def _match_prompt(cv_text, job_description, position):
+    cv_text = compact_cv_text(cv_text)["text"]
+    job_description = normalize_text(job_description)
+    return f"""
 You are a senior recruiter, HR expert, and resume coach working for an AI platform called VeriCV.
 
 Your task is to analyze how well this resume fits the following job:
@@ -266,11 +740,10 @@ Example:
 }}
 """
 
-    # --- Send Request to Groq ---
-    data = {"model": "groq/compound", "messages": [{"role": "user", "content": prompt}]}
-    response = requests.post(url, headers=headers, json=data, timeout=60)
 
-    # --- Handle Response ---
+# --- Handle Response ---
+def _parse_match_response(response, cv_text, job_description, position):
+    """Return ``(report, from_ai)``; ``from_ai`` is False for heuristic fallbacks."""
     if response.status_code == 200:
         try:
             content = response.json()["choices"][0]["message"]["content"]
@@ -306,22 +779,26 @@ Example:
                 "missing_keywords": missing,
                 "summary": result.get("summary", "No feedback provided."),
                 "improvement_advice": result.get("improvement_advice", "No advice provided.")
-            }
+            }, True
         except Exception as e:
             logger.error(f"Job match parsing error: {e}")
-            score, missing = _compute_fallback_match(cv_text, job_description, position)
-            return {
-                "match_score": int(score),
-                "missing_keywords": missing,
-                "summary": "Generated via fallback heuristic due to AI parsing error.",
-                "improvement_advice": "Add missing keywords and align CV with the job description to improve the score."
-            }
+            return _fallback_match(cv_text, job_description, position, "AI parsing error")
     else:
         logger.error(f"Groq API Error ({response.status_code}): {response.text}")
-        score, missing = _compute_fallback_match(cv_text, job_description, position)
-        return {
-            "match_score": int(score),
-            "missing_keywords": missing,
-            "summary": "Generated via fallback heuristic due to AI service unavailability.",
-            "improvement_advice": "Add missing keywords and align CV with the job description to improve the score."
-        }
+        return _fallback_match(cv_text, job_description, position, "AI service unavailability")
+
+
+def heuristic_job_match(cv_text, job_description, position, reason):
+    """Match report computed locally, without calling the model."""
+    report, _ = _fallback_match(cv_text, job_description, position, reason)
+    return report
+
+
+def _fallback_match(cv_text, job_description, position, reason):
+    score, missing = _compute_fallback_match(cv_text, job_description, position)
+    return {
+        "match_score": int(score),
+        "missing_keywords": missing,
+        "summary": f"Generated via fallback heuristic due to {reason}.",
+        "improvement_advice": "Add missing keywords and align CV with the job description to improve the score."
+    }, False
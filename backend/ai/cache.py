@@ -0,0 +1,166 @@
+"""Persistent caches for the expensive steps of the AI pipeline."""
+import hashlib
+import json
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .models import ExtractedText, GeneratedQuestions, MatchReport
+
+logger = logging.getLogger(__name__)
+
+
+def content_sha256(data):
+    """Return the SHA-256 hex digest of a bytes-like buffer."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def text_sha256(text):
+    """Return the SHA-256 hex digest of a text."""
+    return content_sha256((text or "").encode("utf-8"))
+
+
+def _evict_lru(table, max_entries, max_bytes):
+    """Delete least recently used rows until the table fits both limits."""
+    if max_entries and table.objects.count() > max_entries:
+        stale = table.objects.order_by("-last_used_at").values_list("pk", flat=True)[max_entries:]
+        table.objects.filter(pk__in=list(stale)).delete()
+
+    if max_bytes:
+        total = table.objects.aggregate(total=Sum("size"))["total"] or 0
+        if total <= max_bytes:
+            return
+        doomed = []
+        for pk, size in table.objects.order_by("last_used_at").values_list("pk", "size"):
+            if total <= max_bytes:
+                break
+            doomed.append(pk)
+            total -= size
+        table.objects.filter(pk__in=doomed).delete()
+
+
+def _lookup(table, /, ttl=None, **key):
+    """Return the cache row matching ``key`` and mark it used, or None.
+
+    Rows older than ``ttl`` seconds are deleted instead of returned.
+    """
+    try:
+        entry = table.objects.filter(**key).first()
+        if entry is None:
+            return None
+        if ttl and entry.created_at < timezone.now() - timedelta(seconds=ttl):
+            entry.delete()
+            return None
+        table.objects.filter(pk=entry.pk).update(
+            hits=F("hits") + 1, last_used_at=timezone.now()
+        )
+    except DatabaseError as e:
+        logger.warning(f"{table.__name__} cache lookup failed: {e}")
+        return None
+    return entry
+
+
+def _store(table, /, limits, key, **values):
+    """Insert or replace the cache row for ``key``, then apply LRU ``limits``."""
+    try:
+        table.objects.update_or_create(**key, defaults=values)
+    except IntegrityError:
+        # Another worker stored the same entry concurrently.
+        return
+    except DatabaseError as e:
+        logger.warning(f"{table.__name__} cache write failed: {e}")
+        return
+    _evict_lru(table, *limits)
+
+
+# --- Extracted CV text ---
+def get_cached_extraction(content_hash, version):
+    """Return a cached extraction report for the given file hash, or None."""
+    entry = _lookup(ExtractedText, content_hash=content_hash, extractor_version=version)
+    if entry is None:
+        return None
+    return {
+        "text": entry.text,
+        "method": entry.method,
+        "timings": entry.timings,
+        "pages": entry.pages,
+        "failed_pages": [],
+        "cached": True,
+    }
+
+
+def store_extraction(content_hash, version, report):
+    """Persist an extraction report and evict old entries beyond the size limits."""
+    text = report.get("text", "")
+    _store(
+        ExtractedText,
+        (settings.EXTRACTION_CACHE_MAX_ENTRIES, settings.EXTRACTION_CACHE_MAX_BYTES),
+        {"content_hash": content_hash, "extractor_version": version},
+        text=text,
+        method=report.get("method", "text"),
+        timings=report.get("timings", {}),
+        pages=report.get("pages", []),
+        size=len(text.encode("utf-8")),
+    )
+
+
+# --- Generated quiz questions ---
+def get_cached_questions(text_hash, model, prompt_version):
+    """Return the cached question list for a CV text, or None."""
+    entry = _lookup(
+        GeneratedQuestions,
+        ttl=settings.QUESTION_CACHE_TTL,
+        text_hash=text_hash,
+        model=model,
+        prompt_version=prompt_version,
+    )
+    return entry.questions if entry is not None else None
+
+
+def store_questions(text_hash, model, prompt_version, questions):
+    """Persist a normalized question list for a CV text."""
+    _store(
+        GeneratedQuestions,
+        (settings.QUESTION_CACHE_MAX_ENTRIES, settings.QUESTION_CACHE_MAX_BYTES),
+        {"text_hash": text_hash, "model": model, "prompt_version": prompt_version},
+        questions=questions,
+        size=len(json.dumps(questions)),
+        created_at=timezone.now(),
+    )
+
+
+# --- Job match reports ---
+def get_cached_match(cv_hash, job_hash, position_hash, model, prompt_version):
+    """Return the cached match report for a CV/job/position triple, or None."""
+    entry = _lookup(
+        MatchReport,
+        ttl=settings.MATCH_CACHE_TTL,
+        cv_hash=cv_hash,
+        job_hash=job_hash,
+        position_hash=position_hash,
+        model=model,
+        prompt_version=prompt_version,
+    )
+    return entry.report if entry is not None else None
+
+
+def store_match(cv_hash, job_hash, position_hash, model, prompt_version, report):
+    """Persist a model-generated match report."""
+    _store(
+        MatchReport,
+        (settings.MATCH_CACHE_MAX_ENTRIES, settings.MATCH_CACHE_MAX_BYTES),
+        {
+            "cv_hash": cv_hash,
+            "job_hash": job_hash,
+            "position_hash": position_hash,
+            "model": model,
+            "prompt_version": prompt_version,
+        },
+        report=report,
+        size=len(json.dumps(report)),
+        created_at=timezone.now(),
+    )
@@ -0,0 +1,110 @@
+"""Circuit breaker for LLM calls, tracked per model and shared across workers.
+
+``closed``: calls go through; consecutive failures (network errors,
+timeouts, 5xx responses) are counted and ``CIRCUIT_FAILURE_THRESHOLD`` of
+them trip the breaker.
+
+``open``: calls fail fast with ``CircuitOpenError`` for
+``CIRCUIT_OPEN_SECONDS``, so callers can degrade at once instead of waiting
+on timeouts.
+
+``half_open``: after that, a single probe call is let through. Success
+closes the circuit; failure opens it again. A probe that never reports
+back is replaced after ``CIRCUIT_PROBE_TIMEOUT`` seconds.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import CircuitBreaker
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a model whose circuit is open."""
+
+    def __init__(self, name, retry_after):
+        self.name = name
+        self.retry_after = max(int(retry_after + 0.999), 1)
+        super().__init__(f"{name} is temporarily unavailable; retry in {self.retry_after}s")
+
+
+def check(name):
+    """Raise ``CircuitOpenError`` unless a call to ``name`` may go ahead now."""
+    try:
+        retry_after = _admit(name)
+    except DatabaseError as e:
+        logger.warning(f"Circuit breaker unavailable, letting {name} call through: {e}")
+        return
+    if retry_after is not None:
+        raise CircuitOpenError(name, retry_after)
+
+
+def _admit(name):
+    """Return None if the call is allowed, else seconds until the next probe."""
+    now = timezone.now()
+    breaker = CircuitBreaker.objects.filter(name=name).first()
+    if breaker is None or breaker.state == "closed":
+        return None
+    if breaker.open_until and breaker.open_until > now:
+        return (breaker.open_until - now).total_seconds()
+
+    # The open period (or a lost probe's slot) has run out: one caller gets
+    # to probe, everyone else keeps failing fast.
+    probe_until = now + timedelta(seconds=settings.CIRCUIT_PROBE_TIMEOUT)
+    won = CircuitBreaker.objects.filter(
+        name=name, state=breaker.state, open_until=breaker.open_until
+    ).update(state="half_open", open_until=probe_until)
+    if won:
+        logger.info(f"Circuit for {name} half-open; probing")
+        return None
+    return settings.CIRCUIT_PROBE_TIMEOUT
+
+
+def record_success(name):
+    try:
+        closed = CircuitBreaker.objects.filter(name=name).exclude(state="closed", failures=0).update(
+            state="closed", failures=0, open_until=None
+        )
+    except DatabaseError as e:
+        logger.warning(f"Could not record success for {name}: {e}")
+        return
+    if closed:
+        logger.info(f"Circuit for {name} closed")
+
+
+def record_failure(name):
+    now = timezone.now()
+    open_until = now + timedelta(seconds=settings.CIRCUIT_OPEN_SECONDS)
+    try:
+        CircuitBreaker.objects.get_or_create(name=name)
+        # A failed probe reopens the circuit straight away.
+        reopened = CircuitBreaker.objects.filter(name=name, state="half_open").update(
+            state="open", open_until=open_until, failures=F("failures") + 1
+        )
+        if reopened:
+            logger.warning(f"Circuit for {name} probe failed; open for {settings.CIRCUIT_OPEN_SECONDS}s")
+            return
+        CircuitBreaker.objects.filter(name=name, state="closed").update(failures=F("failures") + 1)
+        tripped = CircuitBreaker.objects.filter(
+            Q(failures__gte=settings.CIRCUIT_FAILURE_THRESHOLD), name=name, state="closed"
+        ).update(state="open", open_until=open_until)
+    except DatabaseError as e:
+        logger.warning(f"Could not record failure for {name}: {e}")
+        return
+    if tripped:
+        logger.warning(f"Circuit for {name} tripped; open for {settings.CIRCUIT_OPEN_SECONDS}s")
+
+
+def record_status(name, status_code):
+    """Record a call outcome from its HTTP status (None for a network error or timeout)."""
+    if status_code is None or status_code >= 500:
+        record_failure(name)
+    elif status_code != 429:
+        # Rate limiting says nothing about the API's health.
+        record_success(name)
@@ -0,0 +1,197 @@
+"""Shrink extracted CV text before it is embedded in a prompt.
+
+Extraction keeps whatever the document contains: runs of whitespace, OCR
+noise, headers and footers repeated on every page. ``compact_cv_text``
+normalizes and de-duplicates the lines, splits the text into résumé
+sections and packs the most useful ones (skills first) into a token
+budget, so long CVs no longer lose their Skills section to truncation.
+"""
+import logging
+import math
+import re
+import textwrap
+import unicodedata
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Rough size of a token for English prose; good enough for budgeting
+# without shipping the model's tokenizer.
+CHARS_PER_TOKEN = 4
+MAX_LINE_CHARS = 200
+# Share of the budget any one section gets before the others had their turn.
+SECTION_SHARE = 0.5
+
+# Canonical section -> headings that introduce it (compared casefolded,
+# without trailing punctuation).
+SECTION_HEADINGS = {
+    "summary": ("summary", "profile", "professional summary", "about me", "about",
+                "objective", "career objective", "personal statement"),
+    "skills": ("skills", "technical skills", "key skills", "core skills", "soft skills",
+               "core competencies", "competencies", "technologies", "tech stack",
+               "tools", "tools and technologies", "expertise", "areas of expertise"),
+    "experience": ("experience", "work experience", "professional experience",
+                   "employment", "employment history", "work history", "career history",
+                   "internships", "internship"),
+    "projects": ("projects", "personal projects", "key projects", "selected projects",
+                 "academic projects"),
+    "certifications": ("certifications", "certificates", "licenses", "licenses and certifications",
+                       "courses", "training", "professional development"),
+    "education": ("education", "academic background", "qualifications", "education and training"),
+    "languages": ("languages",),
+    "awards": ("awards", "achievements", "honors", "honours", "accomplishments"),
+    "publications": ("publications", "research"),
+    "volunteering": ("volunteering", "volunteer experience", "activities", "extracurricular activities"),
+    "interests": ("interests", "hobbies", "hobbies and interests"),
+    "references": ("references", "referees"),
+}
+_HEADING_LOOKUP = {
+    heading: section for section, headings in SECTION_HEADINGS.items() for heading in headings
+}
+
+# Packing order: the sections that say most about what a candidate can do
+# go in first. "header" is the text before the first heading (name,
+# contact details); references never make it in.
+SECTION_PRIORITY = (
+    "skills", "experience", "summary", "projects", "certifications", "education",
+    "languages", "awards", "header", "publications", "volunteering", "interests",
+)
+
+_BULLETS = re.compile(r"^[•●▪◦‣⁃∙·*\-–—>]+\s*")
+_SPACES = re.compile(r"[ \t\u00a0\u2000-\u200b\u3000]+")
+_BOILERPLATE = re.compile(
+    r"^(page\s*\d+(\s*(of|/)\s*\d+)?|\d+\s*(of|/)\s*\d+|-?\s*\d+\s*-?"
+    r"|curriculum vitae|resume|résumé|cv"
+    r"|references (are )?available (up)?on request)$",
+    re.IGNORECASE,
+)
+
+
+def estimate_tokens(text):
+    return math.ceil(len(text or "") / CHARS_PER_TOKEN)
+
+
+def normalize_text(text):
+    """Normalize unicode and collapse whitespace inside lines; drop empty lines."""
+    text = unicodedata.normalize("NFKC", text or "")
+    lines = (_SPACES.sub(" ", line).strip() for line in text.splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def compact_cv_text(text, budget_tokens=None):
+    """Return the CV text packed into ``budget_tokens`` plus a size report.
+
+    The result is a dict with ``text``, ``original_chars``,
+    ``compacted_chars``, ``original_tokens``, ``compacted_tokens`` and
+    ``sections`` (names of the sections kept, in document order).
+    ``budget_tokens`` defaults to ``CV_PROMPT_TOKEN_BUDGET``.
+    """
+    budget_tokens = settings.CV_PROMPT_TOKEN_BUDGET if budget_tokens is None else budget_tokens
+    budget = budget_tokens * CHARS_PER_TOKEN
+
+    sections = _split_sections(_clean_lines(text))
+    kept = _pack(sections, budget)
+    compacted = "\n".join(
+        "\n".join(lines) for _, _, lines in sorted(kept, key=lambda section: section[0])
+    )
+
+    report = {
+        "text": compacted,
+        "original_chars": len(text or ""),
+        "compacted_chars": len(compacted),
+        "original_tokens": estimate_tokens(text),
+        "compacted_tokens": estimate_tokens(compacted),
+        "sections": [name for _, name, _ in sorted(kept, key=lambda section: section[0])],
+    }
+    logger.info(
+        f"CV compacted from {report['original_chars']} to {report['compacted_chars']} chars "
+        f"(~{report['original_tokens']} -> ~{report['compacted_tokens']} tokens)"
+    )
+    return report
+
+
+def split_sections(text):
+    """Return the cleaned CV text as ``[(section_name, text)]`` in document order."""
+    return [(name, "\n".join(lines)) for _, name, lines in _split_sections(_clean_lines(text))]
+
+
+def _clean_lines(text):
+    """Yield normalized lines without boilerplate, OCR noise or repeats.
+
+    Over-long lines (text layers that put a whole page on one line) are
+    wrapped first so they can be packed a piece at a time.
+    """
+    seen = set()
+    lines = normalize_text(text).splitlines()
+    for line in (part for line in lines for part in textwrap.wrap(line, MAX_LINE_CHARS)):
+        line = _BULLETS.sub("- ", line) if _BULLETS.match(line) else line
+        if sum(char.isalnum() for char in line) < 2 or _BOILERPLATE.match(line):
+            continue
+        # Page headers/footers and copy-pasted blocks repeat verbatim.
+        key = line.casefold()
+        if key in seen:
+            continue
+        seen.add(key)
+        yield line
+
+
+def _section_for(line):
+    if len(line) > 40 or len(line.split()) > 5:
+        return None
+    heading = line.strip(" :-–—|#*").casefold().replace("&", "and")
+    return _HEADING_LOOKUP.get(heading)
+
+
+def _split_sections(lines):
+    """Return ``[(position, name, lines)]``; each section starts with its heading line."""
+    sections = []
+    name, current = "header", []
+    for line in lines:
+        found = _section_for(line)
+        if found is not None:
+            if current:
+                sections.append((len(sections), name, current))
+            name, current = found, [line]
+        else:
+            current.append(line)
+    if current:
+        sections.append((len(sections), name, current))
+    return sections
+
+
+def _pack(sections, budget):
+    """Pick the lines of each section to keep within ``budget`` characters.
+
+    Sections are visited in priority order, first with at most
+    ``SECTION_SHARE`` of the budget each, so one long section (usually the
+    work history) can't crowd out the rest, then again to spend whatever is
+    left. Lines are kept from the top of each section.
+    """
+    def rank(section):
+        name = section[1]
+        return SECTION_PRIORITY.index(name) if name in SECTION_PRIORITY else len(SECTION_PRIORITY)
+
+    ranked = sorted((s for s in sections if s[1] != "references"), key=rank)
+    taken = {position: 0 for position, _, _ in ranked}
+    used = dict.fromkeys(taken, 0)
+    remaining = budget
+    for limit in (budget * SECTION_SHARE, budget):
+        for position, _, lines in ranked:
+            count = taken[position]
+            while count < len(lines):
+                cost = len(lines[count]) + 1
+                if cost > remaining or used[position] + cost > limit:
+                    break
+                used[position] += cost
+                remaining -= cost
+                count += 1
+            taken[position] = count
+
+    kept = []
+    for position, name, lines in ranked:
+        lines = lines[: taken[position]]
+        # A heading on its own is not worth its tokens.
+        if lines and (len(lines) > 1 or _section_for(lines[0]) is None):
+            kept.append((position, name, lines))
+    return kept
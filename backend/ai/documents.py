@@ -0,0 +1,105 @@
+"""Read uploaded and stored CV files without copying them to disk."""
+import io
+import mmap
+import os
+import tempfile
+import zipfile
+from contextlib import contextmanager
+
+
+class UnsupportedDocumentError(ValueError):
+    """Raised when an upload is neither a PDF nor a DOCX document."""
+
+
+class DocumentSource:
+    """Read-only view over an uploaded file or a stored ``CV.file``.
+
+    ``stream`` is a seekable file-like object and ``data`` a bytes-like
+    buffer over the same content. In-memory uploads are read straight from
+    their buffer; files that already live on disk (large temporary uploads,
+    stored CVs) are opened in place and memory-mapped. Use as a context
+    manager.
+    """
+
+    def __init__(self, file):
+        self.name = getattr(file, "name", "") or ""
+        self.path = _local_path(file)
+        self._handle = None
+        self._mmap = None
+        self._view = None
+
+        if self.path:
+            self._handle = open(self.path, "rb")
+            if os.fstat(self._handle.fileno()).st_size:
+                self._mmap = mmap.mmap(self._handle.fileno(), 0, access=mmap.ACCESS_READ)
+                self.data = self._mmap
+            else:
+                self.data = b""
+            self.stream = self._handle
+            return
+
+        raw = getattr(file, "file", None)
+        if not isinstance(raw, io.BytesIO):
+            file.seek(0)
+            raw = io.BytesIO(file.read())
+        raw.seek(0)
+        self.stream = raw
+        self._view = raw.getbuffer()
+        self.data = self._view
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._view is not None:
+            self._view.release()
+            self._view = None
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+    def sniff_format(self):
+        """Return "pdf" or "docx" based on the file's magic bytes, else None."""
+        head = bytes(self.data[:1024])
+        if b"%PDF-" in head:
+            return "pdf"
+        if head.startswith(b"PK\x03\x04"):
+            try:
+                with zipfile.ZipFile(self.stream) as archive:
+                    archive.getinfo("word/document.xml")
+                return "docx"
+            except (zipfile.BadZipFile, KeyError):
+                return None
+        return None
+
+    @contextmanager
+    def local_path(self, suffix=".pdf"):
+        """Yield a filesystem path to the document, spilling to a temp file only if needed."""
+        if self.path:
+            yield self.path
+            return
+
+        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp_file:
+            tmp_file.write(self.data)
+            temp_path = tmp_file.name
+        try:
+            yield temp_path
+        finally:
+            os.remove(temp_path)
+
+
+def _local_path(file):
+    """Return the on-disk path of a file if it has one, else None."""
+    if hasattr(file, "temporary_file_path"):
+        return file.temporary_file_path()
+    try:
+        path = file.path  # FieldFile backed by FileSystemStorage
+    except (AttributeError, NotImplementedError, ValueError):
+        return None
+    return path if path and os.path.isfile(path) else None
@@ -0,0 +1,143 @@
+"""Database-backed job queue for slow AI requests.
+
+Views create an ``AIJob`` row and return 202 straight away; the work runs
+on the background worker pool (``ai.workers``) and clients poll the job's
+status URL. The database is the only moving part: no broker is needed.
+Jobs belong to the user who queued them; an anonymous job gets a random
+secret instead, handed out with its status URL.
+"""
+import logging
+import secrets
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.http import JsonResponse
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import urlencode
+
+from .models import AIJob
+from .workers import submit
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = ("succeeded", "failed")
+
+_handlers = {}
+
+
+def job_handler(kind):
+    """Register ``fn(job) -> result`` as the runner for jobs of ``kind``."""
+    def register(fn):
+        _handlers[kind] = fn
+        return fn
+    return register
+
+
+def is_truthy(value):
+    return str(value).strip().lower() in ("1", "true", "yes", "on")
+
+
+def enqueue_job(kind, user=None, payload=None, upload=None):
+    """Create a queued job and schedule it once the transaction commits.
+
+    Without ``user`` the job gets a ``secret`` that polling it requires.
+    """
+    job = AIJob(kind=kind, user=user, payload=payload or {})
+    if user is None:
+        job.secret = secrets.token_urlsafe(32)
+    if upload is not None:
+        job.upload.save(upload.name, upload, save=False)
+    job.save()
+    transaction.on_commit(lambda: submit(run_job, job.pk))
+    return job
+
+
+def run_job(job_id):
+    """Claim a queued job, run its handler and record the outcome."""
+    claimed = AIJob.objects.filter(pk=job_id, status="queued").update(
+        status="running", started_at=timezone.now()
+    )
+    if not claimed:
+        return
+    job = AIJob.objects.get(pk=job_id)
+
+    try:
+        result = _handlers[job.kind](job)
+    except Exception as e:
+        logger.exception(f"AI job {job_id} ({job.kind}) failed")
+        AIJob.objects.filter(pk=job_id).update(
+            status="failed", error=str(e), finished_at=timezone.now()
+        )
+    else:
+        AIJob.objects.filter(pk=job_id).update(
+            status="succeeded", result=result, finished_at=timezone.now()
+        )
+    finally:
+        if job.upload:
+            job.upload.delete(save=False)
+
+
+def wait_for_job(job_id, wait=0, user=None, secret=None):
+    """Return the job, holding for up to ``wait`` seconds until it finishes.
+
+    With ``user`` or ``secret``, only a job queued by that user or created
+    with that secret is found; anything else is treated as missing.
+    """
+    deadline = time.monotonic() + min(max(wait, 0), settings.JOB_LONG_POLL_MAX)
+    jobs = AIJob.objects.filter(pk=job_id)
+    if user is not None or secret is not None:
+        access = Q(user=user) if user is not None else Q(pk__in=[])
+        if secret:
+            access |= Q(secret=secret)
+        jobs = jobs.filter(access)
+    job = jobs.first()
+    while job is not None and job.status not in TERMINAL_STATUSES and time.monotonic() < deadline:
+        time.sleep(0.5)
+        job.refresh_from_db()
+
+    if job is not None and job.status not in TERMINAL_STATUSES:
+        _fail_if_stale(job)
+    return job
+
+
+def _fail_if_stale(job):
+    # Jobs are lost if their worker process restarts mid-run.
+    cutoff = timezone.now() - timedelta(seconds=settings.JOB_STALE_AFTER)
+    if job.created_at < cutoff:
+        AIJob.objects.filter(pk=job.pk, status=job.status).update(
+            status="failed", error="Job was interrupted.", finished_at=timezone.now()
+        )
+        job.refresh_from_db()
+
+
+def job_payload(job):
+    data = {
+        "job_id": str(job.id),
+        "kind": job.kind,
+        "status": job.status,
+        "created_at": job.created_at,
+        "finished_at": job.finished_at,
+    }
+    if job.status == "succeeded":
+        data["result"] = job.result
+    elif job.status == "failed":
+        data["error"] = job.error
+    return data
+
+
+def job_accepted_response(request, job):
+    """202 response pointing the client at the job's status URL (carrying its secret, if any)."""
+    status_url = reverse("ai-job-status", args=[job.id])
+    if job.secret:
+        status_url += "?" + urlencode({"secret": job.secret})
+    status_url = request.build_absolute_uri(status_url)
+    data = {"job_id": str(job.id), "status": job.status, "status_url": status_url}
+    if job.secret:
+        data["secret"] = job.secret
+    response = JsonResponse(data, status=202)
+    response["Location"] = status_url
+    return response
@@ -0,0 +1,277 @@
+"""Shared HTTP clients for Groq chat completions.
+
+All LLM calls go through one ``requests.Session`` per process (or, for the
+async API, one ``httpx.AsyncClient`` per event loop), so TCP and TLS
+connections to the API are kept alive and reused instead of being
+re-established on every call. Each call's latency is logged and added to
+in-process metrics (see ``get_metrics``).
+
+Calls are throttled by the shared token bucket in ``ratelimit`` and retried
+on 429/5xx responses, waiting as the API's rate-limit headers ask. While a
+model's circuit breaker is open (see ``circuit``), calls to it raise
+``CircuitOpenError`` without touching the network.
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+import weakref
+
+import httpx
+import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+
+from . import circuit, ratelimit
+
+logger = logging.getLogger(__name__)
+
+# Load API key
+load_dotenv()
+GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+
+_session = None
+_session_lock = threading.Lock()
+
+_async_clients = weakref.WeakKeyDictionary()
+
+_metrics = {}
+_metrics_lock = threading.Lock()
+
+
+def get_session():
+    """Return the process-wide keep-alive session, creating it on first use."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=1, pool_maxsize=settings.GROQ_POOL_SIZE, pool_block=False
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update({
+                "Authorization": f"Bearer {GROQ_API_KEY}",
+                "Content-Type": "application/json",
+            })
+            _session = session
+        return _session
+
+
+def chat_completion(model, messages, timeout=None, **options):
+    """POST a chat completion request and return the ``requests.Response``.
+
+    ``timeout`` is the read timeout in seconds (``GROQ_READ_TIMEOUT`` by
+    default); extra keyword arguments are sent as request options.
+    Network errors are recorded and re-raised.
+
+    Retryable responses are retried up to ``GROQ_MAX_RETRIES`` times. If no
+    request slot frees up within ``GROQ_RATE_LIMIT_MAX_WAIT`` seconds, a
+    local 429 response is returned without calling the API. Raises
+    ``circuit.CircuitOpenError`` while the model's circuit is open.
+    """
+    payload = {"model": model, "messages": messages, **options}
+    return _send(model, payload, timeout)
+
+
+def stream_chat_completion(model, messages, timeout=None, **options):
+    """Yield the content deltas of a streamed chat completion as they arrive.
+
+    Rate limiting and retries apply until the stream opens; a response
+    other than 200 raises ``requests.HTTPError``. ``timeout`` is the
+    longest wait between chunks.
+    """
+    payload = {"model": model, "messages": messages, **options, "stream": True}
+    response = _send(model, payload, timeout, stream=True)
+    with response:
+        if response.status_code != 200:
+            logger.error(f"Groq API Error ({response.status_code}): {response.text}")
+            response.raise_for_status()
+            raise requests.HTTPError(f"Unexpected status {response.status_code}", response=response)
+        # SSE is UTF-8 by definition; requests would assume ISO-8859-1 for a
+        # text/* response without a charset.
+        response.encoding = "utf-8"
+        for line in response.iter_lines(decode_unicode=True):
+            if not line or not line.startswith("data:"):
+                continue
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                return
+            try:
+                choice = json.loads(data)["choices"][0]
+            except (ValueError, KeyError, IndexError):
+                logger.warning(f"Skipping malformed stream chunk: {data[:200]}")
+                continue
+            delta = (choice.get("delta") or {}).get("content")
+            if delta:
+                yield delta
+
+
+def _send(model, payload, timeout, stream=False):
+    deadline = time.monotonic() + settings.GROQ_RATE_LIMIT_MAX_WAIT
+    response = None
+    for attempt in range(settings.GROQ_MAX_RETRIES + 1):
+        try:
+            circuit.check(model)
+        except circuit.CircuitOpenError:
+            # Stop retrying once the circuit has opened; keep the last response.
+            if response is None:
+                raise
+            return response
+        if not ratelimit.acquire(model, deadline):
+            return response or _throttled_response(model)
+        response = _post(model, payload, timeout, stream)
+        delay = ratelimit.retry_delay(model, response, attempt)
+        if delay is None or time.monotonic() + delay > deadline:
+            break
+        if attempt < settings.GROQ_MAX_RETRIES:
+            logger.warning(f"Groq {model} -> {response.status_code}; retrying in {delay:.1f}s")
+            response.close()
+            time.sleep(delay)
+    return response
+
+
+def _post(model, payload, timeout, stream=False):
+    read_timeout = timeout or settings.GROQ_READ_TIMEOUT
+    started = time.perf_counter()
+    try:
+        response = get_session().post(
+            settings.GROQ_API_URL,
+            json=payload,
+            timeout=(settings.GROQ_CONNECT_TIMEOUT, read_timeout),
+            stream=stream,
+        )
+    except requests.RequestException as e:
+        elapsed = time.perf_counter() - started
+        _record(model, None, elapsed)
+        circuit.record_status(model, None)
+        logger.warning(f"Groq {model} call failed after {elapsed:.2f}s: {e}")
+        raise
+
+    elapsed = time.perf_counter() - started
+    _record(model, response.status_code, elapsed)
+    circuit.record_status(model, response.status_code)
+    logger.info(f"Groq {model} -> {response.status_code} in {elapsed:.2f}s")
+    return response
+
+
+def get_async_client():
+    """Return the keep-alive ``httpx.AsyncClient`` for the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = httpx.AsyncClient(
+            headers={
+                "Authorization": f"Bearer {GROQ_API_KEY}",
+                "Content-Type": "application/json",
+            },
+            limits=httpx.Limits(
+                max_connections=settings.GROQ_ASYNC_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.GROQ_POOL_SIZE,
+            ),
+        )
+        _async_clients[loop] = client
+    return client
+
+
+async def achat_completion(model, messages, timeout=None, **options):
+    """Async version of ``chat_completion``; returns an ``httpx.Response``."""
+    payload = {"model": model, "messages": messages, **options}
+    deadline = time.monotonic() + settings.GROQ_RATE_LIMIT_MAX_WAIT
+    response = None
+    for attempt in range(settings.GROQ_MAX_RETRIES + 1):
+        try:
+            await sync_to_async(circuit.check)(model)
+        except circuit.CircuitOpenError:
+            if response is None:
+                raise
+            return response
+        if not await ratelimit.aacquire(model, deadline):
+            return response or _athrottled_response(model)
+        response = await _apost(model, payload, timeout)
+        delay = await sync_to_async(ratelimit.retry_delay)(model, response, attempt)
+        if delay is None or time.monotonic() + delay > deadline:
+            break
+        if attempt < settings.GROQ_MAX_RETRIES:
+            logger.warning(f"Groq {model} -> {response.status_code}; retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+    return response
+
+
+async def _apost(model, payload, timeout):
+    read_timeout = timeout or settings.GROQ_READ_TIMEOUT
+    started = time.perf_counter()
+    try:
+        response = await get_async_client().post(
+            settings.GROQ_API_URL,
+            json=payload,
+            timeout=httpx.Timeout(read_timeout, connect=settings.GROQ_CONNECT_TIMEOUT),
+        )
+    except httpx.HTTPError as e:
+        elapsed = time.perf_counter() - started
+        _record(model, None, elapsed)
+        await sync_to_async(circuit.record_status)(model, None)
+        logger.warning(f"Groq {model} call failed after {elapsed:.2f}s: {e}")
+        raise
+
+    elapsed = time.perf_counter() - started
+    _record(model, response.status_code, elapsed)
+    await sync_to_async(circuit.record_status)(model, response.status_code)
+    logger.info(f"Groq {model} -> {response.status_code} in {elapsed:.2f}s")
+    return response
+
+
+def _throttle_body(model):
+    logger.warning(f"Groq {model} not called: client-side rate limit still exhausted")
+    return {"error": {"message": "Rate limit reached; request not sent.", "type": "client_rate_limited"}}
+
+
+def _throttled_response(model):
+    """Local stand-in for a 429, for calls the rate limiter never sent."""
+    response = requests.Response()
+    response.status_code = 429
+    response.url = settings.GROQ_API_URL
+    response.headers["Content-Type"] = "application/json"
+    response._content = json.dumps(_throttle_body(model)).encode("utf-8")
+    return response
+
+
+def _athrottled_response(model):
+    return httpx.Response(
+        429, json=_throttle_body(model), request=httpx.Request("POST", settings.GROQ_API_URL)
+    )
+
+
+def _record(model, status_code, seconds):
+    with _metrics_lock:
+        stats = _metrics.setdefault(model, {
+            "calls": 0,
+            "errors": 0,
+            "total_seconds": 0.0,
+            "max_seconds": 0.0,
+            "statuses": {},
+        })
+        stats["calls"] += 1
+        stats["total_seconds"] += seconds
+        stats["max_seconds"] = max(stats["max_seconds"], seconds)
+        if status_code is None or status_code >= 400:
+            stats["errors"] += 1
+        key = str(status_code or "network_error")
+        stats["statuses"][key] = stats["statuses"].get(key, 0) + 1
+
+
+def get_metrics():
+    """Return per-model call counts and latencies recorded by this process."""
+    with _metrics_lock:
+        return {
+            model: {
+                **stats,
+                "statuses": dict(stats["statuses"]),
+                "avg_seconds": round(stats["total_seconds"] / stats["calls"], 4) if stats["calls"] else 0.0,
+            }
+            for model, stats in _metrics.items()
+        }
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="ExtractedText",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("content_hash", models.CharField(max_length=64)),
+                ("extractor_version", models.CharField(max_length=20)),
+                ("text", models.TextField(blank=True)),
+                (
+                    "method",
+                    models.CharField(
+                        choices=[("text", "Text layer"), ("ocr", "OCR")], max_length=10
+                    ),
+                ),
+                ("timings", models.JSONField(default=dict)),
+                ("size", models.PositiveIntegerField(default=0)),
+                ("hits", models.PositiveIntegerField(default=0)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("last_used_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["last_used_at"], name="ai_extracte_last_us_c9a594_idx"
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("content_hash", "extractor_version"),
+                        name="unique_extracted_text_version",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ai", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="extractedtext",
+            name="pages",
+            field=models.JSONField(default=list),
+        ),
+        migrations.AlterField(
+            model_name="extractedtext",
+            name="method",
+            field=models.CharField(
+                choices=[
+                    ("text", "Text layer"),
+                    ("ocr", "OCR"),
+                    ("hybrid", "Text layer + OCR"),
+                ],
+                max_length=10,
+            ),
+        ),
+    ]
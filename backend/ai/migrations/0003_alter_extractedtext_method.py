@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ai", "0002_extractedtext_pages_alter_extractedtext_method"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="extractedtext",
+            name="method",
+            field=models.CharField(
+                choices=[
+                    ("text", "Text layer"),
+                    ("ocr", "OCR"),
+                    ("hybrid", "Text layer + OCR"),
+                    ("docx", "DOCX"),
+                ],
+                max_length=10,
+            ),
+        ),
+    ]
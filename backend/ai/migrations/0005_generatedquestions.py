@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:22
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ai", "0004_aijob"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="GeneratedQuestions",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("text_hash", models.CharField(max_length=64)),
+                ("model", models.CharField(max_length=100)),
+                ("prompt_version", models.CharField(max_length=20)),
+                ("questions", models.JSONField(default=list)),
+                ("size", models.PositiveIntegerField(default=0)),
+                ("hits", models.PositiveIntegerField(default=0)),
+                ("created_at", models.DateTimeField(default=django.utils.timezone.now)),
+                ("last_used_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["last_used_at"], name="ai_generate_last_us_2f7612_idx"
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("text_hash", "model", "prompt_version"),
+                        name="unique_generated_questions_version",
+                    )
+                ],
+            },
+        ),
+    ]
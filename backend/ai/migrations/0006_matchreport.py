@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:23
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ai", "0005_generatedquestions"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MatchReport",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("cv_hash", models.CharField(max_length=64)),
+                ("job_hash", models.CharField(max_length=64)),
+                ("position_hash", models.CharField(max_length=64)),
+                ("model", models.CharField(max_length=100)),
+                ("prompt_version", models.CharField(max_length=20)),
+                ("report", models.JSONField(default=dict)),
+                ("size", models.PositiveIntegerField(default=0)),
+                ("hits", models.PositiveIntegerField(default=0)),
+                ("created_at", models.DateTimeField(default=django.utils.timezone.now)),
+                ("last_used_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["last_used_at"], name="ai_matchrep_last_us_67da2c_idx"
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=(
+                            "cv_hash",
+                            "job_hash",
+                            "position_hash",
+                            "model",
+                            "prompt_version",
+                        ),
+                        name="unique_match_report_version",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:25
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ai", "0006_matchreport"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RateLimitBucket",
+            fields=[
+                (
+                    "name",
+                    models.CharField(max_length=100, primary_key=True, serialize=False),
+                ),
+                ("tokens", models.FloatField()),
+                ("updated_at", models.DateTimeField(default=django.utils.timezone.now)),
+                ("blocked_until", models.DateTimeField(blank=True, null=True)),
+                ("version", models.PositiveIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ai", "0007_ratelimitbucket"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="InflightCall",
+            fields=[
+                (
+                    "key",
+                    models.CharField(max_length=64, primary_key=True, serialize=False),
+                ),
+                ("owner", models.CharField(max_length=32)),
+                ("done", models.BooleanField(default=False)),
+                ("result", models.JSONField(blank=True, null=True)),
+                ("expires_at", models.DateTimeField(db_index=True)),
+            ],
+        ),
+    ]
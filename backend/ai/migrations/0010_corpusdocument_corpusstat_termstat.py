@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ai", "0009_circuitbreaker"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CorpusDocument",
+            fields=[
+                (
+                    "content_hash",
+                    models.CharField(max_length=64, primary_key=True, serialize=False),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[("cv", "CV"), ("jd", "Job description")], max_length=10
+                    ),
+                ),
+                ("length", models.PositiveIntegerField(default=0)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="CorpusStat",
+            fields=[
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[("cv", "CV"), ("jd", "Job description")],
+                        max_length=10,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("documents", models.PositiveIntegerField(default=0)),
+                ("total_length", models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="TermStat",
+            fields=[
+                (
+                    "term",
+                    models.CharField(max_length=64, primary_key=True, serialize=False),
+                ),
+                ("df", models.PositiveIntegerField(default=0)),
+            ],
+        ),
+    ]
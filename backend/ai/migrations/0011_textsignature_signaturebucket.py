@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ai", "0010_corpusdocument_corpusstat_termstat"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TextSignature",
+            fields=[
+                (
+                    "text_hash",
+                    models.CharField(max_length=64, primary_key=True, serialize=False),
+                ),
+                ("signature", models.BinaryField()),
+                ("cache_keys", models.JSONField(default=dict)),
+                ("created_at", models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="SignatureBucket",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("bucket", models.BigIntegerField(db_index=True)),
+                (
+                    "text",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="buckets",
+                        to="ai.textsignature",
+                    ),
+                ),
+            ],
+        ),
+    ]
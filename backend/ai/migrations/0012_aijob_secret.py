@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ai", "0011_textsignature_signaturebucket"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="aijob",
+            name="secret",
+            field=models.CharField(blank=True, default="", max_length=64),
+        ),
+    ]
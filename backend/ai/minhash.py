@@ -0,0 +1,134 @@
+"""Near-duplicate CV texts via MinHash signatures and an LSH index.
+
+A résumé re-exported with a new date or a fixed typo hashes differently,
+so the exact-key caches miss it. Every CV text whose questions or match
+reports get cached is remembered here with a MinHash signature over its
+word 3-gram shingles; the signature is split into LSH bands stored as
+``SignatureBucket`` rows. Looking up a new text costs one indexed query
+for the texts sharing any band with it, then the candidates' estimated
+Jaccard similarity is checked against ``NEAR_DUPLICATE_THRESHOLD``.
+
+Signatures depend on ``PERMUTATIONS``, ``BANDS`` and ``SEED``; changing
+them means clearing the ``TextSignature`` table.
+"""
+import hashlib
+import logging
+import re
+import zlib
+
+import numpy as np
+from django.conf import settings
+from django.db import DatabaseError, transaction
+
+from .cache import text_sha256
+from .models import SignatureBucket, TextSignature
+
+logger = logging.getLogger(__name__)
+
+PERMUTATIONS = 128
+# 16 bands of 8 rows: texts with Jaccard similarity 0.8 share a band with
+# probability ~0.94, at 0.5 only ~0.06.
+BANDS = 16
+SHINGLE_WORDS = 3
+SEED = 20251018
+
+_rng = np.random.default_rng(SEED)
+# Multiply-shift hashing: h(x) = (a * x + b mod 2**64) >> 32, with odd a.
+_A = _rng.integers(1, 2 ** 63, size=(PERMUTATIONS, 1), dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+_B = _rng.integers(0, 2 ** 63, size=(PERMUTATIONS, 1), dtype=np.uint64)
+_WORD = re.compile(r"\w+")
+
+
+def _shingles(text):
+    words = _WORD.findall((text or "").lower())
+    if len(words) < SHINGLE_WORDS:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+
+def signature(text):
+    """MinHash signature of a text: ``PERMUTATIONS`` uint32 minima over its shingle hashes."""
+    shingles = _shingles(text)
+    if not shingles:
+        return np.full(PERMUTATIONS, np.iinfo(np.uint32).max, dtype=np.uint32)
+    x = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+    with np.errstate(over="ignore"):
+        hashes = (_A * x + _B) >> np.uint64(32)
+    return hashes.min(axis=1).astype(np.uint32)
+
+
+def similarity(a, b):
+    """Estimated Jaccard similarity of the texts behind two signatures."""
+    return float(np.mean(a == b))
+
+
+def _buckets(sig):
+    rows = PERMUTATIONS // BANDS
+    buckets = []
+    for band in range(BANDS):
+        digest = hashlib.blake2b(
+            band.to_bytes(2, "little") + sig[band * rows:(band + 1) * rows].tobytes(), digest_size=8
+        ).digest()
+        buckets.append(int.from_bytes(digest, "little", signed=True))
+    return buckets
+
+
+def _decode(blob):
+    return np.frombuffer(bytes(blob), dtype=np.uint32)
+
+
+def remember(text, **cache_keys):
+    """Record that ``text`` has results cached under ``cache_keys`` (e.g. ``questions=<text_hash>``)."""
+    if settings.NEAR_DUPLICATE_THRESHOLD <= 0 or not (text or "").strip():
+        return
+    text_hash = text_sha256(text)
+    try:
+        with transaction.atomic():
+            entry = TextSignature.objects.select_for_update().filter(pk=text_hash).first()
+            if entry is not None:
+                if any(entry.cache_keys.get(name) != key for name, key in cache_keys.items()):
+                    entry.cache_keys = {**entry.cache_keys, **cache_keys}
+                    entry.save(update_fields=["cache_keys"])
+                return
+            sig = signature(text)
+            entry = TextSignature.objects.create(text_hash=text_hash, signature=sig.tobytes(), cache_keys=cache_keys)
+            SignatureBucket.objects.bulk_create(SignatureBucket(bucket=b, text=entry) for b in _buckets(sig))
+        _evict()
+    except DatabaseError as e:
+        logger.warning(f"Could not record CV signature: {e}")
+
+
+def _evict():
+    limit = settings.NEAR_DUPLICATE_MAX_TEXTS
+    if limit and TextSignature.objects.count() > limit:
+        stale = TextSignature.objects.order_by("-created_at").values_list("pk", flat=True)[limit:]
+        TextSignature.objects.filter(pk__in=list(stale)).delete()
+
+
+def similar_keys(text, cache):
+    """Cache keys under ``cache`` of remembered texts near-identical to ``text``, most similar first.
+
+    The text itself is excluded (its exact key is looked up separately).
+    Empty when near-duplicate reuse is disabled (threshold 0).
+    """
+    threshold = settings.NEAR_DUPLICATE_THRESHOLD
+    if threshold <= 0 or not (text or "").strip():
+        return []
+    sig = signature(text)
+    text_hash = text_sha256(text)
+    try:
+        candidate_ids = set(
+            SignatureBucket.objects.filter(bucket__in=_buckets(sig)).values_list("text_id", flat=True)
+        )
+        candidate_ids.discard(text_hash)
+        candidates = TextSignature.objects.filter(pk__in=candidate_ids)
+        scored = [
+            (similarity(sig, _decode(entry.signature)), entry.cache_keys[cache])
+            for entry in candidates
+            if cache in entry.cache_keys
+        ]
+    except DatabaseError as e:
+        logger.warning(f"Near-duplicate lookup failed: {e}")
+        return []
+    scored.sort(reverse=True)
+    return [key for score, key in scored if score >= threshold]
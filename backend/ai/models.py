@@ -1,2 +1,238 @@
+import uuid
+
+from django.conf import settings
 from django.db import models
-# Create your models here.
+from django.utils import timezone
+
+
+class ExtractedText(models.Model):
+    """Text extracted from an uploaded CV, keyed by a hash of the file bytes."""
+
+    METHOD_CHOICES = (
+        ("text", "Text layer"),
+        ("ocr", "OCR"),
+        ("hybrid", "Text layer + OCR"),
+        ("docx", "DOCX"),
+    )
+
+    content_hash = models.CharField(max_length=64)
+    extractor_version = models.CharField(max_length=20)
+    text = models.TextField(blank=True)
+    method = models.CharField(max_length=10, choices=METHOD_CHOICES)
+    timings = models.JSONField(default=dict)
+    pages = models.JSONField(default=list)
+    size = models.PositiveIntegerField(default=0)
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["content_hash", "extractor_version"],
+                name="unique_extracted_text_version",
+            )
+        ]
+        indexes = [models.Index(fields=["last_used_at"])]
+
+    def __str__(self):
+        return f"{self.content_hash[:12]} ({self.method})"
+
+
+class GeneratedQuestions(models.Model):
+    """Normalized quiz questions generated for a CV text by a given model and prompt."""
+
+    text_hash = models.CharField(max_length=64)
+    model = models.CharField(max_length=100)
+    prompt_version = models.CharField(max_length=20)
+    questions = models.JSONField(default=list)
+    size = models.PositiveIntegerField(default=0)
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now)
+    last_used_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["text_hash", "model", "prompt_version"],
+                name="unique_generated_questions_version",
+            )
+        ]
+        indexes = [models.Index(fields=["last_used_at"])]
+
+    def __str__(self):
+        return f"{self.text_hash[:12]} ({self.model}, v{self.prompt_version})"
+
+
+class MatchReport(models.Model):
+    """Model-generated match report for a CV, job description and position."""
+
+    cv_hash = models.CharField(max_length=64)
+    job_hash = models.CharField(max_length=64)
+    position_hash = models.CharField(max_length=64)
+    model = models.CharField(max_length=100)
+    prompt_version = models.CharField(max_length=20)
+    report = models.JSONField(default=dict)
+    size = models.PositiveIntegerField(default=0)
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now)
+    last_used_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["cv_hash", "job_hash", "position_hash", "model", "prompt_version"],
+                name="unique_match_report_version",
+            )
+        ]
+        indexes = [models.Index(fields=["last_used_at"])]
+
+    def __str__(self):
+        return f"{self.cv_hash[:12]} vs {self.job_hash[:12]} ({self.model}, v{self.prompt_version})"
+
+
+class TermStat(models.Model):
+    """Number of corpus documents (CVs and job descriptions) containing a term."""
+
+    term = models.CharField(max_length=64, primary_key=True)
+    df = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.term} ({self.df})"
+
+
+class CorpusStat(models.Model):
+    """Document count and total length of the scoring corpus, per kind of document."""
+
+    KIND_CHOICES = (
+        ("cv", "CV"),
+        ("jd", "Job description"),
+    )
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, primary_key=True)
+    documents = models.PositiveIntegerField(default=0)
+    total_length = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.kind}: {self.documents} documents"
+
+
+class CorpusDocument(models.Model):
+    """A document already counted in ``TermStat``, so it is never counted twice."""
+
+    content_hash = models.CharField(max_length=64, primary_key=True)
+    kind = models.CharField(max_length=10, choices=CorpusStat.KIND_CHOICES)
+    length = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.kind} {self.content_hash[:12]}"
+
+
+class TextSignature(models.Model):
+    """MinHash signature of a CV text with cached results, for near-duplicate lookups (see ``ai.minhash``)."""
+
+    text_hash = models.CharField(max_length=64, primary_key=True)
+    signature = models.BinaryField()
+    # Cache keys the text's results are stored under, by cache ("questions", "match").
+    cache_keys = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.text_hash[:12]} ({', '.join(self.cache_keys)})"
+
+
+class SignatureBucket(models.Model):
+    """One LSH band of a ``TextSignature``; texts sharing a bucket are near-duplicate candidates."""
+
+    bucket = models.BigIntegerField(db_index=True)
+    text = models.ForeignKey(TextSignature, on_delete=models.CASCADE, related_name="buckets")
+
+    def __str__(self):
+        return f"{self.bucket} -> {self.text_id[:12]}"
+
+
+class RateLimitBucket(models.Model):
+    """Token bucket for Groq requests to one model, shared by every worker process."""
+
+    name = models.CharField(max_length=100, primary_key=True)
+    tokens = models.FloatField()
+    updated_at = models.DateTimeField(default=timezone.now)
+    blocked_until = models.DateTimeField(null=True, blank=True)
+    version = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name} ({self.tokens:.2f} tokens)"
+
+
+class CircuitBreaker(models.Model):
+    """Health of the LLM API for one model, shared by every worker process."""
+
+    STATE_CHOICES = (
+        ("closed", "Closed"),
+        ("open", "Open"),
+        ("half_open", "Half-open"),
+    )
+
+    name = models.CharField(max_length=100, primary_key=True)
+    state = models.CharField(max_length=10, choices=STATE_CHOICES, default="closed")
+    failures = models.PositiveIntegerField(default=0)
+    open_until = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.state})"
+
+
+class InflightCall(models.Model):
+    """Lease on an LLM call in progress, so identical calls in other workers wait for it.
+
+    Once the call finishes, ``result`` holds its return value until the lease expires.
+    """
+
+    key = models.CharField(max_length=64, primary_key=True)
+    owner = models.CharField(max_length=32)
+    done = models.BooleanField(default=False)
+    result = models.JSONField(null=True, blank=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.key[:12]} ({'done' if self.done else 'running'})"
+
+
+class AIJob(models.Model):
+    """Question generation or job matching run on the background worker pool."""
+
+    KIND_CHOICES = (
+        ("generate", "Question generation"),
+        ("match", "Job match"),
+    )
+    STATUS_CHOICES = (
+        ("queued", "Queued"),
+        ("running", "Running"),
+        ("succeeded", "Succeeded"),
+        ("failed", "Failed"),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        null=True,
+        blank=True,
+        on_delete=models.CASCADE,
+        related_name="ai_jobs",
+    )
+    # Jobs queued anonymously can only be polled with this secret.
+    secret = models.CharField(max_length=64, blank=True, default="")
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="queued")
+    payload = models.JSONField(default=dict)
+    upload = models.FileField(upload_to="jobs/", blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.kind} {self.id} ({self.status})"
@@ -0,0 +1,167 @@
+"""Parallel OCR for scanned CVs.
+
+Pages are rasterized and recognized independently on a process pool shared
+by the whole worker process, so a multi-page scan finishes in roughly the
+time of its slowest page instead of the sum of all pages.
+
+Each page gets what is left of the document's budget as a timeout for its
+poppler and tesseract subprocesses, which are killed when it runs out: a
+page that times out frees its pool worker instead of occupying it until
+the OCR finishes. The pool's processes are started by a fork server, not
+forked from a (threaded) web worker.
+"""
+import logging
+import multiprocessing
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pytesseract
+from django.conf import settings
+from pdf2image import convert_from_path
+
+logger = logging.getLogger(__name__)
+
+# Methods reported for flagged pages whose OCR did not finish; such pages
+# keep their (sparse) text layer.
+OCR_TIMEOUT = "ocr_timeout"
+OCR_ERROR = "ocr_error"
+OCR_FAILURES = (OCR_TIMEOUT, OCR_ERROR)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.OCR_WORKERS, mp_context=multiprocessing.get_context(method)
+            )
+        return _executor
+
+
+def _reset_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def ocr_page(path, page_number, dpi, timeout=None):
+    """Rasterize a single PDF page in grayscale and OCR it; return ``(text, seconds)``.
+
+    With ``timeout`` (seconds) the rasterizer and tesseract are killed once
+    it runs out, raising an error.
+    """
+    started = time.perf_counter()
+    images = convert_from_path(
+        path, dpi=dpi, grayscale=True, first_page=page_number, last_page=page_number, timeout=timeout
+    )
+    text = ""
+    for img in images:
+        remaining = 0
+        if timeout is not None:
+            remaining = timeout - (time.perf_counter() - started)
+            if remaining <= 0:  # tesseract takes 0 as "no timeout"
+                raise RuntimeError("OCR timed out")
+        text += pytesseract.image_to_string(img, timeout=remaining)
+    return text, time.perf_counter() - started
+
+
+def _submit(path, page_number, dpi, timeout):
+    if settings.OCR_WORKERS <= 1:
+        future = Future()
+        try:
+            future.set_result(ocr_page(path, page_number, dpi, timeout))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+    return _get_executor().submit(ocr_page, path, page_number, dpi, timeout)
+
+
+def iter_ocr_pages(pages, open_path, timeout=None):
+    """Yield ``(page_number, method, text, seconds)`` for each page, in order.
+
+    ``pages`` yields ``(page_number, text, seconds, needs_ocr)`` from the PDF
+    text layer. Flagged pages are OCR'd and the rest pass through untouched;
+    ``open_path()`` is called on the first flagged page and must return a
+    filesystem path to the PDF.
+
+    At most ``OCR_WORKERS`` pages are in flight, each rasterized at
+    ``OCR_DPI``, so memory stays bounded however long the document is, and
+    pages after the caller stops iterating are never rendered. Once the
+    per-document ``timeout`` (``OCR_TIMEOUT`` seconds by default) runs out,
+    pages still being OCR'd are stopped and they and the remaining pages
+    keep their text layer. Flagged pages that were not
+    OCR'd (budget exhausted or OCR error) are yielded with method
+    ``OCR_TIMEOUT`` or ``OCR_ERROR`` so callers know the text is incomplete.
+    """
+    timeout = settings.OCR_TIMEOUT if timeout is None else timeout
+    deadline = time.monotonic() + timeout
+    dpi = settings.OCR_DPI
+    window = max(settings.OCR_WORKERS, 1)
+
+    pages = iter(pages)
+    pending = deque()
+    path = None
+    try:
+        while True:
+            while len(pending) < window:
+                item = next(pages, None)
+                if item is None:
+                    break
+                number, text, seconds, needs_ocr = item
+                future = None
+                if needs_ocr:
+                    if time.monotonic() < deadline:
+                        if path is None:
+                            path = open_path()
+                        future = _submit(path, number, dpi, deadline - time.monotonic())
+                    else:
+                        future = OCR_TIMEOUT
+                pending.append((number, text, seconds, future))
+            if not pending:
+                return
+
+            number, text, seconds, future = pending.popleft()
+            if future is None:
+                yield number, "text", text, seconds
+                continue
+            if future == OCR_TIMEOUT:
+                yield number, OCR_TIMEOUT, text, seconds
+                continue
+
+            try:
+                ocr_text, ocr_seconds = future.result(
+                    timeout=max(deadline - time.monotonic(), 0)
+                )
+            except TimeoutError:
+                logger.warning(f"OCR budget of {timeout}s exceeded at page {number}; using its text layer")
+                future.cancel()
+                yield number, OCR_TIMEOUT, text, seconds
+                continue
+            except BrokenProcessPool:
+                raise
+            except Exception as e:
+                if time.monotonic() >= deadline:
+                    # The worker's own timeout fired first.
+                    logger.warning(f"OCR budget of {timeout}s exceeded at page {number}; using its text layer")
+                    yield number, OCR_TIMEOUT, text, seconds
+                    continue
+                logger.error(f"OCR failed on page {number}: {e}")
+                yield number, OCR_ERROR, text, seconds
+                continue
+            yield number, "ocr", ocr_text, seconds + ocr_seconds
+    except BrokenProcessPool:
+        _reset_executor()
+        raise
+    finally:
+        for _, _, _, future in pending:
+            if isinstance(future, Future):
+                future.cancel()
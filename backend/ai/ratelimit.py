@@ -0,0 +1,176 @@
+"""Client-side rate limiting for Groq calls, shared across worker processes.
+
+Each model has a token bucket in the database (``RateLimitBucket``) that
+refills at ``GROQ_RATE_LIMIT_RPM`` requests per minute up to
+``GROQ_RATE_LIMIT_BURST``. Every call takes a token before it is sent, so
+all gunicorn workers draw from the same budget. When the API answers with
+``Retry-After`` or exhausted ``x-ratelimit-*`` headers the bucket is paused
+until the server's reset time, for every worker at once. Retries use the
+server's delay when it gives one and jittered exponential backoff
+otherwise. If the bucket can't be read or written the call goes ahead
+unthrottled; those fail-open events are logged and counted per model
+(``fail_open_counts``).
+"""
+import asyncio
+import logging
+import random
+import re
+import threading
+import time
+from datetime import timedelta
+from email.utils import parsedate_to_datetime
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DatabaseError
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import RateLimitBucket
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = {429, 502, 503, 504}
+
+# Groq reports reset times as durations such as "2m59.56s" or "120ms".
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"h": 3600, "m": 60, "s": 1, "ms": 0.001}
+
+_fail_open = {}
+_fail_open_lock = threading.Lock()
+
+
+def _reserve(name):
+    """Take a token from the bucket; return 0, or the seconds to wait for one."""
+    rate = settings.GROQ_RATE_LIMIT_RPM / 60
+    burst = max(settings.GROQ_RATE_LIMIT_BURST, 1)
+    try:
+        # Optimistic concurrency: a write only lands if nobody else updated
+        # the bucket since we read it.
+        for _ in range(5):
+            now = timezone.now()
+            bucket, _ = RateLimitBucket.objects.get_or_create(
+                name=name, defaults={"tokens": burst, "updated_at": now}
+            )
+            if bucket.blocked_until and bucket.blocked_until > now:
+                return (bucket.blocked_until - now).total_seconds()
+            if rate <= 0:
+                return 0
+
+            elapsed = max((now - bucket.updated_at).total_seconds(), 0)
+            tokens = min(burst, bucket.tokens + elapsed * rate)
+            if tokens < 1:
+                return (1 - tokens) / rate
+            claimed = RateLimitBucket.objects.filter(name=name, version=bucket.version).update(
+                tokens=tokens - 1, updated_at=now, version=F("version") + 1
+            )
+            if claimed:
+                return 0
+    except DatabaseError as e:
+        with _fail_open_lock:
+            count = _fail_open[name] = _fail_open.get(name, 0) + 1
+        logger.warning(f"Rate limiter unavailable, not throttling {name} ({count} times so far): {e}")
+        return 0
+    return random.uniform(0.01, 0.1)
+
+
+def fail_open_counts():
+    """Return how often each bucket let a call through unthrottled in this process."""
+    with _fail_open_lock:
+        return dict(_fail_open)
+
+
+def _pause(name, seconds):
+    """Block the bucket for every worker until ``seconds`` from now."""
+    until = timezone.now() + timedelta(seconds=seconds)
+    try:
+        RateLimitBucket.objects.get_or_create(
+            name=name, defaults={"tokens": 0, "updated_at": timezone.now()}
+        )
+        RateLimitBucket.objects.filter(
+            Q(blocked_until__isnull=True) | Q(blocked_until__lt=until), name=name
+        ).update(blocked_until=until, version=F("version") + 1)
+    except DatabaseError as e:
+        logger.warning(f"Could not pause rate limiter for {name}: {e}")
+
+
+def acquire(name, deadline):
+    """Wait for a request token; return False if it can't be had by ``deadline``.
+
+    ``deadline`` is a ``time.monotonic()`` timestamp.
+    """
+    while True:
+        wait = _reserve(name)
+        if wait <= 0:
+            return True
+        if time.monotonic() + wait > deadline:
+            return False
+        time.sleep(_jitter(wait))
+
+
+async def aacquire(name, deadline):
+    """Async version of ``acquire``."""
+    while True:
+        wait = await sync_to_async(_reserve)(name)
+        if wait <= 0:
+            return True
+        if time.monotonic() + wait > deadline:
+            return False
+        await asyncio.sleep(_jitter(wait))
+
+
+def retry_delay(name, response, attempt):
+    """Record the rate-limit headers of ``response``; return seconds to wait before a retry.
+
+    Returns None when the response is not worth retrying.
+    """
+    server_delay = _server_delay(response.headers)
+    if server_delay:
+        _pause(name, server_delay)
+    if response.status_code not in RETRY_STATUSES:
+        return None
+    if server_delay:
+        return server_delay + random.uniform(0, settings.GROQ_BACKOFF_BASE)
+    return backoff(attempt)
+
+
+def backoff(attempt):
+    """Full-jitter exponential backoff for the given retry attempt (0-based)."""
+    cap = min(settings.GROQ_BACKOFF_MAX, settings.GROQ_BACKOFF_BASE * 2 ** attempt)
+    return random.uniform(0, cap)
+
+
+def _server_delay(headers):
+    """Seconds the API asked us to hold off, from Retry-After or exhausted x-ratelimit-* headers."""
+    delays = [_parse_retry_after(headers.get("retry-after"))]
+    for kind in ("requests", "tokens"):
+        if headers.get(f"x-ratelimit-remaining-{kind}") == "0":
+            delays.append(_parse_duration(headers.get(f"x-ratelimit-reset-{kind}")))
+    return max((d for d in delays if d), default=None)
+
+
+def _parse_retry_after(value):
+    if not value:
+        return None
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+    try:
+        return max((parsedate_to_datetime(value) - timezone.now()).total_seconds(), 0)
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_duration(value):
+    if not value:
+        return None
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return _parse_retry_after(value)
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+def _jitter(wait):
+    # Spread out workers that were told to wait the same amount.
+    return wait + random.uniform(0, min(wait, 1.0) * 0.2)
@@ -0,0 +1,198 @@
+"""Local BM25 scoring of a CV against a job description.
+
+Used for the heuristic job match when the LLM is unavailable. Term weights
+come from document frequencies over the corpus of stored CVs and job
+descriptions seen so far (``TermStat``/``CorpusStat``), which grow
+incrementally as documents arrive. Scoring itself reads an in-process
+snapshot of those tables and costs no queries. A CV's term counts and
+skills are memoized by text hash, so scoring one CV against many jobs
+pays for its analysis (3-5 ms for a full-length CV) once; each further
+job takes one to two milliseconds, mostly finding the job's skills.
+"""
+import logging
+import math
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, transaction
+from django.db.models import F
+
+from .cache import text_sha256
+from .models import CorpusDocument, CorpusStat, TermStat
+from .skills import taxonomy
+
+logger = logging.getLogger(__name__)
+
+# BM25 parameters (standard values).
+K1 = 1.2
+B = 0.75
+# Position terms count this many times in the query.
+POSITION_WEIGHT = 2
+MAX_TERM_LENGTH = 64
+# CVs whose term counts and skills are kept in memory; one CV is usually
+# scored against many jobs.
+CV_CACHE_SIZE = 256
+
+STOPWORDS = frozenset({
+    "the", "and", "for", "with", "that", "this", "your", "you", "are", "our", "job", "role", "a", "an",
+    "to", "of", "in", "on", "as", "by", "be", "is", "at", "we", "us", "they", "he", "she", "it", "from",
+    "or", "will", "have", "has", "had", "not", "but", "if", "then", "than", "into", "within", "per",
+    "about", "over", "under", "across", "out", "up", "down",
+})
+_TOKEN = re.compile(r"[a-z0-9+#.\-]+")
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+_cvs = OrderedDict()
+_cvs_lock = threading.Lock()
+
+
+def terms(text):
+    """Return the text's terms in order, repeats included (lowercased, stopwords dropped)."""
+    found = (token.strip(".-") for token in _TOKEN.findall((text or "").lower()))
+    return [t for t in found if 2 < len(t) <= MAX_TERM_LENGTH and t not in STOPWORDS]
+
+
+class _Snapshot:
+    def __init__(self, df, documents, avg_cv_length, loaded_at):
+        self.df = df
+        self.documents = documents
+        self.avg_cv_length = avg_cv_length
+        self.loaded_at = loaded_at
+
+    def idf(self, term):
+        df = self.df.get(term, 0)
+        return math.log(1 + (self.documents - df + 0.5) / (df + 0.5))
+
+
+def _get_snapshot():
+    """Return the cached corpus statistics, reloading them every ``SCORING_STATS_TTL`` seconds."""
+    global _snapshot
+    with _snapshot_lock:
+        if _snapshot is not None and time.monotonic() - _snapshot.loaded_at < settings.SCORING_STATS_TTL:
+            return _snapshot
+        try:
+            df = dict(TermStat.objects.values_list("term", "df"))
+            stats = {s.kind: s for s in CorpusStat.objects.all()}
+        except DatabaseError as e:
+            logger.warning(f"Scoring statistics unavailable: {e}")
+            df, stats = {}, {}
+        cv = stats.get("cv")
+        documents = sum(s.documents for s in stats.values())
+        avg_cv_length = cv.total_length / cv.documents if cv and cv.documents else 0
+        _snapshot = _Snapshot(df, documents, avg_cv_length, time.monotonic())
+        return _snapshot
+
+
+def invalidate():
+    """Drop the in-process statistics so the next score reloads them."""
+    global _snapshot
+    with _snapshot_lock:
+        _snapshot = None
+
+
+def score_match(cv_text, job_description, position="", max_missing=10):
+    """Score how well ``cv_text`` covers a job; return ``(score, missing_keywords)``.
+
+    The job description and position (weighted ``POSITION_WEIGHT``) form the
+    BM25 query and the CV is the document. The raw score is divided by the
+    score a CV containing every query term would get, then mapped onto
+    0-100 with the concave curve ``SCORING_CURVE`` (partial coverage of a
+    long posting is normal, so the middle of the range is stretched).
+    Missing keywords are the job's taxonomy skills the CV lacks (synonyms
+    count as the skill), then the absent query terms with the highest weight.
+    """
+    query = Counter(terms(job_description))
+    for term in terms(position):
+        query[term] += POSITION_WEIGHT
+    if not query:
+        return 0, []
+
+    document, cv_skills = _analyze_cv(cv_text)
+    length = sum(document.values())
+    snapshot = _get_snapshot()
+    avg_length = snapshot.avg_cv_length or length or 1
+    norm = K1 * (1 - B + B * length / avg_length)
+
+    score = best = 0.0
+    missing = []
+    for term, weight in query.items():
+        idf = snapshot.idf(term) * weight
+        best += idf * (K1 + 1)
+        tf = document.get(term, 0)
+        if tf:
+            score += idf * tf * (K1 + 1) / (tf + norm)
+        else:
+            missing.append((idf, term))
+
+    ratio = score / best if best else 0.0
+    curve = settings.SCORING_CURVE
+    calibrated = (1 - math.exp(-curve * ratio)) / (1 - math.exp(-curve)) if curve else ratio
+    missing.sort(key=lambda item: (-item[0], item[1]))
+    keywords = _missing_skills(cv_skills, f"{job_description}\n{position}", missing)
+    return max(0, min(100, round(calibrated * 100))), keywords[:max_missing]
+
+
+def _analyze_cv(cv_text):
+    """Return a CV's ``(term_counts, skills)``, memoized by text hash."""
+    key = text_sha256(cv_text or "")
+    with _cvs_lock:
+        analysis = _cvs.get(key)
+        if analysis is not None:
+            _cvs.move_to_end(key)
+            return analysis
+    analysis = Counter(terms(cv_text)), frozenset(skill for _, _, skill in taxonomy().find(cv_text))
+    with _cvs_lock:
+        _cvs[key] = analysis
+        while len(_cvs) > CV_CACHE_SIZE:
+            _cvs.popitem(last=False)
+    return analysis
+
+
+def _missing_skills(cv_skills, job_text, missing_terms):
+    """Job skills absent from the CV, then the missing terms that aren't part of a skill mention."""
+    skills, in_skills = [], set()
+    for matched, skill in taxonomy().spans(job_text):
+        in_skills.update(terms(matched))
+        if skill not in cv_skills and skill.name not in skills:
+            skills.append(skill.name)
+    return skills + [term for _, term in missing_terms if term not in in_skills]
+
+
+def add_document(text, kind):
+    """Count a CV (``kind="cv"``) or job description (``"jd"``) in the corpus statistics.
+
+    Documents are identified by a hash of their terms, so adding the same
+    one again is a no-op. Job descriptions stop being counted once
+    ``SCORING_MAX_JOB_DOCUMENTS`` are. Safe to run concurrently from
+    several workers.
+    """
+    doc_terms = terms(text)
+    if not doc_terms:
+        return False
+    content_hash = text_sha256(" ".join(doc_terms))
+    unique = sorted(set(doc_terms))
+    limit = settings.SCORING_MAX_JOB_DOCUMENTS
+    try:
+        if kind == "jd" and limit and CorpusStat.objects.filter(kind=kind, documents__gte=limit).exists():
+            return False
+        with transaction.atomic():
+            CorpusDocument.objects.create(content_hash=content_hash, kind=kind, length=len(doc_terms))
+            TermStat.objects.bulk_create(
+                [TermStat(term=term, df=0) for term in unique], ignore_conflicts=True, batch_size=500
+            )
+            for start in range(0, len(unique), 500):
+                TermStat.objects.filter(term__in=unique[start:start + 500]).update(df=F("df") + 1)
+            CorpusStat.objects.get_or_create(kind=kind)
+            CorpusStat.objects.filter(kind=kind).update(
+                documents=F("documents") + 1, total_length=F("total_length") + len(doc_terms)
+            )
+    except IntegrityError:
+        return False  # already counted
+    except DatabaseError as e:
+        logger.warning(f"Could not add {kind} document to scoring corpus: {e}")
+        return False
+    return True
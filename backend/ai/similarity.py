@@ -0,0 +1,136 @@
+"""Local CV/job similarity from hashed character n-gram vectors.
+
+No model is downloaded: texts are turned into vectors by feature hashing
+their character 3-5-grams into ``SIMILARITY_DIMENSIONS`` buckets, so
+spelling variants ("Postgres"/"PostgreSQL", "React.js"/"React") still
+share most of their features, plus one feature per taxonomy skill
+mentioned, so synonyms with nothing in common ("ML"/"machine learning")
+meet too. CVs are vectorized section by section, skills weighing more
+than hobbies. Vectors are cached per document hash and comparing one text
+with many is a single matrix-vector product, which makes this cheap
+enough to use both as the heuristic match score and as a pre-filter
+before spending LLM calls.
+"""
+import math
+import re
+import threading
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+from django.conf import settings
+
+from .cache import text_sha256
+from .compaction import split_sections
+from .skills import taxonomy
+
+NGRAM_SIZES = (3, 4, 5)
+# Weight of one skill mention relative to the (log-scaled) n-gram counts.
+SKILL_WEIGHT = 3.0
+SECTION_WEIGHTS = {
+    "skills": 2.0, "experience": 1.0, "projects": 1.0, "summary": 1.0, "certifications": 0.75,
+    "education": 0.5, "header": 0.25, "languages": 0.25, "awards": 0.25, "publications": 0.25,
+    "volunteering": 0.25, "interests": 0.1, "references": 0.0,
+}
+_PRIME = np.uint64(1099511628211)
+_NOISE = re.compile(r"[^\w+#]+")
+
+_vectors = OrderedDict()
+_vectors_lock = threading.Lock()
+
+
+def _ngram_counts(text, dimensions):
+    """Signed bucket counts of the text's character n-grams."""
+    padded = f" {_NOISE.sub(' ', (text or '').lower()).strip()} "
+    codes = np.frombuffer(padded.encode("utf-8"), dtype=np.uint8).astype(np.uint64)
+    hashes = []
+    with np.errstate(over="ignore"):
+        for size in NGRAM_SIZES:
+            count = len(codes) - size + 1
+            if count <= 0:
+                continue
+            h = np.full(count, size, dtype=np.uint64)
+            for offset in range(size):
+                h = (h ^ codes[offset:offset + count]) * _PRIME
+            hashes.append(h ^ (h >> np.uint64(29)))
+    if not hashes:
+        return np.zeros(dimensions, dtype=np.float64)
+    h = np.concatenate(hashes)
+    signs = ((h >> np.uint64(63)).astype(np.float64) * 2) - 1
+    return np.bincount((h % np.uint64(dimensions)).astype(np.intp), weights=signs, minlength=dimensions)
+
+
+def _vectorize(text, dimensions):
+    """Unit vector for one text: log-scaled n-gram counts plus skill features."""
+    counts = _ngram_counts(text, dimensions)
+    vector = np.sign(counts) * np.log1p(np.abs(counts))
+    for skill, mentions in taxonomy().count(text):
+        feature = zlib.crc32(f"skill:{skill.name}".encode("utf-8"))
+        sign = 1.0 if feature & 1 else -1.0
+        vector[(feature >> 1) % dimensions] += sign * SKILL_WEIGHT * (1 + math.log(mentions))
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def _cached(kind, text, build):
+    key = (kind, settings.SIMILARITY_DIMENSIONS, text_sha256(text or ""))
+    with _vectors_lock:
+        vector = _vectors.get(key)
+        if vector is not None:
+            _vectors.move_to_end(key)
+            return vector
+    vector = build().astype(np.float32)
+    with _vectors_lock:
+        _vectors[key] = vector
+        while len(_vectors) > settings.SIMILARITY_CACHE_SIZE:
+            _vectors.popitem(last=False)
+    return vector
+
+
+def cv_vector(cv_text):
+    """Unit vector for a CV: the weighted sum of its sections' vectors."""
+    def build():
+        dimensions = settings.SIMILARITY_DIMENSIONS
+        vector = np.zeros(dimensions)
+        for name, section in split_sections(cv_text):
+            weight = SECTION_WEIGHTS.get(name, 0.5)
+            if weight:
+                vector += weight * _vectorize(section, dimensions)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    return _cached("cv", cv_text, build)
+
+
+def job_vector(job_description, position=""):
+    """Unit vector for a job description and its position title."""
+    text = f"{position or ''}\n{job_description or ''}"
+    return _cached("job", text, lambda: _vectorize(text, settings.SIMILARITY_DIMENSIONS))
+
+
+def to_score(cosines):
+    """Map cosine similarities onto 0-100 between ``SIMILARITY_FLOOR`` and ``SIMILARITY_CEILING``."""
+    floor, ceiling = settings.SIMILARITY_FLOOR, settings.SIMILARITY_CEILING
+    scaled = (np.asarray(cosines, dtype=np.float64) - floor) / (ceiling - floor)
+    return np.rint(np.clip(scaled, 0, 1) * 100).astype(int)
+
+
+def score_cvs(job_description, position, cv_texts):
+    """0-100 similarity of each CV in ``cv_texts`` to one job, from one matrix product."""
+    if not cv_texts:
+        return []
+    matrix = np.stack([cv_vector(text) for text in cv_texts])
+    return to_score(matrix @ job_vector(job_description, position)).tolist()
+
+
+def score_jobs(cv_text, jobs):
+    """0-100 similarity of one CV to each ``(job_description, position)`` in ``jobs``."""
+    if not jobs:
+        return []
+    matrix = np.stack([job_vector(description, position) for description, position in jobs])
+    return to_score(matrix @ cv_vector(cv_text)).tolist()
+
+
+def match_score(cv_text, job_description, position=""):
+    """0-100 similarity of a CV to a job."""
+    return score_jobs(cv_text, [(job_description, position)])[0]
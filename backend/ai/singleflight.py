@@ -0,0 +1,207 @@
+"""Coalescing of identical LLM calls that are in flight at the same time.
+
+Callers pass a key identifying the call's input. Within a process, threads
+sharing a key wait for the first one (the leader) and get its result or
+exception. Across processes, leaders take a lease row (``InflightCall``);
+a worker that finds someone else's lease polls it until the result is
+published. If the lease is released without a result or runs out, the
+waiter takes it over and makes the call itself.
+
+Only callers that arrived while the call was in flight share its result: a
+published result found by a caller that never saw the call running is
+discarded and the call is made again, so a later ``refresh`` never gets a
+stale answer. Results the ``share`` predicate rejects (by default empty
+ones, such as the empty question list returned when the model fails) are
+never published; other workers waiting on them make the call themselves.
+
+Results are shared through the database, so they must be JSON-serializable;
+tuples come back as lists.
+"""
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, transaction
+from django.utils import timezone
+
+from .models import InflightCall
+
+logger = logging.getLogger(__name__)
+
+_calls = {}
+_calls_lock = threading.Lock()
+
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def _join(key):
+    """Return ``(call, is_leader)`` for the in-process call registered under ``key``."""
+    with _calls_lock:
+        call = _calls.get(key)
+        if call is not None:
+            return call, False
+        call = _calls[key] = _Call()
+        return call, True
+
+
+def _finish(key, call):
+    with _calls_lock:
+        _calls.pop(key, None)
+    call.event.set()
+
+
+def do(key, fn, *args, share=bool, **kwargs):
+    """Call ``fn(*args, **kwargs)``, sharing the result with concurrent callers of ``key``.
+
+    ``share(result)`` decides whether the result may be handed to waiting workers.
+    """
+    call, leader = _join(key)
+    if not leader:
+        call.event.wait()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    try:
+        call.result = _run_shared(key, fn, args, kwargs, share)
+        return call.result
+    except BaseException as e:
+        call.error = e
+        raise
+    finally:
+        _finish(key, call)
+
+
+async def ado(key, fn, *args, share=bool, **kwargs):
+    """Async version of ``do``; ``fn`` is a coroutine function."""
+    call, leader = _join(key)
+    if not leader:
+        await sync_to_async(call.event.wait, thread_sensitive=False)()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    try:
+        call.result = await _arun_shared(key, fn, args, kwargs, share)
+        return call.result
+    except BaseException as e:
+        call.error = e
+        raise
+    finally:
+        _finish(key, call)
+
+
+def _run_shared(key, fn, args, kwargs, share):
+    owner = uuid.uuid4().hex
+    seen = set()
+    while True:
+        try:
+            lease = _claim(key, owner)
+            if lease is not None and lease.done and lease.owner not in seen:
+                _discard(lease)
+                continue
+        except DatabaseError as e:
+            logger.warning(f"Single-flight lease unavailable, calling directly: {e}")
+            return fn(*args, **kwargs)
+        if lease is None:
+            break
+        if lease.done:
+            return lease.result
+        seen.add(lease.owner)
+        time.sleep(settings.SINGLEFLIGHT_POLL_INTERVAL)
+
+    try:
+        result = fn(*args, **kwargs)
+    except BaseException:
+        _release(key, owner)
+        raise
+    _finish_lease(key, owner, result, share)
+    return result
+
+
+async def _arun_shared(key, fn, args, kwargs, share):
+    owner = uuid.uuid4().hex
+    seen = set()
+    while True:
+        try:
+            lease = await sync_to_async(_claim)(key, owner)
+            if lease is not None and lease.done and lease.owner not in seen:
+                await sync_to_async(_discard)(lease)
+                continue
+        except DatabaseError as e:
+            logger.warning(f"Single-flight lease unavailable, calling directly: {e}")
+            return await fn(*args, **kwargs)
+        if lease is None:
+            break
+        if lease.done:
+            return lease.result
+        seen.add(lease.owner)
+        await asyncio.sleep(settings.SINGLEFLIGHT_POLL_INTERVAL)
+
+    try:
+        result = await fn(*args, **kwargs)
+    except BaseException:
+        await sync_to_async(_release)(key, owner)
+        raise
+    await sync_to_async(_finish_lease)(key, owner, result, share)
+    return result
+
+
+def _claim(key, owner):
+    """Take the lease for ``key`` and return None, or return the live lease held by another worker."""
+    now = timezone.now()
+    InflightCall.objects.filter(expires_at__lt=now).delete()
+    try:
+        with transaction.atomic():
+            InflightCall.objects.create(
+                key=key,
+                owner=owner,
+                expires_at=now + timedelta(seconds=settings.SINGLEFLIGHT_LEASE),
+            )
+        return None
+    except IntegrityError:
+        lease = InflightCall.objects.filter(key=key).first()
+        # Released between our insert and read: try again on the next poll.
+        return lease or InflightCall(key=key, owner="", expires_at=now)
+
+
+def _finish_lease(key, owner, result, share):
+    if share(result):
+        _publish(key, owner, result)
+    else:
+        _release(key, owner)
+
+
+def _discard(lease):
+    """Delete a result published before this caller arrived, so it can make the call afresh."""
+    InflightCall.objects.filter(key=lease.key, owner=lease.owner, done=True).delete()
+
+
+def _publish(key, owner, result):
+    """Store the leader's result for the workers already waiting, then let the lease run out shortly."""
+    try:
+        InflightCall.objects.filter(key=key, owner=owner).update(
+            done=True,
+            result=result,
+            expires_at=timezone.now() + timedelta(seconds=settings.SINGLEFLIGHT_RESULT_TTL),
+        )
+    except (DatabaseError, TypeError, ValueError) as e:
+        logger.warning(f"Could not publish single-flight result: {e}")
+        _release(key, owner)
+
+
+def _release(key, owner):
+    try:
+        InflightCall.objects.filter(key=key, owner=owner).delete()
+    except DatabaseError as e:
+        logger.warning(f"Could not release single-flight lease: {e}")
@@ -0,0 +1,208 @@
+"""Skill taxonomy and a multi-pattern matcher over it.
+
+The skills, their categories (technical/soft) and synonyms live in
+``skills.json`` (``SKILLS_TAXONOMY_PATH``). Every name and synonym is
+compiled once per process into an Aho-Corasick automaton, so finding all
+the skills in a text is one pass over its characters however many
+patterns there are, and multi-word skills ("REST APIs", "project
+management") are found as easily as single words. Matching ignores case
+and runs of whitespace, and only whole words count. Skills whose name is
+also an everyday word ("Rust", "Swift", "Excel") are marked
+``case_sensitive``: their name only matches as written, and their
+synonyms spell out the context ("rust programming").
+"""
+import functools
+import json
+import re
+from bisect import bisect_right
+from collections import deque, namedtuple
+
+from django.conf import settings
+
+Skill = namedtuple("Skill", ["name", "category"])
+
+GENERAL = "General"
+_SPACES = re.compile(r"\s+")
+# Joins the texts of a batch; patterns never contain it, so no match spans two texts.
+_SEPARATOR = "\n"
+
+
+def _normalize(text):
+    return _SPACES.sub(" ", (text or "").lower())
+
+
+def _prepare(text):
+    """Return the text normalized for matching, and with its case kept at the same offsets."""
+    cased = _SPACES.sub(" ", text or "")
+    normalized = cased.lower()
+    # Lowercasing a few rare characters changes the length; case-sensitive
+    # names then can't be checked and don't match.
+    return normalized, cased if len(cased) == len(normalized) else normalized
+
+
+class _Automaton:
+    """Aho-Corasick automaton: trie transitions, failure links and outputs per state."""
+
+    def __init__(self, patterns):
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [()]
+        for pattern, value in patterns:
+            state = 0
+            for char in pattern:
+                following = self.goto[state].get(char)
+                if following is None:
+                    following = len(self.goto)
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append(())
+                    self.goto[state][char] = following
+                state = following
+            self.out[state] += ((len(pattern), value),)
+
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, following in self.goto[state].items():
+                queue.append(following)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                fallback = self.goto[fallback].get(char, 0)
+                self.fail[following] = fallback
+                self.out[following] += self.out[fallback]
+
+    def iter(self, text):
+        """Yield ``(start, end, value)`` for every pattern occurrence, overlapping ones included."""
+        goto, fail, out = self.goto, self.fail, self.out
+        state = 0
+        for end, char in enumerate(text, start=1):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for length, value in out[state]:
+                yield end - length, end, value
+
+
+class Taxonomy:
+    """A set of skills with their synonyms, matched with one compiled automaton."""
+
+    def __init__(self, entries):
+        self.skills = {}
+        patterns = {}
+        for entry in entries:
+            skill = Skill(entry["name"], entry.get("category", "technical"))
+            self.skills[skill.name.lower()] = skill
+            names = list(entry.get("synonyms", []))
+            if entry.get("match_name", True):
+                names.append(skill.name)
+            for name in names:
+                exact = None
+                if entry.get("case_sensitive") and name == skill.name:
+                    exact = _SPACES.sub(" ", name).strip()
+                # First definition wins if two skills claim the same synonym.
+                patterns.setdefault(_normalize(name).strip(), (skill, exact))
+        self._automaton = _Automaton(patterns.items())
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, encoding="utf-8") as fh:
+            return cls(json.load(fh)["skills"])
+
+    def get(self, name):
+        """Return the skill called ``name`` (any case), or None."""
+        return self.skills.get((name or "").lower())
+
+    def find(self, text):
+        """Return ``[(start, end, skill)]`` for the skills in ``text``, in order.
+
+        Offsets are into the normalized text. Where matches overlap the
+        leftmost, then longest, wins ("react native" over "react").
+        """
+        return self._find(*_prepare(text))
+
+    def _find(self, text, cased):
+        size = len(text)
+        candidates = sorted(
+            (start, -end, skill)
+            for start, end, (skill, exact) in self._automaton.iter(text)
+            if (start == 0 or not text[start - 1].isalnum()) and (end == size or not text[end].isalnum())
+            and (exact is None or cased[start:end] == exact)
+        )
+        matches = []
+        covered = 0
+        for start, negative_end, skill in candidates:
+            if start >= covered:
+                matches.append((start, -negative_end, skill))
+                covered = -negative_end
+        return matches
+
+    def spans(self, text):
+        """Return ``[(matched_text, skill)]`` for the skills in ``text``, in order."""
+        text, cased = _prepare(text)
+        return [(text[start:end], skill) for start, end, skill in self._find(text, cased)]
+
+    def count(self, text):
+        """Return ``[(skill, occurrences)]``, most frequent first, then by first occurrence."""
+        return _rank(skill for _, _, skill in self.find(text))
+
+    def tag(self, texts):
+        """Return the ranked skills of each text in ``texts`` from a single pass over all of them."""
+        prepared = [_prepare(text) for text in texts]
+        starts, offset = [], 0
+        for text, _ in prepared:
+            starts.append(offset)
+            offset += len(text) + len(_SEPARATOR)
+        found = [[] for _ in prepared]
+        joined = _SEPARATOR.join(text for text, _ in prepared)
+        for start, _, skill in self._find(joined, _SEPARATOR.join(cased for _, cased in prepared)):
+            found[bisect_right(starts, start) - 1].append(skill)
+        return [_rank(skills) for skills in found]
+
+
+def _rank(skills):
+    counts = {}
+    for skill in skills:
+        counts[skill] = counts.get(skill, 0) + 1
+    # dicts keep first-occurrence order, and sorted() is stable.
+    return sorted(counts.items(), key=lambda item: -item[1])
+
+
+@functools.lru_cache(maxsize=None)
+def taxonomy():
+    """The process-wide taxonomy, loaded and compiled on first use."""
+    return Taxonomy.from_file(settings.SKILLS_TAXONOMY_PATH)
+
+
+def extract_skills(text):
+    """Skills mentioned in a CV or job description: ``[{"name", "category", "count"}]``, most frequent first."""
+    return [
+        {"name": skill.name, "category": skill.category, "count": count}
+        for skill, count in taxonomy().count(text)
+    ]
+
+
+def infer_skill(text):
+    """Name of the skill a question is mainly about, or ``GENERAL``."""
+    ranked = taxonomy().count(text)
+    return ranked[0][0].name if ranked else GENERAL
+
+
+def tag_questions(questions):
+    """Fill in ``skill``/``category`` on quiz questions that lack them, in one pass over the batch.
+
+    Questions whose skill the model named keep it; a missing category is
+    taken from the taxonomy when the skill is known there.
+    """
+    tax = taxonomy()
+    untagged = [q for q in questions if not q.get("skill")]
+    for q, ranked in zip(untagged, tax.tag([q.get("question", "") for q in untagged])):
+        skill = ranked[0][0] if ranked else Skill(GENERAL, "technical")
+        q["skill"] = skill.name
+        q["category"] = skill.category
+    for q in questions:
+        if not q.get("category"):
+            known = tax.get(q["skill"])
+            if known is not None:
+                q["category"] = known.category
+    return questions
@@ -0,0 +1,220 @@
+"""Local stand-in for the Groq chat completions API.
+
+Answers OpenAI-style ``POST .../chat/completions`` requests with canned
+payloads shaped like the ones ``ai_logic`` asks for (quiz questions, job
+match reports, feedback text), after a configurable latency and with
+optional 429/5xx injection, so worker throughput and failure handling can
+be exercised without network access or quota. ``"stream": true`` requests
+get Server-Sent Events like the real API.
+
+Run it with ``python manage.py llmstub`` and set ``GROQ_API_URL`` to the
+URL it prints.
+"""
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SKILLS = (
+    ("Python", "technical"), ("Django", "technical"), ("SQL", "technical"),
+    ("REST APIs", "technical"), ("Git", "technical"), ("Docker", "technical"),
+    ("JavaScript", "technical"), ("React", "technical"),
+    ("Communication", "soft"), ("Project Management", "soft"),
+)
+
+
+def parse_latency(spec):
+    """Return a function giving one latency sample in seconds.
+
+    ``spec`` is ``fixed:S``, ``uniform:MIN,MAX``, ``normal:MEAN,STDDEV``,
+    ``lognormal:MEDIAN,SIGMA`` or ``exp:MEAN``; a bare number means fixed.
+    Samples are never negative.
+    """
+    kind, _, args = spec.partition(":")
+    if not args:
+        kind, args = "fixed", kind
+    try:
+        values = [float(value) for value in args.split(",")]
+        sampler = {
+            "fixed": lambda rng: values[0],
+            "uniform": lambda rng: rng.uniform(values[0], values[1]),
+            "normal": lambda rng: rng.gauss(values[0], values[1]),
+            "lognormal": lambda rng: values[0] * rng.lognormvariate(0, values[1]),
+            "exp": lambda rng: rng.expovariate(1 / values[0]) if values[0] else 0,
+        }[kind]
+        sampler(random.Random(0))
+    except (KeyError, IndexError, ValueError) as e:
+        raise ValueError(f"Invalid latency spec {spec!r}") from e
+    return lambda rng: max(sampler(rng), 0)
+
+
+class StubConfig:
+    """Behaviour of the stub server; shared by all request threads."""
+
+    def __init__(self, latency="lognormal:1.5,0.5", rate_429=0.0, rate_5xx=0.0, rpm=0,
+                 questions=15, stream_chunk_delay=0.02, seed=None):
+        self.latency = parse_latency(latency) if isinstance(latency, str) else latency
+        self.rate_429 = rate_429
+        self.rate_5xx = rate_5xx
+        self.rpm = rpm
+        self.questions = questions
+        self.stream_chunk_delay = stream_chunk_delay
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {}
+        self._window = []
+
+    def sample(self):
+        with self.lock:
+            return self.latency(self.rng), self.rng.random()
+
+    def admit(self):
+        """Apply the simulated per-minute request limit; return seconds until a slot frees up, or 0."""
+        if not self.rpm:
+            return 0
+        now = time.monotonic()
+        with self.lock:
+            self._window = [t for t in self._window if now - t < 60]
+            if len(self._window) >= self.rpm:
+                return 60 - (now - self._window[0])
+            self._window.append(now)
+            return 0
+
+    def count(self, status):
+        with self.lock:
+            self.stats[status] = self.stats.get(status, 0) + 1
+
+
+def canned_content(prompt, questions=15):
+    """Model output for a prompt built by ``ai_logic``."""
+    if "MCQs" in prompt:
+        return json.dumps([
+            {
+                "question": f"Which statement about {skill} is correct? (#{i + 1})",
+                "options": [f"{skill} option A", f"{skill} option B", f"{skill} option C", f"{skill} option D"],
+                "correct_index": i % 4,
+                "skill": skill,
+                "difficulty": ("easy", "medium", "hard")[i % 3],
+                "category": category,
+            }
+            for i, (skill, category) in ((i, SKILLS[i % len(SKILLS)]) for i in range(questions))
+        ], indent=2)
+    if "match_score" in prompt:
+        return json.dumps({
+            "match_score": 72,
+            "missing_keywords": ["Kubernetes", "GraphQL", "CI/CD"],
+            "summary": "Solid backend experience; some of the requested platform tooling is missing.",
+            "improvement_advice": "Mention container orchestration and CI/CD pipelines you have used.",
+        })
+    return (
+        "You did well overall. Review the topics you missed, practise with small "
+        "projects, and keep building on your strengths."
+    )
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config = StubConfig()
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            return self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+            prompt = "\n".join(str(m.get("content", "")) for m in body.get("messages", []))
+        except (ValueError, AttributeError):
+            return self._send_json(400, {"error": {"message": "Invalid JSON body"}})
+
+        config = self.config
+        latency, roll = config.sample()
+        wait = config.admit()
+        if wait:
+            return self._send_rate_limited(wait)
+        if roll < config.rate_429:
+            return self._send_rate_limited(config.rng.uniform(1, 5))
+        time.sleep(latency)
+        if roll < config.rate_429 + config.rate_5xx:
+            return self._send_json(503, {"error": {"message": "Injected upstream failure", "type": "server_error"}})
+
+        content = canned_content(prompt, config.questions)
+        model = body.get("model", "stub")
+        if body.get("stream"):
+            return self._send_stream(model, content)
+        self._send_json(200, {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4},
+        })
+
+    def _send_json(self, status, payload, headers=None):
+        self.config.count(status)
+        out = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(out)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(out)
+
+    def _send_rate_limited(self, wait):
+        self._send_json(
+            429,
+            {"error": {"message": "Rate limit reached (stub)", "type": "requests", "code": "rate_limit_exceeded"}},
+            {
+                "Retry-After": str(max(int(wait + 0.999), 1)),
+                "x-ratelimit-limit-requests": str(self.config.rpm or 30),
+                "x-ratelimit-remaining-requests": "0",
+                "x-ratelimit-reset-requests": f"{wait:.2f}s",
+            },
+        )
+
+    def _send_stream(self, model, content):
+        self.config.count(200)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        chunk_id = f"chatcmpl-{uuid.uuid4().hex}"
+        try:
+            for start in range(0, len(content), 24):
+                self._send_event({
+                    "id": chunk_id,
+                    "object": "chat.completion.chunk",
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {"content": content[start:start + 24]}, "finish_reason": None}],
+                })
+                time.sleep(self.config.stream_chunk_delay)
+            self._send_event({
+                "id": chunk_id,
+                "object": "chat.completion.chunk",
+                "model": model,
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            })
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        self.close_connection = True
+
+    def _send_event(self, payload):
+        # Like the real API: raw UTF-8, no charset in the Content-Type.
+        self.wfile.write(f"data: {json.dumps(payload, ensure_ascii=False)}\n\n".encode("utf-8"))
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(host="127.0.0.1", port=8089, config=None):
+    """Return a threaded stub server (not yet serving) bound to ``host:port``."""
+    handler = type("ConfiguredStubHandler", (StubHandler,), {"config": config or StubConfig()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
@@ -0,0 +1,108 @@
+"""Background text extraction for stored CVs."""
+import logging
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from cv.models import CV
+from matcher.index import index_cv
+
+from . import scoring
+from .ai_logic import extract_cv_text
+from .skills import extract_skills
+from .workers import submit_extraction
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_cv_extraction(cv):
+    """Queue text extraction for a saved CV once the surrounding transaction commits."""
+    cv_id = cv.pk
+    transaction.on_commit(lambda: submit_extraction(extract_stored_cv, cv_id, wait=False))
+
+
+def extract_stored_cv(cv_id, wait=True):
+    """Extract a stored CV's text and save it on the row. Returns the text.
+
+    Only one caller extracts a CV at a time. The others wait up to
+    ``CV_EXTRACTION_WAIT`` seconds for its result (``wait=False`` returns
+    None at once instead) and take over if it never arrives.
+    """
+    cv = CV.objects.filter(pk=cv_id).first()
+    if cv is None:
+        return None
+    if cv.extraction_status == "done":
+        return cv.extracted_text
+
+    claimed = CV.objects.filter(pk=cv_id, extraction_status__in=["pending", "failed"]).update(
+        extraction_status="processing"
+    )
+    if not claimed:
+        if not wait:
+            return None
+        cv = _wait_for_extraction(cv_id)
+        if cv is None:
+            return None
+        if cv.extraction_status == "done":
+            return cv.extracted_text
+        # The other extraction failed or never finished: do it here.
+        CV.objects.filter(pk=cv_id).update(extraction_status="processing")
+
+    try:
+        report = extract_cv_text(cv.file)
+    except Exception:
+        CV.objects.filter(pk=cv_id).update(extraction_status="failed")
+        raise
+
+    if report["failed_pages"]:
+        logger.warning(f"OCR incomplete for CV {cv_id} on pages {report['failed_pages']}")
+        return _save_incomplete(cv_id, report)
+    # Index before marking the CV done: nothing revisits a done CV, so a
+    # failed index update would leave it out of CV search for good.
+    if not index_cv(cv_id, report["text"]):
+        return _save_incomplete(cv_id, report)
+
+    CV.objects.filter(pk=cv_id).update(
+        extracted_text=report["text"],
+        extraction_method=report["method"],
+        extraction_status="done",
+        skills=extract_skills(report["text"]),
+        extracted_at=timezone.now(),
+    )
+    scoring.add_document(report["text"], "cv")
+    logger.info(f"Extracted CV {cv_id} via {report['method']} in {report['timings'].get('total')}s")
+    return report["text"]
+
+
+def _save_incomplete(cv_id, report):
+    """Keep the text for this request, but leave the CV to be extracted (and indexed) again."""
+    CV.objects.filter(pk=cv_id).update(
+        extracted_text=report["text"],
+        extraction_method=report["method"],
+        extraction_status="failed",
+        skills=extract_skills(report["text"]),
+    )
+    return report["text"]
+
+
+def _wait_for_extraction(cv_id):
+    """Poll a CV being extracted elsewhere until it finishes or ``CV_EXTRACTION_WAIT`` runs out."""
+    deadline = time.monotonic() + settings.CV_EXTRACTION_WAIT
+    cv = CV.objects.filter(pk=cv_id).first()
+    while cv is not None and cv.extraction_status == "processing" and time.monotonic() < deadline:
+        time.sleep(0.25)
+        cv = CV.objects.filter(pk=cv_id).first()
+    return cv
+
+
+def stored_cv_text(cv):
+    """Return a stored CV's text, extracting it now if the background job hasn't.
+
+    An extraction already running in the background is waited on rather
+    than duplicated.
+    """
+    if cv.extraction_status == "done":
+        return cv.extracted_text
+    return extract_stored_cv(cv.pk)
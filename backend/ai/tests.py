@@ -1,2 +1,926 @@
-from django.test import TestCase
-# Create your tests here.
+import math
+import os
+import random
+import threading
+import time
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import OperationalError
+from django.db.models import F
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from cv.models import CV
+
+from . import circuit, minhash, ocr, ratelimit, scoring, similarity, singleflight
+from .ai_logic import (
+    MAX_CV_CHARS, _compute_fallback_match, _extract_docx, extract_cv_text, iter_json_objects, lookup_questions, match_cache_key,
+    question_cache_key, store_cv_questions,
+)
+from .compaction import compact_cv_text, split_sections
+from .documents import DocumentSource, UnsupportedDocumentError
+from .llm import stream_chat_completion
+from .cache import get_cached_match, get_cached_questions, store_match, store_questions
+from .models import (
+    AIJob, CircuitBreaker, ExtractedText, GeneratedQuestions, InflightCall, MatchReport, RateLimitBucket,
+)
+from .ocr import OCR_ERROR, OCR_TIMEOUT, iter_ocr_pages
+from .skills import Taxonomy, extract_skills
+from .stub_server import StubConfig, make_server
+from .tasks import extract_stored_cv
+
+TESTDATA = os.path.join(os.path.dirname(__file__), "testdata")
+
+
+def _pages(*pages):
+    def iter_pages(source):
+        yield from pages
+    return iter_pages
+
+
+class ExtractionCacheTests(TestCase):
+    def _upload(self):
+        return SimpleUploadedFile("cv.pdf", b"%PDF-1.4 test document", content_type="application/pdf")
+
+    def test_complete_extraction_is_cached(self):
+        pages = _pages((1, "text", "Python developer", 0.01), (2, "ocr", "Django", 0.5))
+        with mock.patch("ai.ai_logic.iter_pdf_pages", pages):
+            report = extract_cv_text(self._upload())
+            again = extract_cv_text(self._upload())
+        self.assertEqual(report["failed_pages"], [])
+        self.assertEqual(report["method"], "hybrid")
+        self.assertTrue(again["cached"])
+
+    def test_timed_out_ocr_is_reported_and_not_cached(self):
+        pages = _pages((1, "text", "Python developer", 0.01), (2, OCR_TIMEOUT, "", 0.01))
+        with mock.patch("ai.ai_logic.iter_pdf_pages", pages):
+            report = extract_cv_text(self._upload())
+            again = extract_cv_text(self._upload())
+        self.assertEqual(report["failed_pages"], [2])
+        self.assertEqual(report["pages"][1]["ocr_error"], OCR_TIMEOUT)
+        self.assertEqual(report["method"], "text")
+        self.assertFalse(again["cached"])
+        self.assertFalse(ExtractedText.objects.exists())
+
+
+class JobStatusTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user("owner", password="pw")
+        self.other = User.objects.create_user("other", password="pw")
+        self.job = AIJob.objects.create(kind="match", user=self.owner, status="succeeded", result={"match_score": 80})
+
+    def _get(self, user=None):
+        headers = {}
+        if user is not None:
+            headers["Authorization"] = f"Bearer {RefreshToken.for_user(user).access_token}"
+        return self.client.get(reverse("ai-job-status", args=[self.job.id]), headers=headers)
+
+    def test_owner_sees_result(self):
+        response = self._get(self.owner)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["result"], {"match_score": 80})
+
+    def test_other_users_get_404(self):
+        self.assertEqual(self._get(self.other).status_code, 404)
+
+    def test_requires_authentication(self):
+        self.assertEqual(self._get().status_code, 401)
+
+    def test_anonymous_jobs_need_their_secret(self):
+        self.job.user = None
+        self.job.secret = "s3cret"
+        self.job.save()
+        url = reverse("ai-job-status", args=[self.job.id])
+        self.assertEqual(self._get(self.other).status_code, 404)
+        self.assertEqual(self.client.get(url, {"secret": "wrong"}).status_code, 404)
+        self.assertEqual(self.client.get(url, {"secret": "s3cret"}).status_code, 200)
+        self.assertEqual(self.client.get(url, headers={"X-Job-Secret": "s3cret"}).status_code, 200)
+
+    def test_owned_jobs_ignore_secrets(self):
+        url = reverse("ai-job-status", args=[self.job.id])
+        self.assertEqual(self.client.get(url, {"secret": ""}).status_code, 401)
+        AIJob.objects.filter(pk=self.job.pk).update(secret="s3cret")
+        self.assertEqual(self.client.get(url, {"secret": "s3cret"}).status_code, 200)
+
+    def test_generate_jobs_record_their_owner(self):
+        upload = SimpleUploadedFile("cv.pdf", b"%PDF-1.4 test document")
+        token = RefreshToken.for_user(self.owner).access_token
+        with mock.patch("ai.jobs.submit"):
+            response = self.client.post(
+                reverse("ai-generate"), {"cv": upload, "async": "true"}, headers={"Authorization": f"Bearer {token}"}
+            )
+        self.assertEqual(response.status_code, 202)
+        self.assertNotIn("secret", response.json())
+        job = AIJob.objects.get(pk=response.json()["job_id"])
+        self.addCleanup(job.upload.delete, save=False)
+        self.assertEqual(job.user, self.owner)
+
+    def test_anonymous_generate_jobs_get_a_secret(self):
+        upload = SimpleUploadedFile("cv.pdf", b"%PDF-1.4 test document")
+        with mock.patch("ai.jobs.submit"):
+            response = self.client.post(reverse("ai-generate"), {"cv": upload, "async": "true"})
+        self.assertEqual(response.status_code, 202)
+        job = AIJob.objects.get(pk=response.json()["job_id"])
+        self.addCleanup(job.upload.delete, save=False)
+        self.assertIsNone(job.user)
+        self.assertEqual(response.json()["secret"], job.secret)
+        self.assertEqual(self.client.get(response.json()["status_url"]).status_code, 200)
+        token = RefreshToken.for_user(self.other).access_token
+        url = reverse("ai-job-status", args=[job.id])
+        self.assertEqual(self.client.get(url, headers={"Authorization": f"Bearer {token}"}).status_code, 404)
+
+
+class LLMMetricsTests(TestCase):
+    def _get(self, user):
+        token = RefreshToken.for_user(user).access_token
+        return self.client.get(reverse("ai-metrics"), headers={"Authorization": f"Bearer {token}"})
+
+    def test_staff_only(self):
+        staff = User.objects.create_user("staff", password="pw", is_staff=True)
+        user = User.objects.create_user("user", password="pw")
+        response = self._get(staff)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("models", response.json())
+        self.assertIn("rate_limit_fail_open", response.json())
+        self.assertEqual(self._get(user).status_code, 403)
+
+
+class TaxonomyTests(TestCase):
+    def setUp(self):
+        self.taxonomy = Taxonomy([
+            {"name": "React", "synonyms": ["react.js", "reactjs"]},
+            {"name": "React Native"},
+            {"name": "Java"},
+            {"name": "JavaScript", "synonyms": ["js"]},
+            {"name": "Machine Learning", "synonyms": ["ml", "deep learning"]},
+            {"name": "Deep Learning Ops", "synonyms": ["deep learning"], "match_name": False},
+            {"name": "Teamwork", "category": "soft"},
+        ])
+
+    def names(self, text):
+        return [skill.name for _, skill in self.taxonomy.spans(text)]
+
+    def test_longest_overlapping_match_wins(self):
+        self.assertEqual(self.names("React Native and React apps"), ["React Native", "React"])
+
+    def test_synonyms_map_to_their_skill(self):
+        self.assertEqual(self.names("ReactJS, React.js, ML and deep   learning"), ["React"] * 2 + ["Machine Learning"] * 2)
+
+    def test_first_definition_of_a_synonym_wins(self):
+        self.assertEqual(self.names("deep learning"), ["Machine Learning"])
+
+    def test_only_whole_words_match(self):
+        self.assertEqual(self.names("JavaScript, not Java; htmljs, XML"), ["JavaScript", "Java"])
+
+    def test_count_ranks_by_frequency(self):
+        ranked = self.taxonomy.count("Java, teamwork, Java, JS")
+        self.assertEqual([(skill.name, count) for skill, count in ranked], [("Java", 2), ("Teamwork", 1), ("JavaScript", 1)])
+        self.assertEqual(ranked[1][0].category, "soft")
+
+    def test_tag_keeps_texts_apart(self):
+        tagged = self.taxonomy.tag(["I know machine", "learning and Java", ""])
+        self.assertEqual([[skill.name for skill, _ in ranked] for ranked in tagged], [[], ["Java"], []])
+
+    def test_case_sensitive_names(self):
+        taxonomy = Taxonomy([
+            {"name": "Rust", "synonyms": ["rust programming"], "case_sensitive": True},
+            {"name": "Excel", "synonyms": ["microsoft excel"], "case_sensitive": True},
+        ])
+
+        def names(text):
+            return [skill.name for _, skill in taxonomy.spans(text)]
+
+        self.assertEqual(names("Rust, Excel and rust programming"), ["Rust", "Excel", "Rust"])
+        self.assertEqual(names("I excel at removing rust; MICROSOFT EXCEL"), ["Excel"])
+        tagged = taxonomy.tag(["excel in teams", "Excel dashboards"])
+        self.assertEqual([[skill.name for skill, _ in ranked] for ranked in tagged], [[], ["Excel"]])
+
+    def test_everyday_words_are_not_skills(self):
+        skills = [s["name"] for s in extract_skills("I excel at swift delivery and rust removal.")]
+        self.assertEqual(skills, [])
+        skills = [s["name"] for s in extract_skills("Swift, Rust and Excel; rust programming")]
+        self.assertEqual(skills, ["Rust", "Swift", "Excel"])
+
+
+@override_settings(CIRCUIT_FAILURE_THRESHOLD=2, CIRCUIT_OPEN_SECONDS=30, CIRCUIT_PROBE_TIMEOUT=60)
+class CircuitBreakerTests(TestCase):
+    name = "test-model"
+
+    def state(self):
+        return CircuitBreaker.objects.get(name=self.name).state
+
+    def expire(self):
+        CircuitBreaker.objects.filter(name=self.name).update(open_until=timezone.now() - timedelta(seconds=1))
+
+    def trip(self):
+        for _ in range(2):
+            circuit.record_status(self.name, 503)
+
+    def test_trips_after_consecutive_failures(self):
+        circuit.check(self.name)
+        circuit.record_status(self.name, 500)
+        circuit.check(self.name)
+        self.assertEqual(self.state(), "closed")
+        circuit.record_status(self.name, None)
+        self.assertEqual(self.state(), "open")
+        with self.assertRaises(circuit.CircuitOpenError) as raised:
+            circuit.check(self.name)
+        self.assertLessEqual(raised.exception.retry_after, 30)
+
+    def test_success_resets_failure_count(self):
+        circuit.record_status(self.name, 500)
+        circuit.record_status(self.name, 200)
+        circuit.record_status(self.name, 500)
+        self.assertEqual(self.state(), "closed")
+
+    def test_rate_limiting_is_neutral(self):
+        circuit.record_status(self.name, 500)
+        circuit.record_status(self.name, 429)
+        circuit.record_status(self.name, 500)
+        self.assertEqual(self.state(), "open")
+
+    def test_single_probe_after_open_period(self):
+        self.trip()
+        self.expire()
+        circuit.check(self.name)  # the probe
+        self.assertEqual(self.state(), "half_open")
+        with self.assertRaises(circuit.CircuitOpenError) as raised:
+            circuit.check(self.name)
+        self.assertEqual(raised.exception.retry_after, 60)
+
+    def test_probe_success_closes(self):
+        self.trip()
+        self.expire()
+        circuit.check(self.name)
+        circuit.record_status(self.name, 200)
+        self.assertEqual(self.state(), "closed")
+        circuit.check(self.name)
+
+    def test_probe_failure_reopens(self):
+        self.trip()
+        self.expire()
+        circuit.check(self.name)
+        circuit.record_status(self.name, 502)
+        self.assertEqual(self.state(), "open")
+        with self.assertRaises(circuit.CircuitOpenError):
+            circuit.check(self.name)
+
+    def test_lost_probe_is_replaced(self):
+        self.trip()
+        self.expire()
+        circuit.check(self.name)
+        self.expire()  # the probe never reported back
+        circuit.check(self.name)
+        self.assertEqual(self.state(), "half_open")
+
+
+class SingleFlightTests(TestCase):
+    def test_result_is_published_for_waiting_workers(self):
+        singleflight.do("key", lambda: ["question"])
+        self.assertTrue(InflightCall.objects.get(key="key").done)
+
+    def test_empty_or_rejected_results_are_not_published(self):
+        singleflight.do("empty", lambda: [])
+        singleflight.do("fallback", lambda: ["report", False], share=lambda result: result[1])
+        self.assertFalse(InflightCall.objects.exists())
+
+    def test_late_caller_does_not_reuse_finished_result(self):
+        singleflight.do("key", lambda: ["old"])
+        self.assertEqual(singleflight.do("key", lambda: ["refreshed"]), ["refreshed"])
+
+    def test_waiter_gets_result_of_call_in_flight_elsewhere(self):
+        InflightCall.objects.create(key="key", owner="other", expires_at=timezone.now() + timedelta(minutes=1))
+        calls = []
+
+        def publish(seconds):
+            singleflight._publish("key", "other", ["shared"])
+
+        with mock.patch("ai.singleflight.time.sleep", side_effect=publish):
+            result = singleflight.do("key", lambda: calls.append(1) or ["own"])
+        self.assertEqual(result, ["shared"])
+        self.assertEqual(calls, [])
+
+    def test_waiter_takes_over_released_lease(self):
+        InflightCall.objects.create(key="key", owner="other", expires_at=timezone.now() + timedelta(minutes=1))
+
+        def release(seconds):
+            singleflight._release("key", "other")
+
+        with mock.patch("ai.singleflight.time.sleep", side_effect=release):
+            self.assertEqual(singleflight.do("key", lambda: ["own"]), ["own"])
+
+
+class SingleFlightConcurrencyTests(TransactionTestCase):
+    def test_concurrent_callers_share_one_call(self):
+        calls = []
+        release = threading.Event()
+
+        def fn():
+            calls.append(1)
+            release.wait(5)
+            return ["question"]
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(singleflight.do("key", fn))) for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.2)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [["question"]] * 4)
+
+
+class StreamingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = make_server(port=0, config=StubConfig(latency="fixed:0", stream_chunk_delay=0))
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        host, port = cls.server.server_address[:2]
+        cls.api_url = f"http://{host}:{port}/openai/v1/chat/completions"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def test_non_ascii_deltas_decode_as_utf8(self):
+        text = "Qu’est-ce que «Django» – café? ما هو إطار Django؟ " * 3
+        with mock.patch("ai.stub_server.canned_content", return_value=text), \
+                override_settings(GROQ_API_URL=self.api_url, GROQ_MAX_RETRIES=0):
+            streamed = "".join(stream_chat_completion("stub", [{"role": "user", "content": "hi"}]))
+        self.assertEqual(streamed, text)
+
+
+class IterJsonObjectsTests(TestCase):
+    def test_objects_split_across_chunks(self):
+        chunks = ['```json\n[{"question": "A', '?", "n": 1}, {"quest', 'ion": "B?", "n": 2', '}]\n```']
+        self.assertEqual(list(iter_json_objects(chunks)), [{"question": "A?", "n": 1}, {"question": "B?", "n": 2}])
+
+    def test_braces_and_quotes_inside_strings(self):
+        chunks = ['[{"question": "What does {x} mean in \\"f', '{y}\\" strings?", "nested": {"a": "}"}}]']
+        self.assertEqual(
+            list(iter_json_objects(chunks)),
+            [{"question": 'What does {x} mean in "f{y}" strings?', "nested": {"a": "}"}}],
+        )
+
+    def test_malformed_objects_are_skipped(self):
+        self.assertEqual(list(iter_json_objects(['{"a": 1,}', ' {"b": 2}'])), [{"b": 2}])
+
+
+class StoredExtractionTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("candidate", password="pw")
+        self.cv = CV.objects.create(user=self.user, title="CV", file="cvs/cv.pdf")
+        self.report = {
+            "text": "Python and Django developer", "method": "text", "timings": {"total": 0.1},
+            "pages": [], "failed_pages": [], "cached": False,
+        }
+
+    def test_pending_cv_is_claimed_and_extracted(self):
+        with mock.patch("ai.tasks.extract_cv_text", return_value=self.report) as extract:
+            self.assertEqual(extract_stored_cv(self.cv.pk), "Python and Django developer")
+        extract.assert_called_once()
+        self.cv.refresh_from_db()
+        self.assertEqual(self.cv.extraction_status, "done")
+
+    def test_background_job_skips_a_cv_being_extracted(self):
+        CV.objects.filter(pk=self.cv.pk).update(extraction_status="processing")
+        with mock.patch("ai.tasks.extract_cv_text") as extract:
+            self.assertIsNone(extract_stored_cv(self.cv.pk, wait=False))
+        extract.assert_not_called()
+
+    def test_request_waits_for_the_running_extraction(self):
+        CV.objects.filter(pk=self.cv.pk).update(extraction_status="processing")
+
+        def finish(seconds):
+            CV.objects.filter(pk=self.cv.pk).update(extraction_status="done", extracted_text="Extracted elsewhere")
+
+        with mock.patch("ai.tasks.time.sleep", side_effect=finish), \
+                mock.patch("ai.tasks.extract_cv_text") as extract:
+            self.assertEqual(extract_stored_cv(self.cv.pk), "Extracted elsewhere")
+        extract.assert_not_called()
+
+    def test_cv_stays_unfinished_until_indexed(self):
+        with mock.patch("ai.tasks.extract_cv_text", return_value=self.report), \
+                mock.patch("ai.tasks.index_cv", return_value=False):
+            self.assertEqual(extract_stored_cv(self.cv.pk), "Python and Django developer")
+        self.cv.refresh_from_db()
+        self.assertEqual(self.cv.extraction_status, "failed")
+
+        # The next attempt indexes it and only then marks it done.
+        with mock.patch("ai.tasks.extract_cv_text", return_value=self.report), \
+                mock.patch("ai.tasks.index_cv", return_value=True) as index:
+            extract_stored_cv(self.cv.pk)
+        index.assert_called_once_with(self.cv.pk, "Python and Django developer")
+        self.cv.refresh_from_db()
+        self.assertEqual(self.cv.extraction_status, "done")
+
+    @override_settings(CV_EXTRACTION_WAIT=0)
+    def test_request_takes_over_an_extraction_that_never_finishes(self):
+        CV.objects.filter(pk=self.cv.pk).update(extraction_status="processing")
+        with mock.patch("ai.tasks.extract_cv_text", return_value=self.report) as extract:
+            self.assertEqual(extract_stored_cv(self.cv.pk), "Python and Django developer")
+        extract.assert_called_once()
+
+
+@override_settings(GROQ_RATE_LIMIT_RPM=60, GROQ_RATE_LIMIT_BURST=5, GROQ_BACKOFF_BASE=1, GROQ_BACKOFF_MAX=8)
+class RateLimitTests(TestCase):
+    def setUp(self):
+        self.now = timezone.now()
+        patcher = mock.patch("ai.ratelimit.timezone.now", side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def bucket(self):
+        return RateLimitBucket.objects.get(name="model")
+
+    def test_burst_then_wait_for_refill(self):
+        for _ in range(5):
+            self.assertEqual(ratelimit._reserve("model"), 0)
+        # One token per second at 60 RPM.
+        self.assertAlmostEqual(ratelimit._reserve("model"), 1.0)
+        self.now += timedelta(seconds=0.25)
+        self.assertAlmostEqual(ratelimit._reserve("model"), 0.75)
+
+    def test_refill_is_capped_at_burst(self):
+        RateLimitBucket.objects.create(name="model", tokens=0, updated_at=self.now - timedelta(minutes=10))
+        self.assertEqual(ratelimit._reserve("model"), 0)
+        self.assertAlmostEqual(self.bucket().tokens, 4)
+
+    def test_paused_bucket_waits_out_the_pause(self):
+        RateLimitBucket.objects.create(
+            name="model", tokens=5, updated_at=self.now, blocked_until=self.now + timedelta(seconds=12)
+        )
+        self.assertAlmostEqual(ratelimit._reserve("model"), 12)
+
+    def test_lost_update_is_retried(self):
+        real = RateLimitBucket.objects.get_or_create
+        raced = []
+
+        def racing_read(**kwargs):
+            bucket, created = real(**kwargs)
+            if not raced:
+                # Another worker writes between our read and our update.
+                raced.append(True)
+                RateLimitBucket.objects.filter(name="model").update(version=F("version") + 1)
+            return bucket, created
+
+        with mock.patch.object(RateLimitBucket.objects, "get_or_create", side_effect=racing_read) as read:
+            self.assertEqual(ratelimit._reserve("model"), 0)
+        self.assertEqual(read.call_count, 2)
+        self.assertEqual(self.bucket().version, 2)
+
+    def test_constant_contention_backs_off_briefly(self):
+        with mock.patch.object(RateLimitBucket.objects, "filter") as filter_:
+            filter_.return_value.update.return_value = 0
+            wait = ratelimit._reserve("model")
+        self.assertEqual(filter_.call_count, 5)
+        self.assertTrue(0.01 <= wait <= 0.1)
+
+    def test_database_errors_fail_open_and_are_counted(self):
+        before = ratelimit.fail_open_counts().get("model", 0)
+        error = OperationalError("database table is locked")
+        with mock.patch.object(RateLimitBucket.objects, "get_or_create", side_effect=error), \
+                self.assertLogs("ai.ratelimit", "WARNING"):
+            self.assertEqual(ratelimit._reserve("model"), 0)
+        self.assertEqual(ratelimit.fail_open_counts()["model"], before + 1)
+
+    def test_server_delay_headers(self):
+        self.assertEqual(ratelimit._server_delay({"retry-after": "7"}), 7)
+        date = http_date((self.now + timedelta(seconds=30)).timestamp())
+        self.assertAlmostEqual(ratelimit._server_delay({"retry-after": date}), 30, delta=1)
+        self.assertAlmostEqual(ratelimit._server_delay({
+            "x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "2m59.56s",
+        }), 179.56)
+        self.assertAlmostEqual(ratelimit._server_delay({
+            "x-ratelimit-remaining-tokens": "0", "x-ratelimit-reset-tokens": "120ms", "retry-after": "0",
+        }), 0.12)
+        # Only exhausted limits count, and the longest delay wins.
+        self.assertIsNone(ratelimit._server_delay({
+            "x-ratelimit-remaining-requests": "3", "x-ratelimit-reset-requests": "10s",
+        }))
+        self.assertEqual(ratelimit._server_delay({
+            "retry-after": "5", "x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "1m",
+        }), 60)
+        self.assertIsNone(ratelimit._server_delay({"retry-after": "soon"}))
+
+    def test_retry_delay_uses_and_records_the_server_delay(self):
+        response = mock.Mock(status_code=429, headers={"retry-after": "3"})
+        delay = ratelimit.retry_delay("model", response, attempt=0)
+        self.assertTrue(3 <= delay <= 4)
+        self.assertEqual(self.bucket().blocked_until, self.now + timedelta(seconds=3))
+
+        response = mock.Mock(status_code=400, headers={})
+        self.assertIsNone(ratelimit.retry_delay("model", response, attempt=0))
+
+    def test_backoff_bounds(self):
+        with mock.patch("ai.ratelimit.random.uniform", side_effect=lambda low, high: high):
+            self.assertEqual([ratelimit.backoff(attempt) for attempt in range(6)], [1, 2, 4, 8, 8, 8])
+        for attempt in range(6):
+            self.assertTrue(0 <= ratelimit.backoff(attempt) <= 8)
+        for wait in (0.5, 3):
+            self.assertTrue(wait <= ratelimit._jitter(wait) <= wait + min(wait, 1) * 0.2)
+
+
+class CompactionTests(TestCase):
+    CV_TEXT = "\n".join([
+        "Jane Doe",
+        "jane@example.com | Page 1 of 2",
+        "Work Experience",
+        *[f"•  Built service {i} in Python and Django for a  logistics platform" for i in range(60)],
+        "EDUCATION & TRAINING:",
+        "BSc Computer Science, 2018",
+        "Interests",
+        "Chess, hiking and photography",
+        "References",
+        "Available on request from former managers",
+        "Technical Skills",
+        "Python, Django, PostgreSQL, Docker, Kubernetes",
+        "Page 2 of 2",
+        "jane@example.com | Page 1 of 2",
+    ])
+
+    def test_sections_are_detected_in_document_order(self):
+        sections = split_sections(self.CV_TEXT)
+        self.assertEqual(
+            [name for name, _ in sections],
+            ["header", "experience", "education", "interests", "references", "skills"],
+        )
+        header = dict(sections)["header"]
+        self.assertEqual(header, "Jane Doe\njane@example.com | Page 1 of 2")
+        self.assertTrue(dict(sections)["experience"].splitlines()[1].startswith("- Built service 0 in Python"))
+
+    def test_heading_words_inside_sentences_are_not_headings(self):
+        names = [name for name, _ in split_sections("Summary\nStrong skills in teamwork and experience with Go")]
+        self.assertEqual(names, ["summary"])
+
+    def test_skills_survive_a_small_budget(self):
+        report = compact_cv_text(self.CV_TEXT, budget_tokens=60)
+        self.assertIn("Python, Django, PostgreSQL, Docker, Kubernetes", report["text"])
+        self.assertIn("BSc Computer Science, 2018", report["text"])
+        self.assertNotIn("Available on request", report["text"])
+        self.assertNotIn("Chess", report["text"])
+        # The long work history gets some room, but not all of it.
+        self.assertIn("Built service 0 ", report["text"])
+        self.assertNotIn("Built service 59 ", report["text"])
+        self.assertEqual(report["sections"], ["header", "experience", "education", "skills"])
+
+    def test_output_fits_the_budget(self):
+        rng = random.Random(17)
+        words = ["python", "django", "Experience", "Skills", "Education", "•", "page", "2", "lead", "team"]
+        for size in (0, 50, 500, 5000, 50000):
+            text = "\n".join(
+                " ".join(rng.choice(words) for _ in range(rng.randint(1, 80))) for _ in range(size // 20)
+            )
+            for budget_tokens in (0, 50, 800, 2000):
+                with self.subTest(size=size, budget=budget_tokens):
+                    report = compact_cv_text(text, budget_tokens=budget_tokens)
+                    self.assertLessEqual(len(report["text"]), budget_tokens * 4)
+            self.assertLessEqual(len(compact_cv_text(text)["text"]), MAX_CV_CHARS)
+
+
+@override_settings(NEAR_DUPLICATE_THRESHOLD=0.9)
+class NearDuplicateTests(TestCase):
+    def setUp(self):
+        rng = random.Random(25)
+        vocabulary = [f"word{i}" for i in range(2000)]
+        self.words = [rng.choice(vocabulary) for _ in range(400)]
+        self.text = " ".join(self.words)
+
+    def edited(self, changes):
+        words = list(self.words)
+        for i in range(changes):
+            words[(i * 397) % len(words)] = f"edit{i}"
+        return " ".join(words)
+
+    def test_shingles_are_word_trigrams(self):
+        self.assertEqual(
+            minhash._shingles("The quick, brown fox"), {"the quick brown", "quick brown fox"}
+        )
+        self.assertEqual(minhash._shingles("Python"), {"python"})
+        self.assertEqual(minhash._shingles("  "), set())
+
+    def test_signature_estimates_jaccard(self):
+        self.assertEqual(minhash.similarity(minhash.signature(self.text), minhash.signature(self.text)), 1.0)
+        for changes in (1, 10, 40):
+            a, b = minhash._shingles(self.text), minhash._shingles(self.edited(changes))
+            jaccard = len(a & b) / len(a | b)
+            estimate = minhash.similarity(minhash.signature(self.text), minhash.signature(self.edited(changes)))
+            with self.subTest(changes=changes):
+                self.assertAlmostEqual(estimate, jaccard, delta=0.1)
+
+    def test_lsh_bands(self):
+        buckets = minhash._buckets(minhash.signature(self.text))
+        self.assertEqual(len(buckets), minhash.BANDS)
+        # A one-word edit keeps most bands; an unrelated text shares none.
+        near = set(minhash._buckets(minhash.signature(self.edited(1))))
+        self.assertGreater(len(near & set(buckets)), minhash.BANDS // 2)
+        other = set(minhash._buckets(minhash.signature(" ".join(reversed(self.words)))))
+        self.assertFalse(other & set(buckets))
+
+    def test_threshold_cutoff(self):
+        minhash.remember(self.text, questions="original")
+        self.assertEqual(minhash.similar_keys(self.edited(1), "questions"), ["original"])
+        # ~0.75 similar: may share a band, but is below the threshold.
+        self.assertEqual(minhash.similar_keys(self.edited(20), "questions"), [])
+        self.assertEqual(minhash.similar_keys(self.edited(1), "match"), [])
+        # The text itself is left to the exact-key lookup.
+        self.assertEqual(minhash.similar_keys(self.text, "questions"), [])
+        with override_settings(NEAR_DUPLICATE_THRESHOLD=0):
+            self.assertEqual(minhash.similar_keys(self.edited(1), "questions"), [])
+
+    def test_near_identical_cv_reuses_cached_questions(self):
+        questions = [{"question": "What is Django?", "options": ["A", "B", "C", "D"], "answer": 0}]
+        with mock.patch("ai.ai_logic.submit", side_effect=lambda fn, *args, **kwargs: fn(*args, **kwargs)):
+            store_cv_questions(self.text, questions)
+        self.assertEqual(lookup_questions(self.edited(1)), questions)
+        self.assertIsNone(lookup_questions(self.edited(1), exact=True))
+        self.assertIsNone(lookup_questions(" ".join(reversed(self.words))))
+
+
+@override_settings(MEDIA_ROOT=TESTDATA)
+class DocumentTests(TestCase):
+    CV_TEXT = "Jane Doe\nSkills\nPython, Django\tPostgreSQL\nExperience\nBackend developer at Acme\n2019 – 2024 · Zürich\n"
+
+    def upload(self, name, fixture=None, content=None):
+        if fixture is not None:
+            with open(os.path.join(TESTDATA, fixture), "rb") as f:
+                content = f.read()
+        return SimpleUploadedFile(name, content)
+
+    def stored(self, fixture):
+        return CV(title="CV", file=fixture).file
+
+    def test_uploads_are_read_from_memory(self):
+        with DocumentSource(self.upload("cv.docx", "cv.docx")) as source:
+            self.assertIsNone(source.path)
+            self.assertEqual(bytes(source.data[:4]), b"PK\x03\x04")
+            self.assertEqual(source.sniff_format(), "docx")
+            # Only code that needs a path gets a temporary copy.
+            with source.local_path() as path, open(path, "rb") as copy:
+                self.assertEqual(copy.read(), bytes(source.data))
+            self.assertFalse(os.path.exists(path))
+
+    def test_stored_files_are_memory_mapped_in_place(self):
+        with DocumentSource(self.stored("cv.docx")) as source:
+            self.assertEqual(source.path, os.path.join(TESTDATA, "cv.docx"))
+            with source.local_path() as path:
+                self.assertEqual(path, source.path)
+            self.assertEqual(source.sniff_format(), "docx")
+            self.assertEqual(_extract_docx(source)["text"], self.CV_TEXT)
+
+    def test_empty_file(self):
+        with DocumentSource(self.stored("empty.pdf")) as source:
+            self.assertEqual(bytes(source.data), b"")
+            self.assertIsNone(source.sniff_format())
+        with self.assertRaises(UnsupportedDocumentError):
+            extract_cv_text(self.upload("empty.pdf", "empty.pdf"))
+
+    def test_format_comes_from_content_not_name(self):
+        report = extract_cv_text(self.upload("cv.pdf", "docx_named.pdf"))
+        self.assertEqual(report["method"], "docx")
+        self.assertEqual(report["text"], self.CV_TEXT)
+
+        for name, content in (
+            ("cv.docx", b"Jane Doe, Python developer"),
+            ("cv.docx", b"PK\x03\x04 not really a zip"),
+        ):
+            with self.subTest(content=content), self.assertRaises(UnsupportedDocumentError):
+                extract_cv_text(self.upload(name, content=content))
+
+    def test_docx_text_stops_at_max_chars(self):
+        with DocumentSource(self.upload("cv.docx", "cv.docx")) as source:
+            self.assertEqual(_extract_docx(source, max_chars=12)["text"], self.CV_TEXT[:12])
+
+
+class QuestionCacheTests(TestCase):
+    QUESTIONS = [{"question": "What is Django?", "options": ["A", "B", "C", "D"], "answer": 0}]
+
+    def store(self, text):
+        key = question_cache_key(text)
+        store_questions(questions=self.QUESTIONS, **key)
+        return key
+
+    def touch(self, key, minutes_ago):
+        GeneratedQuestions.objects.filter(text_hash=key["text_hash"]).update(
+            last_used_at=timezone.now() - timedelta(minutes=minutes_ago)
+        )
+
+    @override_settings(QUESTION_CACHE_TTL=60)
+    def test_entries_expire_after_ttl(self):
+        key = self.store("Python developer")
+        self.assertEqual(get_cached_questions(**key), self.QUESTIONS)
+        GeneratedQuestions.objects.update(created_at=timezone.now() - timedelta(seconds=61))
+        self.assertIsNone(get_cached_questions(**key))
+        self.assertFalse(GeneratedQuestions.objects.exists())
+
+    @override_settings(QUESTION_CACHE_MAX_ENTRIES=2)
+    def test_least_recently_used_entry_is_evicted_by_count(self):
+        first, second = self.store("first CV"), self.store("second CV")
+        self.touch(second, 10)
+        self.touch(first, 5)
+        third = self.store("third CV")
+        self.assertIsNone(get_cached_questions(**second))
+        self.assertIsNotNone(get_cached_questions(**first))
+        self.assertIsNotNone(get_cached_questions(**third))
+
+    def test_least_recently_used_entries_are_evicted_by_size(self):
+        size = GeneratedQuestions.objects.get(**self.store("first CV")).size
+        keys = [question_cache_key("first CV")] + [self.store(f"CV {i}") for i in range(3)]
+        for minutes, key in zip((10, 40, 30, 20), keys):
+            self.touch(key, minutes)
+        with override_settings(QUESTION_CACHE_MAX_BYTES=size * 3):
+            newest = self.store("newest CV")
+        kept = set(GeneratedQuestions.objects.values_list("text_hash", flat=True))
+        self.assertEqual(kept, {keys[0]["text_hash"], keys[3]["text_hash"], newest["text_hash"]})
+
+    def test_key_changes_with_model(self):
+        self.store("Python developer")
+        self.assertEqual(lookup_questions("Python developer", exact=True), self.QUESTIONS)
+        with mock.patch("ai.ai_logic.QUESTIONS_MODEL", "another-model"):
+            self.assertIsNone(lookup_questions("Python developer", exact=True))
+
+    def test_extractions_are_keyed_by_extractor_version(self):
+        pages = _pages((1, "text", "Python developer", 0.01))
+        with mock.patch("ai.ai_logic.iter_pdf_pages", pages):
+            extract_cv_text(SimpleUploadedFile("cv.pdf", b"%PDF-1.4 test document"))
+            self.assertTrue(extract_cv_text(SimpleUploadedFile("cv.pdf", b"%PDF-1.4 test document"))["cached"])
+            with mock.patch("ai.ai_logic.EXTRACTOR_VERSION", "next"):
+                report = extract_cv_text(SimpleUploadedFile("cv.pdf", b"%PDF-1.4 test document"))
+        self.assertFalse(report["cached"])
+
+
+class MatchCacheTests(TestCase):
+    REPORT = {"match_score": 80, "strengths": ["Python"], "gaps": []}
+
+    def store(self, job):
+        key = match_cache_key("Python developer", job, "Backend")
+        store_match(report=self.REPORT, **key)
+        return key
+
+    @override_settings(MATCH_CACHE_TTL=60)
+    def test_entries_expire_after_ttl(self):
+        key = self.store("Django job")
+        self.assertEqual(get_cached_match(**key), self.REPORT)
+        MatchReport.objects.update(created_at=timezone.now() - timedelta(seconds=61))
+        self.assertIsNone(get_cached_match(**key))
+
+    def test_least_recently_used_entries_are_evicted(self):
+        keys = [self.store(f"job {i}") for i in range(3)]
+        size = MatchReport.objects.first().size
+        for minutes, key in zip((10, 30, 20), keys):
+            MatchReport.objects.filter(job_hash=key["job_hash"]).update(
+                last_used_at=timezone.now() - timedelta(minutes=minutes)
+            )
+        with override_settings(MATCH_CACHE_MAX_ENTRIES=3):
+            self.store("job 3")
+        self.assertIsNone(get_cached_match(**keys[1]))
+        with override_settings(MATCH_CACHE_MAX_BYTES=size * 2):
+            self.store("job 4")
+        # job 0 and job 2 were left least recently used (job 2 older).
+        self.assertEqual(MatchReport.objects.count(), 2)
+        self.assertIsNone(get_cached_match(**keys[2]))
+        self.assertIsNone(get_cached_match(**keys[0]))
+
+    def test_key_ignores_case_and_spacing_but_not_the_model(self):
+        key = self.store("Django job")
+        self.assertEqual(match_cache_key("python  DEVELOPER", " django\njob", "backend"), key)
+        with mock.patch("ai.ai_logic.MATCH_MODEL", "another-model"):
+            self.assertIsNone(get_cached_match(**match_cache_key("Python developer", "Django job", "Backend")))
+
+
+class ScoringTests(TestCase):
+    def snapshot(self, df, documents=10, avg_cv_length=20):
+        stats = scoring._Snapshot(df, documents, avg_cv_length, time.monotonic())
+        return mock.patch("ai.scoring._get_snapshot", return_value=stats)
+
+    def test_terms(self):
+        self.assertEqual(
+            scoring.terms("The C++ and Node.js developer, on AWS -- with CI/CD."),
+            ["c++", "node.js", "developer", "aws"],
+        )
+
+    def test_idf_favours_rare_terms(self):
+        stats = scoring._Snapshot({"python": 9, "kafka": 1}, 10, 20, 0)
+        self.assertLess(stats.idf("python"), stats.idf("kafka"))
+        self.assertAlmostEqual(stats.idf("unseen"), math.log(1 + 10.5 / 0.5))
+        self.assertGreater(stats.idf("python"), 0)
+
+    def test_rare_terms_weigh_more(self):
+        with self.snapshot({"python": 9, "kafka": 1}):
+            common, _ = scoring.score_match("python engineer", "python kafka")
+            rare, _ = scoring.score_match("kafka engineer", "python kafka")
+        self.assertLess(common, rare)
+
+    def test_length_normalisation(self):
+        filler = " ".join(f"filler{i}" for i in range(60))
+        with self.snapshot({"python": 2}):
+            short, _ = scoring.score_match("python developer", "python")
+            long, _ = scoring.score_match(f"python developer {filler}", "python")
+        self.assertGreater(short, long)
+
+    @override_settings(SCORING_CURVE=3)
+    def test_calibration(self):
+        # One query term found once in a CV of average length: the raw
+        # score is 1 / (K1 + 1) of the best possible.
+        ratio = 1 / (scoring.K1 + 1)
+        with self.snapshot({"python": 2}, avg_cv_length=1):
+            score, missing = scoring.score_match("python", "python")
+            self.assertEqual(score, round((1 - math.exp(-3 * ratio)) / (1 - math.exp(-3)) * 100))
+            with override_settings(SCORING_CURVE=0):
+                self.assertEqual(scoring.score_match("python", "python")[0], round(ratio * 100))
+            # Missing skills are reported by their taxonomy name.
+            self.assertEqual(scoring.score_match("golang", "python"), (0, ["Python"]))
+        self.assertEqual(missing, [])
+        self.assertEqual(scoring.score_match("python", ""), (0, []))
+
+    def test_fallback_blends_bm25_and_similarity(self):
+        with mock.patch("ai.ai_logic.scoring.score_match", return_value=(60, ["kafka"])), \
+                mock.patch("ai.ai_logic.similarity.match_score", return_value=80):
+            for weight, expected in ((0, 60), (0.25, 65), (1, 80)):
+                with self.subTest(weight=weight), override_settings(SIMILARITY_FALLBACK_WEIGHT=weight):
+                    self.assertEqual(_compute_fallback_match("cv", "job", ""), (expected, ["kafka"]))
+
+
+class SimilarityTests(TestCase):
+    def cosine(self, a, b):
+        dimensions = 2 ** 14
+        return float(similarity._vectorize(a, dimensions) @ similarity._vectorize(b, dimensions))
+
+    def test_identical_texts(self):
+        text = "Senior Python developer: Django, PostgreSQL, Docker"
+        self.assertAlmostEqual(self.cosine(text, text), 1.0)
+        self.assertAlmostEqual(float(similarity.cv_vector(text) @ similarity.cv_vector(text)), 1.0, places=5)
+
+    def test_disjoint_texts(self):
+        self.assertLess(abs(self.cosine("watercolour landscapes", "quarterly tax filings")), 0.1)
+        self.assertEqual(self.cosine("", "anything"), 0.0)
+
+    def test_spelling_variants_and_synonyms_overlap(self):
+        unrelated = self.cosine("Postgres", "gardening")
+        self.assertGreater(self.cosine("PostgreSQL", "Postgres"), unrelated + 0.3)
+        self.assertGreater(self.cosine("ML engineer", "machine learning engineer"), 0.3)
+
+    @override_settings(SIMILARITY_FLOOR=0.05, SIMILARITY_CEILING=0.55)
+    def test_scores(self):
+        self.assertEqual(similarity.to_score([-1, 0.05, 0.3, 0.55, 0.9]).tolist(), [0, 0, 50, 100, 100])
+        job = "Backend developer with Python, Django and PostgreSQL"
+        scores = similarity.score_cvs(job, "Backend developer", [
+            "Skills\nPython, Django, PostgreSQL\nExperience\nBackend developer",
+            "Skills\nWatercolour, calligraphy\nExperience\nIllustrator",
+        ])
+        self.assertGreater(scores[0], scores[1])
+        self.assertEqual(similarity.score_cvs(job, "", []), [])
+
+
+class OCRTests(TestCase):
+    PAGES = [(1, "", 0.01, True), (2, "text layer", 0.01, True)]
+
+    @override_settings(OCR_WORKERS=1, OCR_TIMEOUT=30)
+    def test_pages_get_the_remaining_budget_as_subprocess_timeout(self):
+        with mock.patch("ai.ocr.convert_from_path", return_value=["image"]) as convert, \
+                mock.patch("ai.ocr.pytesseract.image_to_string", return_value="OCR text") as tesseract:
+            results = list(iter_ocr_pages(self.PAGES, lambda: "/tmp/cv.pdf"))
+        self.assertEqual([method for _, method, _, _ in results], ["ocr", "ocr"])
+        for call in convert.call_args_list + tesseract.call_args_list:
+            self.assertTrue(0 < call.kwargs["timeout"] <= 30)
+
+    @override_settings(OCR_WORKERS=1)
+    def test_failed_and_killed_pages_are_reported(self):
+        def killed(image, timeout):
+            time.sleep(timeout)
+            raise RuntimeError("Tesseract process timeout")
+
+        with mock.patch("ai.ocr.convert_from_path", return_value=["image"]):
+            with mock.patch("ai.ocr.pytesseract.image_to_string", side_effect=RuntimeError("bad image")):
+                failed = list(iter_ocr_pages(self.PAGES, lambda: "/tmp/cv.pdf", timeout=30))
+            with mock.patch("ai.ocr.pytesseract.image_to_string", side_effect=killed):
+                timed_out = list(iter_ocr_pages(self.PAGES, lambda: "/tmp/cv.pdf", timeout=0.05))
+        self.assertEqual([(n, method, text) for n, method, text, _ in failed],
+                         [(1, OCR_ERROR, ""), (2, OCR_ERROR, "text layer")])
+        self.assertEqual([method for _, method, _, _ in timed_out], [OCR_TIMEOUT, OCR_TIMEOUT])
+
+    def test_no_time_left_for_tesseract(self):
+        with mock.patch("ai.ocr.convert_from_path", return_value=["image"]), \
+                mock.patch("ai.ocr.pytesseract.image_to_string") as tesseract, \
+                self.assertRaises(RuntimeError):
+            ocr.ocr_page("/tmp/cv.pdf", 1, 200, timeout=0)
+        tesseract.assert_not_called()
+
+    @override_settings(OCR_WORKERS=2)
+    def test_pool_processes_are_not_forked(self):
+        ocr._reset_executor()
+        self.addCleanup(ocr._reset_executor)
+        self.assertIn(ocr._get_executor()._mp_context.get_start_method(), ("forkserver", "spawn"))
@@ -1,9 +1,20 @@
 # backend/ai/urls.py
 
 from django.urls import path
-from .views import generate_questions_view, submit_answers_view
+from .views import (
+    JobStatusView,
+    LLMMetricsView,
+    generate_questions_async_view,
+    generate_questions_stream_view,
+    generate_questions_view,
+    submit_answers_view,
+)
 
 urlpatterns = [
     path("generate/", generate_questions_view, name="ai-generate"),
+    path("generate/asgi/", generate_questions_async_view, name="ai-generate-asgi"),
+    path("generate/stream/", generate_questions_stream_view, name="ai-generate-stream"),
     path("submit/", submit_answers_view, name="ai-submit"),
+    path("jobs/<uuid:job_id>/", JobStatusView.as_view(), name="ai-job-status"),
+    path("metrics/", LLMMetricsView.as_view(), name="ai-metrics"),
 ]
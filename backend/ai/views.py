@@ -1,8 +1,31 @@
+from asgiref.sync import sync_to_async
 from django.views.decorators.csrf import csrf_exempt
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed, NotAuthenticated
+from rest_framework.permissions import AllowAny, IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
 from cv.models import CV  # adjust if your model name/app differs
-from .ai_logic import extract_text_from_pdf, generate_questions_from_cv
+from .ai_logic import (
+    abuild_questions,
+    build_questions,
+    extract_text_from_pdf,
+    finalize_questions,
+    lookup_questions,
+    store_cv_questions,
+    stream_questions_from_cv,
+)
+from .circuit import CircuitOpenError
+from .documents import UnsupportedDocumentError
+from .jobs import enqueue_job, is_truthy, job_accepted_response, job_handler, job_payload, wait_for_job
+from .llm import get_metrics
+from .ratelimit import fail_open_counts
+from .tasks import stored_cv_text
 import json
+import os
 
 
 @csrf_exempt
@@ -13,66 +36,234 @@ def generate_questions_view(request):
       OR multipart/form-data with file under one of:
           'cv' | 'file' | 'pdf' | 'cv_file' | 'resume' | 'document'
     RESP: { "questions": [ {question, options?, skill?, category?}, ... ] }
+
+    Questions are cached per CV text; the X-Cache header says whether this
+    response was served from the cache. Send "refresh": true to force a
+    fresh quiz. A quiz cached for a near-identical CV (same résumé
+    re-exported, a typo fixed) is reused too, unless "exact": true.
+
+    While the AI service is failing, uncached requests get 503
+    { "error", "degraded": true, "retry_after" } with a Retry-After header.
+
+    With "async": true (body, form field or query string) the work is
+    queued instead and the response is 202 { "job_id", "status", "status_url" };
+    poll GET /api/ai/jobs/<job_id>/ for the result. The job belongs to the
+    caller if they send a JWT; otherwise the response also carries a
+    "secret" (already in status_url) needed to poll it.
     """
     if request.method != "POST":
         return JsonResponse({"error": "Invalid request method."}, status=400)
 
-    cv_file = None
+    data, cv_id, cv_file = _read_generate_request(request)
+    stored_cv, error = _generate_source(cv_id, cv_file)
+    if error is not None:
+        return error
 
-    # Try JSON body with cv_id
-    try:
-        if request.content_type and "application/json" in request.content_type:
-            body = request.body.decode("utf-8") or "{}"
-            data = json.loads(body)
-            cv_id = data.get("cv_id")
-            if cv_id is not None:
-                try:
-                    obj = CV.objects.get(pk=cv_id)
-                    cv_file = obj.file  # FileField
-                except CV.DoesNotExist:
-                    return JsonResponse({"error": "CV not found."}, status=404)
-    except Exception:
-        # Fall back to file upload
-        pass
+    refresh = _flag(request, data, "refresh")
+    exact = _flag(request, data, "exact")
 
-    # Try multipart with a file under common keys
-    if cv_file is None:
-        for key in ["cv", "file", "pdf", "cv_file", "resume", "document"]:
-            if key in request.FILES:
-                cv_file = request.FILES[key]
-                break
-        if not cv_file:
-            return JsonResponse(
-                {"error": "Please upload a valid PDF file or provide cv_id."},
-                status=400,
+    # Job mode: hand the work to the background pool and return at once
+    if _flag(request, data, "async"):
+        if stored_cv is not None:
+            payload = {"cv_id": stored_cv.pk, "refresh": refresh, "exact": exact}
+            job = enqueue_job("generate", user=_request_user(request), payload=payload)
+        else:
+            job = enqueue_job(
+                "generate", user=_request_user(request), payload={"refresh": refresh, "exact": exact}, upload=cv_file
             )
+        return job_accepted_response(request, job)
 
     # Extract text & generate questions
     try:
-        text = extract_text_from_pdf(cv_file)
-        questions = generate_questions_from_cv(text)
-        questions = _normalize_questions(questions)
-
-        #  Add inferred skill + category if missing
-        for q in questions:
-            qtext = q.get("question", "")
-            if "skill" not in q or not q.get("skill"):
-                skill = _infer_skill_from_question(qtext)
-                q["skill"] = skill
-                q["category"] = (
-                    "soft"
-                    if skill in ["Communication", "Project Management"]
-                    else "technical"
-                )
-
-        return JsonResponse({"questions": questions}, status=200, safe=False)
+        text = _generate_text(stored_cv, cv_file)
+        questions, cached = build_questions(text, refresh=refresh, exact=exact)
+        response = JsonResponse({"questions": questions}, status=200, safe=False)
+        response["X-Cache"] = "HIT" if cached else "MISS"
+        return response
 
+    except UnsupportedDocumentError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    except CircuitOpenError as e:
+        return _degraded_response(e)
     except Exception as e:
         return JsonResponse(
             {"error": f"Failed to generate questions: {e}"}, status=500
         )
 
 
+@csrf_exempt
+async def generate_questions_async_view(request):
+    """
+    POST /api/ai/generate/asgi/
+    Async variant of generate_questions_view for ASGI deployments, with the
+    same request and response shapes (no job mode). Extraction runs in a
+    sync thread and the Groq call is awaited, so one worker process can
+    keep many generations in flight.
+    """
+    if request.method != "POST":
+        return JsonResponse({"error": "Invalid request method."}, status=400)
+
+    data, cv_id, cv_file = _read_generate_request(request)
+    stored_cv, error = await sync_to_async(_generate_source)(cv_id, cv_file)
+    if error is not None:
+        return error
+
+    try:
+        # Extraction reads and writes the database, so it runs on the
+        # request's thread-sensitive executor, where Django manages the
+        # connection, rather than on an arbitrary pool thread.
+        text = await sync_to_async(_generate_text)(stored_cv, cv_file)
+
+        questions, cached = await abuild_questions(
+            text, refresh=_flag(request, data, "refresh"), exact=_flag(request, data, "exact")
+        )
+
+        response = JsonResponse({"questions": questions}, status=200, safe=False)
+        response["X-Cache"] = "HIT" if cached else "MISS"
+        return response
+
+    except UnsupportedDocumentError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    except CircuitOpenError as e:
+        return _degraded_response(e)
+    except Exception as e:
+        return JsonResponse(
+            {"error": f"Failed to generate questions: {e}"}, status=500
+        )
+
+
+@csrf_exempt
+def generate_questions_stream_view(request):
+    """
+    POST /api/ai/generate/stream/
+    Same request as generate_questions_view (no job mode), answered as
+    Server-Sent Events while the model is still writing:
+      event: question  data: {question, options, skill, category, ...}
+      event: done      data: {"count": <n>}
+      event: error     data: {"error": "..."}
+    Cached quizzes are replayed at once (X-Cache: HIT); a completed stream
+    fills the cache.
+    """
+    if request.method != "POST":
+        return JsonResponse({"error": "Invalid request method."}, status=400)
+
+    data, cv_id, cv_file = _read_generate_request(request)
+    stored_cv, error = _generate_source(cv_id, cv_file)
+    if error is not None:
+        return error
+
+    try:
+        text = _generate_text(stored_cv, cv_file)
+    except UnsupportedDocumentError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    except Exception as e:
+        return JsonResponse(
+            {"error": f"Failed to generate questions: {e}"}, status=500
+        )
+
+    cached = None
+    if not _flag(request, data, "refresh"):
+        cached = lookup_questions(text, _flag(request, data, "exact"))
+    if cached is not None:
+        events = _replay_question_events(cached)
+    else:
+        events = _stream_question_events(text)
+
+    response = StreamingHttpResponse(events, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # don't let nginx buffer the stream
+    response["X-Cache"] = "HIT" if cached is not None else "MISS"
+    return response
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _replay_question_events(questions):
+    for q in questions:
+        yield _sse("question", q)
+    yield _sse("done", {"count": len(questions)})
+
+
+def _stream_question_events(text):
+    questions = []
+    try:
+        for raw in stream_questions_from_cv(text):
+            # Items normally arrive one question at a time; a wrapper object
+            # ({"questions": [...]}) arrives whole and is unpacked.
+            batch = [raw] if isinstance(raw, dict) and "question" in raw else raw
+            for q in finalize_questions(batch):
+                questions.append(q)
+                yield _sse("question", q)
+    except CircuitOpenError as e:
+        yield _sse("error", _degraded_payload(e))
+        return
+    except Exception as e:
+        yield _sse("error", {"error": f"Failed to generate questions: {e}"})
+        return
+
+    if questions:
+        store_cv_questions(text, questions)
+    yield _sse("done", {"count": len(questions)})
+
+
+@job_handler("generate")
+def _generate_job(job):
+    stored_cv = CV.objects.get(pk=job.payload["cv_id"]) if job.payload.get("cv_id") is not None else None
+    text = _generate_text(stored_cv, job.upload)
+    questions, _ = build_questions(
+        text, refresh=job.payload.get("refresh", False), exact=job.payload.get("exact", False)
+    )
+    return {"questions": questions}
+
+
+class JobStatusView(APIView):
+    """
+    GET /api/ai/jobs/<job_id>/?wait=<seconds>
+    Returns the job's status, plus "result" once it succeeded or "error" if
+    it failed. With ?wait the request is held until the job finishes or the
+    wait (capped at JOB_LONG_POLL_MAX seconds) runs out.
+
+    Jobs queued by a signed-in user are visible to that user only; others
+    get 404. Jobs queued anonymously need the job's secret instead, as
+    ?secret=<secret> (as in the status URL) or an X-Job-Secret header.
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request, job_id):
+        user = request.user if request.user.is_authenticated else None
+        secret = request.query_params.get("secret") or request.headers.get("X-Job-Secret") or None
+        if user is None and secret is None:
+            raise NotAuthenticated()
+        try:
+            wait = float(request.query_params.get("wait") or 0)
+        except ValueError:
+            return Response({"error": "wait must be a number of seconds."}, status=status.HTTP_400_BAD_REQUEST)
+
+        job = wait_for_job(job_id, wait, user=user, secret=secret)
+        if job is None:
+            return Response({"error": "Job not found."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(job_payload(job), status=status.HTTP_200_OK)
+
+
+class LLMMetricsView(APIView):
+    """
+    GET /api/ai/metrics/   (staff only)
+    Per-model LLM call counts, error counts, status codes and latencies
+    recorded by the worker process that serves the request:
+    { "pid", "models": { <model>: { "calls", "errors", "avg_seconds", ... } },
+      "rate_limit_fail_open": { <model>: <calls let through unthrottled> } }.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(
+            {"pid": os.getpid(), "models": get_metrics(), "rate_limit_fail_open": fail_open_counts()},
+            status=status.HTTP_200_OK,
+        )
+
+
 @csrf_exempt
 def submit_answers_view(request):
     """
@@ -133,42 +324,77 @@ def submit_answers_view(request):
 # -----------------
 # Helpers
 # -----------------
-def _normalize_questions(raw):
-    """Accepts dict/list/JSON-string and returns list[dict]."""
-    if raw is None:
-        return []
-    if isinstance(raw, list):
-        return raw
-    if isinstance(raw, dict):
-        if isinstance(raw.get("questions"), list):
-            return raw["questions"]
-        if isinstance(raw.get("data"), list):
-            return raw["data"]
-        return []
-    if isinstance(raw, str):
+def _request_user(request):
+    """The user a plain Django view's request carries a valid JWT for, else None."""
+    try:
+        authenticated = JWTAuthentication().authenticate(request)
+    except (AuthenticationFailed, InvalidToken):
+        return None
+    return authenticated[0] if authenticated else None
+
+
+def _flag(request, data, name):
+    """Read a boolean option from the query string, JSON body or form data."""
+    return is_truthy(request.GET.get(name) or data.get(name) or request.POST.get(name))
+
+
+def _degraded_payload(error):
+    return {
+        "error": "Question generation is temporarily unavailable. Please try again shortly.",
+        "degraded": True,
+        "retry_after": error.retry_after,
+    }
+
+
+def _degraded_response(error):
+    response = JsonResponse(_degraded_payload(error), status=503)
+    response["Retry-After"] = str(error.retry_after)
+    return response
+
+
+def _generate_source(cv_id, cv_file):
+    """Return (stored CV or None, error response or None) for a generate request."""
+    if cv_id is not None:
         try:
-            parsed = json.loads(raw)
-            return _normalize_questions(parsed)
-        except Exception:
-            return [{"question": raw}]
-    return []
-
-
-def _infer_skill_from_question(q: str) -> str:
-    """Basic keyword mapping to keep Results UI consistent."""
-    s = (q or "").lower()
-    if "react" in s:
-        return "React"
-    if "python" in s:
-        return "Python"
-    if "sql" in s or "database" in s:
-        return "SQL"
-    if "project management" in s or "manager" in s:
-        return "Project Management"
-    if "communication" in s or "team" in s:
-        return "Communication"
-    if "marketing" in s:
-        return "Marketing"
-    if "budget" in s or "finance" in s:
-        return "Budget Management"
-    return "General"
+            return CV.objects.get(pk=cv_id), None
+        except (CV.DoesNotExist, TypeError, ValueError):
+            return None, JsonResponse({"error": "CV not found."}, status=404)
+    if not cv_file:
+        return None, JsonResponse(
+            {"error": "Please upload a valid PDF or DOCX file or provide cv_id."},
+            status=400,
+        )
+    return None, None
+
+
+def _generate_text(stored_cv, cv_file):
+    """Text of the CV a generate request names or uploads."""
+    # Stored CVs are usually pre-extracted by the upload worker
+    if stored_cv is not None:
+        return stored_cv_text(stored_cv)
+    return extract_text_from_pdf(cv_file)
+
+
+def _read_generate_request(request):
+    """Return (body data, cv_id, uploaded file) from a JSON or multipart request."""
+    data = {}
+    try:
+        if request.content_type and "application/json" in request.content_type:
+            body = request.body.decode("utf-8") or "{}"
+            data = json.loads(body)
+    except Exception:
+        # Fall back to file upload
+        pass
+    if not isinstance(data, dict):
+        data = {}
+
+    cv_id = data.get("cv_id")
+    cv_file = None
+    if cv_id is None:
+        # Try multipart with a file under common keys
+        for key in ["cv", "file", "pdf", "cv_file", "resume", "document"]:
+            if key in request.FILES:
+                cv_file = request.FILES[key]
+                break
+    return data, cv_id, cv_file
+
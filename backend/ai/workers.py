@@ -0,0 +1,47 @@
+"""Background thread pools for AI work that should not block a request.
+
+CV extraction has a pool of its own (``CV_EXTRACTION_THREADS``), so
+uploads are pre-extracted promptly even while long LLM jobs occupy the
+general pool (``AI_WORKER_THREADS``).
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+_executors = {}
+_executor_lock = threading.Lock()
+
+
+def _get_executor(name, max_workers):
+    with _executor_lock:
+        executor = _executors.get(name)
+        if executor is None:
+            executor = _executors[name] = ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix=name
+            )
+        return executor
+
+
+def _run(fn, args, kwargs):
+    close_old_connections()
+    try:
+        return fn(*args, **kwargs)
+    except Exception:
+        logger.exception(f"Background task {fn.__name__} failed")
+    finally:
+        close_old_connections()
+
+
+def submit(fn, *args, **kwargs):
+    """Run ``fn(*args, **kwargs)`` on the background pool and return its future."""
+    return _get_executor("ai-worker", settings.AI_WORKER_THREADS).submit(_run, fn, args, kwargs)
+
+
+def submit_extraction(fn, *args, **kwargs):
+    """Like ``submit``, on the pool reserved for CV text extraction."""
+    return _get_executor("cv-extraction", settings.CV_EXTRACTION_THREADS).submit(_run, fn, args, kwargs)
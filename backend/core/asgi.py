@@ -2,6 +2,9 @@
 ASGI config for core project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Under ASGI (e.g. ``uvicorn core.asgi:application``) the async AI endpoints
+(/api/ai/generate/asgi/, /api/matcher/asgi/) await Groq calls on the event
+loop instead of holding a worker per request.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
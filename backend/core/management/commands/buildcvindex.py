@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Index the text of every extracted CV for the staff CV search"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--reset", action="store_true", help="Drop the existing index first")
+
+    def handle(self, *args, **options):
+        from cv.models import CV
+        from matcher.index import index_cv
+        from matcher.models import IndexedCV, IndexStats, PostingList
+
+        if options["reset"]:
+            # Postings first, so the per-CV removal signal has nothing left to rewrite.
+            PostingList.objects.all().delete()
+            IndexedCV.objects.all().delete()
+            IndexStats.objects.all().delete()
+            self.stdout.write("Cleared the index")
+
+        indexed = failed = 0
+        rows = CV.objects.filter(extraction_status="done").values_list("pk", "extracted_text")
+        for cv_id, text in rows.iterator():
+            if index_cv(cv_id, text):
+                indexed += 1
+            else:
+                failed += 1
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Indexed {indexed} CVs ({failed} failed); {PostingList.objects.count()} terms"
+        ))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+
+class Command(BaseCommand):
+    help = "Build the corpus term statistics used by the heuristic job-match scorer from stored CVs"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--reset", action="store_true", help="Clear the statistics before rebuilding them")
+
+    def handle(self, *args, **options):
+        from ai import scoring
+        from ai.models import CorpusDocument, CorpusStat, TermStat
+        from cv.models import CV
+
+        if options["reset"]:
+            with transaction.atomic():
+                TermStat.objects.all().delete()
+                CorpusStat.objects.all().delete()
+                CorpusDocument.objects.all().delete()
+            self.stdout.write("Cleared existing statistics")
+
+        added = skipped = 0
+        texts = CV.objects.filter(extraction_status="done").values_list("extracted_text", flat=True)
+        for text in texts.iterator():
+            if scoring.add_document(text, "cv"):
+                added += 1
+            else:
+                skipped += 1
+        scoring.invalidate()
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Added {added} CVs ({skipped} already counted or empty); "
+            f"{TermStat.objects.count()} terms over {CorpusDocument.objects.count()} documents"
+        ))
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ai.stub_server import StubConfig, make_server
+
+
+class Command(BaseCommand):
+    help = "Run a local Groq-compatible chat completions stub for offline load and failure testing"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8089)
+        parser.add_argument(
+            "--latency",
+            default="lognormal:1.5,0.5",
+            help="Response latency: fixed:S, uniform:MIN,MAX, normal:MEAN,SD, lognormal:MEDIAN,SIGMA or exp:MEAN (seconds)",
+        )
+        parser.add_argument("--rate-429", type=float, default=0.0, help="Share of requests answered with 429 (0-1)")
+        parser.add_argument("--rate-5xx", type=float, default=0.0, help="Share of requests answered with 503 (0-1)")
+        parser.add_argument("--rpm", type=int, default=0, help="Simulated requests-per-minute limit (0 = none)")
+        parser.add_argument("--questions", type=int, default=15, help="Questions per generated quiz")
+        parser.add_argument("--stream-chunk-delay", type=float, default=0.02, help="Seconds between streamed chunks")
+        parser.add_argument("--seed", type=int, default=None)
+
+    def handle(self, *args, **options):
+        try:
+            config = StubConfig(
+                latency=options["latency"],
+                rate_429=options["rate_429"],
+                rate_5xx=options["rate_5xx"],
+                rpm=options["rpm"],
+                questions=options["questions"],
+                stream_chunk_delay=options["stream_chunk_delay"],
+                seed=options["seed"],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        server = make_server(options["host"], options["port"], config)
+        host, port = server.server_address[:2]
+        self.stdout.write(self.style.SUCCESS(f"✅ LLM stub listening on http://{host}:{port}"))
+        self.stdout.write(f"Set GROQ_API_URL=http://{host}:{port}/openai/v1/chat/completions")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            summary = ", ".join(f"{status}: {count}" for status, count in sorted(config.stats.items()))
+            self.stdout.write(f"Responses served: {summary or 'none'}")
@@ -0,0 +1,229 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+
+
+def _init_extractor(settings_module):
+    """Process pool initializer: set Django up (spawned children) and keep OCR in-process."""
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", settings_module)
+    import django
+    django.setup()
+    # Each child already is one of the pool's processes; don't nest another pool.
+    settings.OCR_WORKERS = 1
+
+
+def _extract(cv_id):
+    """Extract a stored CV in a pool process. Returns ``(cv_id, text, error)``."""
+    from ai.tasks import extract_stored_cv
+    try:
+        return cv_id, extract_stored_cv(cv_id), None
+    except Exception as e:
+        return cv_id, None, str(e)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = "Extract stored CVs and pre-generate their quiz questions into the cache"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rate", type=float, default=20, help="Question generations started per minute")
+        parser.add_argument("--concurrency", type=int, default=2, help="Generations in flight at once")
+        parser.add_argument("--processes", type=int, default=os.cpu_count() or 1, help="Extraction processes")
+        parser.add_argument("--limit", type=int, default=None, help="Stop after this many CVs")
+        parser.add_argument(
+            "--max-circuit-wait",
+            type=float,
+            default=900,
+            help="Seconds to wait in total for the AI service while its circuit is open before giving up",
+        )
+        parser.add_argument(
+            "--checkpoint",
+            default=str(settings.BASE_DIR / "pregenerate.checkpoint.json"),
+            help="File recording progress so an interrupted run resumes where it stopped "
+                 "(failed CVs are not retried; use --restart, cached CVs are skipped quickly)",
+        )
+        parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and start over")
+
+    def handle(self, *args, **options):
+        from cv.models import CV
+
+        checkpoint = options["checkpoint"]
+        last_id = 0 if options["restart"] else self._read_checkpoint(checkpoint)
+        cv_ids = list(CV.objects.filter(pk__gt=last_id).order_by("pk").values_list("pk", flat=True))
+        if options["limit"]:
+            cv_ids = cv_ids[: options["limit"]]
+        if not cv_ids:
+            self.stdout.write(self.style.SUCCESS("✅ Nothing to do"))
+            return
+        if last_id:
+            self.stdout.write(f"Resuming after CV #{last_id}")
+        self.stdout.write(f"{len(cv_ids)} CVs to process")
+
+        self.stats = {"generated": 0, "cached": 0, "failed": 0}
+        self.started = time.monotonic()
+        self.total = len(cv_ids)
+        self.max_circuit_wait = options["max_circuit_wait"]
+        self.circuit_lock = threading.Lock()
+        self.circuit_waited = 0.0  # seconds during which some generation was blocked
+        self.circuit_blocked = 0
+        self.circuit_blocked_since = None
+        self.aborted = False
+
+        # Forked children must not share the parent's database connections.
+        connections.close_all()
+        extractor = ProcessPoolExecutor(
+            max_workers=max(options["processes"], 1),
+            initializer=_init_extractor,
+            initargs=(os.environ.get("DJANGO_SETTINGS_MODULE", "core.settings"),),
+        )
+        generator = ThreadPoolExecutor(max_workers=max(options["concurrency"], 1))
+        try:
+            self._run(cv_ids, extractor, generator, options, checkpoint)
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING("⚠️ Interrupted; run again to resume"))
+        finally:
+            extractor.shutdown(wait=False, cancel_futures=True)
+            generator.shutdown(wait=True, cancel_futures=True)
+        if self.aborted:
+            raise CommandError(
+                f"AI service unavailable for more than {self.max_circuit_wait:.0f}s in total; run again to resume"
+            )
+
+    def _run(self, cv_ids, extractor, generator, options, checkpoint):
+        interval = 60 / options["rate"] if options["rate"] > 0 else 0
+        window = max(options["processes"], 1) * 2
+        next_start = time.monotonic()
+
+        extracting = {}
+        pending_ids = iter(cv_ids)
+        generating = set()
+        finished = set()
+        order = list(cv_ids)
+        watermark = 0  # index into order: every CV before it is finished
+
+        def fill():
+            while len(extracting) < window:
+                cv_id = next(pending_ids, None)
+                if cv_id is None:
+                    return
+                extracting[extractor.submit(_extract, cv_id)] = cv_id
+
+        fill()
+        while extracting or generating:
+            done, _ = wait(list(extracting) + list(generating), return_when=FIRST_COMPLETED)
+            for future in done:
+                if future in extracting:
+                    del extracting[future]
+                    cv_id, text, error = future.result()
+                    if self.aborted:
+                        continue
+                    if error is not None or not text:
+                        self._report(cv_id, "failed", error or "no text extracted")
+                        finished.add(cv_id)
+                        continue
+                    # Pace generations to --rate; the shared limiter still applies per call.
+                    delay = next_start - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                    next_start = max(next_start, time.monotonic()) + interval
+                    generating.add(generator.submit(self._generate, cv_id, text))
+                else:
+                    generating.discard(future)
+                    cv_id, outcome, detail = future.result()
+                    if outcome == "aborted":
+                        continue  # left unfinished so the next run retries it
+                    self._report(cv_id, outcome, detail)
+                    finished.add(cv_id)
+            if not self.aborted:
+                fill()
+
+            while watermark < len(order) and order[watermark] in finished:
+                watermark += 1
+            if watermark:
+                self._write_checkpoint(checkpoint, order[watermark - 1])
+            if self.aborted and not generating:
+                return
+
+        elapsed = time.monotonic() - self.started
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Done in {elapsed:.0f}s: {self.stats['generated']} generated, "
+            f"{self.stats['cached']} already cached, {self.stats['failed']} failed"
+        ))
+
+    def _generate(self, cv_id, text):
+        """Generate and cache questions for one CV text. Returns ``(cv_id, outcome, detail)``."""
+        from ai.circuit import CircuitOpenError
+        from ai.ai_logic import build_questions, lookup_questions
+
+        try:
+            if lookup_questions(text) is not None:
+                return cv_id, "cached", ""
+            while True:
+                if self.aborted:
+                    return cv_id, "aborted", ""
+                try:
+                    questions, _ = build_questions(text, refresh=True)
+                    break
+                except CircuitOpenError as e:
+                    # The API is down; wait for the breaker's next probe instead of burning CVs.
+                    self._wait_for_circuit(e.retry_after)
+            if not questions:
+                return cv_id, "failed", "no questions generated"
+            return cv_id, "generated", f"{len(questions)} questions"
+        except Exception as e:
+            return cv_id, "failed", str(e)
+        finally:
+            connection.close()
+
+    def _wait_for_circuit(self, seconds):
+        """Sleep until the breaker's next probe, giving up once ``--max-circuit-wait`` is used up."""
+        with self.circuit_lock:
+            now = time.monotonic()
+            waited = self.circuit_waited
+            if self.circuit_blocked:
+                waited += now - self.circuit_blocked_since
+            if waited + seconds > self.max_circuit_wait:
+                self.aborted = True
+                return
+            if not self.circuit_blocked:
+                self.circuit_blocked_since = now
+            self.circuit_blocked += 1
+        try:
+            time.sleep(seconds)
+        finally:
+            with self.circuit_lock:
+                self.circuit_blocked -= 1
+                if not self.circuit_blocked:
+                    self.circuit_waited += time.monotonic() - self.circuit_blocked_since
+
+    def _report(self, cv_id, outcome, detail):
+        self.stats[outcome] += 1
+        done = sum(self.stats.values())
+        elapsed = time.monotonic() - self.started
+        rate = done / elapsed if elapsed else 0
+        eta = (self.total - done) / rate if rate else 0
+        style = self.style.ERROR if outcome == "failed" else (lambda message: message)
+        self.stdout.write(style(
+            f"[{done}/{self.total}] CV #{cv_id}: {outcome}{f' ({detail})' if detail else ''}"
+            f" | {rate * 60:.1f} CVs/min, ETA {eta // 60:.0f}m{eta % 60:02.0f}s"
+        ))
+
+    def _read_checkpoint(self, path):
+        try:
+            with open(path) as fh:
+                return int(json.load(fh).get("last_id", 0))
+        except (OSError, ValueError, AttributeError):
+            return 0
+
+    def _write_checkpoint(self, path, last_id):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as fh:
+            json.dump({"last_id": last_id}, fh)
+        os.replace(tmp_path, path)
@@ -163,6 +163,9 @@ else:
         "http://104.248.136.7",
     ]
 
+# Let the frontend read whether an AI response came from cache
+CORS_EXPOSE_HEADERS = ["X-Cache"]
+
 # -----------------------------
 # Miscellaneous
 # -----------------------------
@@ -176,3 +179,129 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 # AI Key
 # -----------------------------
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+# Chat completions endpoint; point it at `manage.py llmstub` for offline
+# load and failure testing.
+GROQ_API_URL = os.getenv("GROQ_API_URL", "https://api.groq.com/openai/v1/chat/completions")
+# Keep-alive connections per process to the Groq API, and request timeouts
+# in seconds (read timeout applies when a call doesn't set its own).
+GROQ_POOL_SIZE = int(os.getenv("GROQ_POOL_SIZE", "10"))
+GROQ_CONNECT_TIMEOUT = float(os.getenv("GROQ_CONNECT_TIMEOUT", "5"))
+GROQ_READ_TIMEOUT = float(os.getenv("GROQ_READ_TIMEOUT", "60"))
+# In-flight connections per event loop for the async client (ASGI views).
+GROQ_ASYNC_MAX_CONNECTIONS = int(os.getenv("GROQ_ASYNC_MAX_CONNECTIONS", "200"))
+# Client-side rate limit per model, shared by all workers through the
+# database: sustained requests per minute and burst size (RPM 0 disables
+# the bucket; server Retry-After/x-ratelimit-* pauses still apply).
+GROQ_RATE_LIMIT_RPM = float(os.getenv("GROQ_RATE_LIMIT_RPM", "30"))
+GROQ_RATE_LIMIT_BURST = int(os.getenv("GROQ_RATE_LIMIT_BURST", "5"))
+# Longest a call waits for a request slot and retries, in seconds.
+GROQ_RATE_LIMIT_MAX_WAIT = float(os.getenv("GROQ_RATE_LIMIT_MAX_WAIT", "30"))
+# Retries on 429/5xx responses, with jittered exponential backoff (seconds)
+# when the API doesn't say how long to wait.
+GROQ_MAX_RETRIES = int(os.getenv("GROQ_MAX_RETRIES", "3"))
+GROQ_BACKOFF_BASE = float(os.getenv("GROQ_BACKOFF_BASE", "1"))
+GROQ_BACKOFF_MAX = float(os.getenv("GROQ_BACKOFF_MAX", "20"))
+# Identical LLM calls in flight at the same time (any worker) share one
+# request: lease length for the caller making it, how often the others poll,
+# and how long its result stays readable by callers already waiting (seconds).
+# Keep the lease below gunicorn's worker --timeout (120 in start_gunicorn.sh):
+# a leader killed by that timeout leaves its lease behind, and waiters only
+# take over once it expires, so a longer lease outlives the request itself.
+SINGLEFLIGHT_LEASE = float(os.getenv("SINGLEFLIGHT_LEASE", "90"))
+SINGLEFLIGHT_POLL_INTERVAL = float(os.getenv("SINGLEFLIGHT_POLL_INTERVAL", "0.25"))
+SINGLEFLIGHT_RESULT_TTL = float(os.getenv("SINGLEFLIGHT_RESULT_TTL", "5"))
+# Per-model circuit breaker: consecutive failures (network errors, timeouts,
+# 5xx) before calls fail fast, how long it stays open before one probe call
+# is let through, and how long that probe may take (seconds).
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_OPEN_SECONDS = float(os.getenv("CIRCUIT_OPEN_SECONDS", "30"))
+CIRCUIT_PROBE_TIMEOUT = float(os.getenv("CIRCUIT_PROBE_TIMEOUT", "90"))
+
+# -----------------------------
+# CV text extraction
+# -----------------------------
+# Extracted texts are cached by file hash; least recently used entries are
+# evicted once either limit is exceeded.
+EXTRACTION_CACHE_MAX_ENTRIES = int(os.getenv("EXTRACTION_CACHE_MAX_ENTRIES", "500"))
+EXTRACTION_CACHE_MAX_BYTES = int(os.getenv("EXTRACTION_CACHE_MAX_BYTES", str(20 * 1024 * 1024)))
+
+# OCR for scanned CVs: pages are recognized in parallel on a process pool
+# of OCR_WORKERS processes, within OCR_TIMEOUT seconds per document (OCR
+# still running when it runs out is killed).
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(min(4, os.cpu_count() or 1))))
+OCR_TIMEOUT = float(os.getenv("OCR_TIMEOUT", "60"))
+OCR_DPI = int(os.getenv("OCR_DPI", "200"))
+# Pages whose text layer has fewer characters than this are OCR'd.
+OCR_MIN_PAGE_CHARS = int(os.getenv("OCR_MIN_PAGE_CHARS", "50"))
+# CV text embedded in prompts is compacted (boilerplate and duplicate lines
+# dropped, most useful sections first) to about this many tokens.
+CV_PROMPT_TOKEN_BUDGET = int(os.getenv("CV_PROMPT_TOKEN_BUDGET", "800"))
+
+# -----------------------------
+# Background AI workers
+# -----------------------------
+# Threads per process for work queued off the request path (async AI jobs,
+# cache bookkeeping), and separately for extracting uploaded CVs so long LLM
+# jobs can't hold up pre-extraction.
+AI_WORKER_THREADS = int(os.getenv("AI_WORKER_THREADS", "4"))
+CV_EXTRACTION_THREADS = int(os.getenv("CV_EXTRACTION_THREADS", "2"))
+# How long a request waits for a CV extraction that is already running
+# before doing it itself; covers the OCR budget so a scanned CV being OCR'd
+# in the background is not OCR'd a second time.
+CV_EXTRACTION_WAIT = float(os.getenv("CV_EXTRACTION_WAIT", str(OCR_TIMEOUT + 30)))
+# Async AI jobs: longest hold for GET /api/ai/jobs/<id>/?wait=, and the age
+# after which an unfinished job is considered lost.
+JOB_LONG_POLL_MAX = float(os.getenv("JOB_LONG_POLL_MAX", "25"))
+JOB_STALE_AFTER = int(os.getenv("JOB_STALE_AFTER", "900"))
+# Batch job matching (/api/matcher/batch/): jobs per request and matches
+# run at once for one request.
+MATCH_BATCH_MAX_JOBS = int(os.getenv("MATCH_BATCH_MAX_JOBS", "50"))
+MATCH_BATCH_CONCURRENCY = int(os.getenv("MATCH_BATCH_CONCURRENCY", "4"))
+# Jobs whose local similarity to the CV (0-100) is below this get the
+# heuristic report instead of an LLM call; 0 sends every job to the model.
+# Requests can override it with "min_similarity".
+MATCH_PREFILTER_MIN_SCORE = int(os.getenv("MATCH_PREFILTER_MIN_SCORE", "0"))
+
+# -----------------------------
+# AI result caches
+# -----------------------------
+# Generated quiz questions, keyed by CV text, model and prompt version.
+# Entries expire after QUESTION_CACHE_TTL seconds (0 disables expiry).
+QUESTION_CACHE_TTL = int(os.getenv("QUESTION_CACHE_TTL", str(7 * 24 * 3600)))
+QUESTION_CACHE_MAX_ENTRIES = int(os.getenv("QUESTION_CACHE_MAX_ENTRIES", "2000"))
+QUESTION_CACHE_MAX_BYTES = int(os.getenv("QUESTION_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+# Model-generated job match reports, keyed by CV, job description and position.
+MATCH_CACHE_TTL = int(os.getenv("MATCH_CACHE_TTL", str(7 * 24 * 3600)))
+MATCH_CACHE_MAX_ENTRIES = int(os.getenv("MATCH_CACHE_MAX_ENTRIES", "5000"))
+MATCH_CACHE_MAX_BYTES = int(os.getenv("MATCH_CACHE_MAX_BYTES", str(20 * 1024 * 1024)))
+# Near-duplicate CVs (ai.minhash): results cached for a CV text are reused
+# for another whose estimated Jaccard similarity (word 3-grams) is at least
+# NEAR_DUPLICATE_THRESHOLD (0 disables). Requests opt out with "exact".
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.9"))
+NEAR_DUPLICATE_MAX_TEXTS = int(os.getenv("NEAR_DUPLICATE_MAX_TEXTS", "20000"))
+
+# -----------------------------
+# Local match scoring and CV search (no model calls)
+# -----------------------------
+# Seconds each process keeps its copy of the corpus term statistics used
+# by the heuristic match fallback.
+SCORING_STATS_TTL = int(os.getenv("SCORING_STATS_TTL", "300"))
+# Steepness of the curve mapping covered BM25 weight to a 0-100 score
+# (0 = linear); higher values lift partial matches.
+SCORING_CURVE = float(os.getenv("SCORING_CURVE", "3"))
+# Job descriptions counted in those statistics (0 = no limit); stored CVs
+# are always counted.
+SCORING_MAX_JOB_DOCUMENTS = int(os.getenv("SCORING_MAX_JOB_DOCUMENTS", "5000"))
+# Hashed n-gram similarity (ai.similarity): vector size, vectors kept per
+# process, the cosines mapped to 0 and 100, and its share of the heuristic
+# match score (the rest is BM25).
+SIMILARITY_DIMENSIONS = int(os.getenv("SIMILARITY_DIMENSIONS", str(2 ** 14)))
+SIMILARITY_CACHE_SIZE = int(os.getenv("SIMILARITY_CACHE_SIZE", "256"))
+SIMILARITY_FLOOR = float(os.getenv("SIMILARITY_FLOOR", "0.05"))
+SIMILARITY_CEILING = float(os.getenv("SIMILARITY_CEILING", "0.55"))
+SIMILARITY_FALLBACK_WEIGHT = float(os.getenv("SIMILARITY_FALLBACK_WEIGHT", "0.5"))
+# Skills, synonyms and categories recognised in CVs, job descriptions and
+# quiz questions.
+SKILLS_TAXONOMY_PATH = os.getenv("SKILLS_TAXONOMY_PATH", str(BASE_DIR / "ai" / "skills.json"))
+# Most results returned by the staff CV search (/api/matcher/search/).
+CV_SEARCH_MAX_RESULTS = int(os.getenv("CV_SEARCH_MAX_RESULTS", "50"))
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:03
+
+from django.db import migrations, models
+
+
+def fill_skills(apps, schema_editor):
+    from ai.skills import extract_skills
+
+    CV = apps.get_model("cv", "CV")
+    for cv in CV.objects.exclude(extracted_text="").only("pk", "extracted_text").iterator():
+        CV.objects.filter(pk=cv.pk).update(skills=extract_skills(cv.extracted_text))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("cv", "0002_cv_extracted_at_cv_extracted_text_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="cv",
+            name="skills",
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.RunPython(fill_skills, migrations.RunPython.noop),
+    ]
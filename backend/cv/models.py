@@ -10,11 +10,26 @@ def validate_cv_file(value):
          raise ValidationError('Unsupported file type. Only PDF and DOCX files are allowed.')
         
 class CV(models.Model):
+    EXTRACTION_STATUS_CHOICES = (
+        ("pending", "Pending"),
+        ("processing", "Processing"),
+        ("done", "Done"),
+        ("failed", "Failed"),
+    )
+
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='cvs')
     title = models.CharField(max_length=255)
     file = models.FileField(upload_to='cvs/',validators=[validate_cv_file])
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
+    # Filled in by a background worker after upload (see ai.tasks)
+    extraction_status = models.CharField(max_length=20, choices=EXTRACTION_STATUS_CHOICES, default="pending")
+    extraction_method = models.CharField(max_length=10, blank=True, default="")
+    extracted_text = models.TextField(blank=True, default="")
+    extracted_at = models.DateTimeField(null=True, blank=True)
+    # Taxonomy skills found in extracted_text: [{"name", "category", "count"}]
+    skills = models.JSONField(default=list, blank=True)
+
     def __str__(self):
         return self.title
     
\ No newline at end of file
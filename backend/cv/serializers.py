@@ -5,4 +5,15 @@ class CVSerializer(serializers.ModelSerializer):
     class Meta:
         model = CV
         fields = '__all__'
-        read_only_fields = ['user', 'created_at']
+        read_only_fields = [
+            'user', 'created_at',
+            'extraction_status', 'extraction_method', 'extracted_text', 'extracted_at', 'skills',
+        ]
+
+
+class CVListSerializer(CVSerializer):
+    """CV listing without the (up to 12k characters of) extracted text."""
+
+    class Meta(CVSerializer.Meta):
+        fields = None
+        exclude = ['extracted_text']
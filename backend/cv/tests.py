@@ -1,3 +1,32 @@
+from django.contrib.auth.models import User
 from django.test import TestCase
+from rest_framework_simplejwt.tokens import RefreshToken
 
-# Create your tests here.
+from .models import CV
+
+
+class CVListTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("candidate", password="pw")
+        self.cv = CV.objects.create(
+            user=self.user,
+            title="CV",
+            file="cvs/cv.pdf",
+            extraction_status="done",
+            extracted_text="Python and Django developer",
+            skills=[{"name": "Python", "category": "technical", "count": 1}],
+        )
+        token = RefreshToken.for_user(self.user).access_token
+        self.headers = {"Authorization": f"Bearer {token}"}
+
+    def test_list_omits_extracted_text(self):
+        response = self.client.get("/api/cv/", headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        row = response.json()[0]
+        self.assertNotIn("extracted_text", row)
+        self.assertEqual(row["skills"][0]["name"], "Python")
+
+    def test_detail_includes_extracted_text(self):
+        response = self.client.get(f"/api/cv/{self.cv.pk}/", headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["extracted_text"], "Python and Django developer")
@@ -1,15 +1,29 @@
 from rest_framework import viewsets, permissions
 from .models import CV
-from .serializers import CVSerializer
+from .serializers import CVListSerializer, CVSerializer
 from rest_framework.permissions import IsAuthenticated
+from ai.tasks import enqueue_cv_extraction
 
 class CVViewSet(viewsets.ModelViewSet):
     queryset = CV.objects.all()
     serializer_class = CVSerializer
     permission_classes = [IsAuthenticated]
 
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return CVListSerializer
+        return CVSerializer
+
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        cv = serializer.save(user=self.request.user)
+        enqueue_cv_extraction(cv)
+
+    def perform_update(self, serializer):
+        if 'file' in serializer.validated_data:
+            cv = serializer.save(extraction_status="pending", extracted_text="", extraction_method="", skills=[])
+            enqueue_cv_extraction(cv)
+        else:
+            serializer.save()
 
     def get_queryset(self):
         user = self.request.user
@@ -0,0 +1,241 @@
+"""Inverted index over stored CVs and ranked top-k search.
+
+Each term's posting list is one ``PostingList`` row holding the ids of the
+CVs that contain it and the term frequencies, packed into a binary blob
+(5 bytes per posting). CVs are added when their text is extracted
+(``ai.tasks``) and removed when they are deleted (``matcher.signals``).
+
+``search`` ranks CVs against a job description with BM25 (same tokenizer
+and parameters as ``ai.scoring``) using WAND: every term has an upper bound
+on what it can add to a CV's score, and CVs whose terms can't add up to
+the current k-th best score are skipped without being scored, so queries
+mostly touch the CVs that contain the rarer, heavier terms. The corpus size
+and average length come from ``IndexStats``; CV lengths are fetched in
+batches for the CVs WAND actually scores.
+"""
+import heapq
+import logging
+import math
+import sys
+from array import array
+from bisect import bisect_left
+from collections import Counter
+
+from django.db import DatabaseError, transaction
+from django.db.models import F
+
+from ai.scoring import B, K1, POSITION_WEIGHT, terms
+
+from .models import IndexedCV, IndexStats, PostingList
+
+logger = logging.getLogger(__name__)
+
+MAX_TF = 255
+# CV lengths fetched per query while searching.
+LENGTH_BATCH = 500
+_BIG_ENDIAN = sys.byteorder == "big"
+
+
+def _unpack(posting):
+    """Return ``(cv_ids, tfs)`` arrays for a ``PostingList`` row."""
+    blob = bytes(posting.postings)
+    ids = array("I")
+    ids.frombytes(blob[: posting.df * 4])
+    if _BIG_ENDIAN:
+        ids.byteswap()
+    tfs = array("B", blob[posting.df * 4:])
+    return ids, tfs
+
+
+def _pack(posting, ids, tfs):
+    if _BIG_ENDIAN:
+        ids = array("I", ids)
+        ids.byteswap()
+    posting.postings = ids.tobytes() + tfs.tobytes()
+    posting.df = len(tfs)
+    posting.max_tf = max(tfs, default=0)
+
+
+def _remove(ids, tfs, cv_id):
+    i = bisect_left(ids, cv_id)
+    if i < len(ids) and ids[i] == cv_id:
+        del ids[i]
+        del tfs[i]
+
+
+def _adjust_stats(documents, length):
+    IndexStats.objects.get_or_create(pk=1)
+    IndexStats.objects.filter(pk=1).update(
+        documents=F("documents") + documents, total_length=F("total_length") + length
+    )
+
+
+def index_cv(cv_id, text):
+    """Add (or re-add) a CV's text to the index. Returns False if the index could not be updated."""
+    counts = Counter(terms(text))
+    try:
+        with transaction.atomic():
+            previous = IndexedCV.objects.select_for_update().filter(cv_id=cv_id).first()
+            old_terms = set(previous.terms.split()) if previous else set()
+            affected = sorted(old_terms | set(counts))
+            PostingList.objects.bulk_create(
+                [PostingList(term=term) for term in counts], ignore_conflicts=True, batch_size=500
+            )
+            changed = []
+            for start in range(0, len(affected), 500):
+                # Lock rows in term order, so concurrent updates can't deadlock.
+                rows = (
+                    PostingList.objects.select_for_update()
+                    .filter(term__in=affected[start:start + 500])
+                    .order_by("term")
+                )
+                for posting in rows:
+                    ids, tfs = _unpack(posting)
+                    _remove(ids, tfs, cv_id)
+                    if posting.term in counts:
+                        i = bisect_left(ids, cv_id)
+                        ids.insert(i, cv_id)
+                        tfs.insert(i, min(counts[posting.term], MAX_TF))
+                    _pack(posting, ids, tfs)
+                    changed.append(posting)
+            PostingList.objects.bulk_update(changed, ["df", "max_tf", "postings"], batch_size=200)
+            PostingList.objects.filter(term__in=old_terms - set(counts), df=0).delete()
+            length = sum(counts.values())
+            _, created = IndexedCV.objects.update_or_create(
+                cv_id=cv_id, defaults={"length": length, "terms": " ".join(sorted(counts))}
+            )
+            if created:
+                _adjust_stats(1, length)
+            elif previous:
+                _adjust_stats(0, length - previous.length)
+    except DatabaseError as e:
+        logger.warning(f"Could not index CV {cv_id}: {e}")
+        return False
+    return True
+
+
+def remove_cv(cv_id, cv_terms, length):
+    """Drop a CV of ``length`` terms from the posting lists of ``cv_terms``."""
+    cv_terms = sorted(set(cv_terms))
+    try:
+        with transaction.atomic():
+            changed = []
+            for start in range(0, len(cv_terms), 500):
+                # Lock rows in term order, so concurrent updates can't deadlock.
+                rows = (
+                    PostingList.objects.select_for_update()
+                    .filter(term__in=cv_terms[start:start + 500])
+                    .order_by("term")
+                )
+                for posting in rows:
+                    ids, tfs = _unpack(posting)
+                    _remove(ids, tfs, cv_id)
+                    _pack(posting, ids, tfs)
+                    changed.append(posting)
+            PostingList.objects.bulk_update(changed, ["df", "max_tf", "postings"], batch_size=200)
+            PostingList.objects.filter(term__in=cv_terms, df=0).delete()
+            _adjust_stats(-1, -length)
+    except DatabaseError as e:
+        logger.warning(f"Could not remove CV {cv_id} from the index: {e}")
+
+
+class _Cursor:
+    """Iterator over one term's posting list."""
+
+    def __init__(self, ids, tfs, weight, bound):
+        self.ids = ids
+        self.tfs = tfs
+        self.weight = weight
+        self.bound = bound
+        self.position = 0
+
+    @property
+    def doc(self):
+        return self.ids[self.position] if self.position < len(self.ids) else None
+
+    def seek(self, cv_id):
+        self.position = bisect_left(self.ids, cv_id, self.position)
+
+
+def _fetch_lengths(lengths, cursors, pivot_doc, avg_length):
+    """Load the lengths of the pivot and the next CVs on the cursors, ``LENGTH_BATCH`` at a time."""
+    upcoming = set()
+    for cursor in cursors:
+        upcoming.update(cursor.ids[cursor.position:cursor.position + LENGTH_BATCH])
+    batch = sorted(cv_id for cv_id in upcoming if cv_id >= pivot_doc and cv_id not in lengths)[:LENGTH_BATCH]
+    found = dict(IndexedCV.objects.filter(cv_id__in=batch).values_list("cv_id", "length"))
+    for cv_id in batch:
+        # A CV deleted since its postings were read scores with the average length.
+        lengths[cv_id] = found.get(cv_id, avg_length)
+
+
+def search(job_description, position="", k=10):
+    """Return the ``k`` best matching CVs as ``[(cv_id, score)]``, best first.
+
+    Scores are BM25 with the job description (and the position, weighted
+    ``POSITION_WEIGHT``) as the query.
+    """
+    query = Counter(terms(job_description))
+    for term in terms(position):
+        query[term] += POSITION_WEIGHT
+    if not query or k <= 0:
+        return []
+
+    stats = IndexStats.objects.filter(pk=1).first()
+    if stats is None or stats.documents <= 0:
+        return []
+    total = stats.documents
+    avg_length = stats.total_length / total or 1
+    lengths = {}
+
+    cursors = []
+    for posting in PostingList.objects.filter(term__in=list(query), df__gt=0):
+        ids, tfs = _unpack(posting)
+        idf = math.log(1 + (total - posting.df + 0.5) / (posting.df + 0.5))
+        weight = idf * query[posting.term]
+        # Largest contribution possible: highest tf in the shortest possible CV.
+        bound = weight * posting.max_tf * (K1 + 1) / (posting.max_tf + K1 * (1 - B))
+        cursors.append(_Cursor(ids, tfs, weight, bound))
+
+    top = []  # min-heap of (score, -cv_id)
+    while True:
+        cursors = [c for c in cursors if c.doc is not None]
+        if not cursors:
+            break
+        cursors.sort(key=lambda c: c.doc)
+        threshold = top[0][0] if len(top) >= k else 0.0
+
+        # Pivot: the first CV whose terms could together beat the threshold.
+        reach, pivot = 0.0, None
+        for i, cursor in enumerate(cursors):
+            reach += cursor.bound
+            if reach > threshold:
+                pivot = i
+                break
+        if pivot is None:
+            break
+        pivot_doc = cursors[pivot].doc
+
+        if cursors[0].doc == pivot_doc:
+            if pivot_doc not in lengths:
+                _fetch_lengths(lengths, cursors, pivot_doc, avg_length)
+            length = lengths[pivot_doc]
+            norm = K1 * (1 - B + B * length / avg_length)
+            score = 0.0
+            for cursor in cursors:
+                if cursor.doc != pivot_doc:
+                    break
+                tf = cursor.tfs[cursor.position]
+                score += cursor.weight * tf * (K1 + 1) / (tf + norm)
+                cursor.position += 1
+            entry = (score, -pivot_doc)
+            if len(top) < k:
+                heapq.heappush(top, entry)
+            elif entry > top[0]:
+                heapq.heapreplace(top, entry)
+        else:
+            # No CV before the pivot can make the top k: skip them all.
+            for cursor in cursors[:pivot]:
+                cursor.seek(pivot_doc)
+
+    return [(-neg_id, score) for score, neg_id in sorted(top, reverse=True)]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ("cv", "0002_cv_extracted_at_cv_extracted_text_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="IndexedCV",
+            fields=[
+                (
+                    "cv",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="search_index",
+                        serialize=False,
+                        to="cv.cv",
+                    ),
+                ),
+                ("length", models.PositiveIntegerField(default=0)),
+                ("terms", models.TextField(blank=True, default="")),
+                ("indexed_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="PostingList",
+            fields=[
+                (
+                    "term",
+                    models.CharField(max_length=64, primary_key=True, serialize=False),
+                ),
+                ("df", models.PositiveIntegerField(default=0)),
+                ("max_tf", models.PositiveSmallIntegerField(default=0)),
+                ("postings", models.BinaryField(default=b"")),
+            ],
+        ),
+    ]
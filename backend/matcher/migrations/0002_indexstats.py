@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:21
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def fill_stats(apps, schema_editor):
+    IndexedCV = apps.get_model("matcher", "IndexedCV")
+    IndexStats = apps.get_model("matcher", "IndexStats")
+    totals = IndexedCV.objects.aggregate(documents=Count("pk"), total_length=Sum("length"))
+    IndexStats.objects.create(pk=1, documents=totals["documents"], total_length=totals["total_length"] or 0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("matcher", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="IndexStats",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("documents", models.PositiveIntegerField(default=0)),
+                ("total_length", models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(fill_stats, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,42 @@
 from django.db import models
 
-# Create your models here.
+from cv.models import CV
+
+
+class PostingList(models.Model):
+    """The stored CVs containing a term, for ranked CV search (see ``matcher.index``).
+
+    ``postings`` packs the CV ids as little-endian uint32 in ascending order,
+    followed by one byte per CV with the term's frequency (capped at 255).
+    """
+
+    term = models.CharField(max_length=64, primary_key=True)
+    df = models.PositiveIntegerField(default=0)
+    max_tf = models.PositiveSmallIntegerField(default=0)
+    postings = models.BinaryField(default=b"")
+
+    def __str__(self):
+        return f"{self.term} ({self.df} CVs)"
+
+
+class IndexedCV(models.Model):
+    """A CV present in the posting lists, with what is needed to score and remove it."""
+
+    cv = models.OneToOneField(CV, on_delete=models.CASCADE, primary_key=True, related_name="search_index")
+    length = models.PositiveIntegerField(default=0)
+    # Distinct terms, space separated: the posting lists to update on removal.
+    terms = models.TextField(blank=True, default="")
+    indexed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"CV {self.cv_id} ({self.length} terms)"
+
+
+class IndexStats(models.Model):
+    """Number of indexed CVs and their total length, kept in step with ``IndexedCV`` (one row)."""
+
+    documents = models.PositiveIntegerField(default=0)
+    total_length = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.documents} CVs indexed"
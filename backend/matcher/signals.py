@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .index import remove_cv
+from .models import IndexedCV
+
+
+@receiver(post_delete, sender=IndexedCV)
+def remove_deleted_cv(sender, instance, **kwargs):
+    """Take a CV out of the posting lists when it (and so its index entry) is deleted."""
+    remove_cv(instance.cv_id, instance.terms.split(), instance.length)
@@ -1,3 +1,202 @@
-from django.test import TestCase
+import json
+import math
+import random
+import threading
+from collections import Counter
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.test import TestCase, TransactionTestCase, override_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from ai.scoring import B, K1, POSITION_WEIGHT, terms
+from ai.stub_server import StubConfig, make_server
+from cv.models import CV
+
+from .index import index_cv, search
+from .models import IndexedCV, IndexStats
+
+
+class FailingLLMTestCase(TransactionTestCase):
+    """Runs against a stub LLM that answers every request with a 5xx."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = make_server(port=0, config=StubConfig(latency="fixed:0", rate_5xx=1.0))
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        host, port = cls.server.server_address[:2]
+        cls.api_url = f"http://{host}:{port}/openai/v1/chat/completions"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = User.objects.create_user("candidate", password="pw")
+        self.cv = CV.objects.create(
+            user=self.user,
+            title="CV",
+            file="cvs/cv.pdf",
+            extraction_status="done",
+            extracted_text="Skills\nPython, Django, PostgreSQL, Docker\nExperience\nBackend developer.",
+        )
+        self.token = str(RefreshToken.for_user(self.user).access_token)
+
+
+class AsyncMatchFallbackTests(FailingLLMTestCase):
+    """The ASGI matcher must fall back to the heuristic, not crash, when the LLM fails."""
+
+    async def test_asgi_match_falls_back_when_llm_fails(self):
+        with override_settings(GROQ_API_URL=self.api_url, GROQ_MAX_RETRIES=0):
+            response = await self.async_client.post(
+                "/api/matcher/asgi/",
+                {"cv_id": self.cv.pk, "job_description": "Python and Django developer", "position": "Backend"},
+                content_type="application/json",
+                headers={"Authorization": f"Bearer {self.token}"},
+            )
+        self.assertEqual(response.status_code, 200)
+        report = response.json()
+        self.assertIn("fallback heuristic", report["summary"])
+        self.assertGreater(report["match_score"], 0)
+
+
+class BatchPrefilterTests(FailingLLMTestCase):
+    def _batch(self, **data):
+        jobs = [{"job_description": "Pastry chef for a busy bakery", "position": "Chef"}]
+        with override_settings(GROQ_API_URL=self.api_url, GROQ_MAX_RETRIES=0, MATCH_PREFILTER_MIN_SCORE=50):
+            response = self.client.post(
+                "/api/matcher/batch/",
+                {"cv_id": self.cv.pk, "jobs": jobs, **data},
+                content_type="application/json",
+                headers={"Authorization": f"Bearer {self.token}"},
+            )
+            lines = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+        return lines[0]
+
+    def test_default_threshold_applies(self):
+        self.assertTrue(self._batch().get("prefiltered"))
+
+    def test_explicit_zero_disables_prefilter(self):
+        self.assertNotIn("prefiltered", self._batch(min_similarity=0))
+
+
+class CVSearchTests(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user("recruiter", password="pw", is_staff=True)
+        texts = {
+            "Python": "Skills\nPython, Django, PostgreSQL\nExperience\nBackend developer.",
+            "Design": "Skills\nFigma, Photoshop\nExperience\nGraphic designer.",
+        }
+        for title, text in texts.items():
+            cv = CV.objects.create(
+                user=self.staff, title=title, file="cvs/cv.pdf", extraction_status="done", extracted_text=text
+            )
+            index_cv(cv.pk, text)
+        self.token = str(RefreshToken.for_user(self.staff).access_token)
+
+    def test_results_carry_similarity(self):
+        response = self.client.post(
+            "/api/matcher/search/",
+            {"job_description": "Python Django backend developer", "position": "Backend"},
+            content_type="application/json",
+            headers={"Authorization": f"Bearer {self.token}"},
+        )
+        self.assertEqual(response.status_code, 200)
+        results = response.json()["results"]
+        self.assertEqual(results[0]["title"], "Python")
+        self.assertTrue(all(0 <= r["similarity"] <= 100 for r in results))
+
+
+VOCABULARY = [
+    "python", "django", "postgresql", "docker", "kubernetes", "react", "typescript", "terraform",
+    "linux", "kafka", "spark", "airflow", "figma", "leadership", "mentoring", "agile", "scrum",
+    "testing", "security", "networking", "golang", "rust", "java", "spring", "redis", "graphql",
+]
+
+
+def brute_force_search(texts, job_description, position="", k=10):
+    """BM25 over every CV in ``texts`` ({cv_id: text}), ranked like ``search``."""
+    query = Counter(terms(job_description))
+    for term in terms(position):
+        query[term] += POSITION_WEIGHT
+    documents = {cv_id: Counter(terms(text)) for cv_id, text in texts.items()}
+    lengths = {cv_id: sum(counts.values()) for cv_id, counts in documents.items()}
+    avg_length = sum(lengths.values()) / len(lengths) or 1
+    scored = []
+    for cv_id, counts in documents.items():
+        norm = K1 * (1 - B + B * lengths[cv_id] / avg_length)
+        score, matched = 0.0, False
+        for term, weight in query.items():
+            tf = counts.get(term)
+            if not tf:
+                continue
+            df = sum(1 for other in documents.values() if term in other)
+            idf = math.log(1 + (len(documents) - df + 0.5) / (df + 0.5))
+            score += idf * weight * tf * (K1 + 1) / (tf + norm)
+            matched = True
+        if matched:
+            scored.append((score, -cv_id))
+    scored.sort(reverse=True)
+    return [(-neg_id, score) for score, neg_id in scored[:k]]
+
+
+class IndexSearchTests(TestCase):
+    """WAND search must return exactly what scoring every CV would."""
+
+    def setUp(self):
+        self.rng = random.Random(20251018)
+        self.user = User.objects.create_user("owner", password="pw")
+        self.texts = {}
+        for _ in range(40):
+            self._store(CV.objects.create(user=self.user, title="CV", file="cvs/cv.pdf"))
+
+    def _random_text(self, words=30):
+        # A skewed draw, so some terms are common and others rare.
+        return " ".join(self.rng.choice(VOCABULARY[: self.rng.randint(3, len(VOCABULARY))]) for _ in range(words))
+
+    def _store(self, cv, text=None):
+        text = text or self._random_text(self.rng.randint(5, 60))
+        self.assertTrue(index_cv(cv.pk, text))
+        self.texts[cv.pk] = text
+
+    def assertMatchesBruteForce(self):
+        queries = [("python django postgresql", "backend"), ("figma", ""), ("rust golang kafka spark", "data")]
+        queries += [(self._random_text(8), "") for _ in range(5)]
+        for job_description, position in queries:
+            for k in (1, 3, 10, 100):
+                with self.subTest(query=job_description, k=k):
+                    expected = brute_force_search(self.texts, job_description, position, k)
+                    actual = search(job_description, position, k)
+                    self.assertEqual([cv_id for cv_id, _ in actual], [cv_id for cv_id, _ in expected])
+                    for (_, got), (_, want) in zip(actual, expected):
+                        self.assertAlmostEqual(got, want, places=9)
+
+    def test_after_indexing(self):
+        self.assertMatchesBruteForce()
+
+    def test_after_reindexing(self):
+        for cv_id in self.rng.sample(sorted(self.texts), 15):
+            self._store(CV.objects.get(pk=cv_id))
+        self.assertMatchesBruteForce()
+
+    def test_after_deletes(self):
+        for cv_id in self.rng.sample(sorted(self.texts), 15):
+            CV.objects.filter(pk=cv_id).delete()
+            del self.texts[cv_id]
+        self.assertMatchesBruteForce()
+
+    def test_lengths_fetched_in_small_batches(self):
+        with mock.patch("matcher.index.LENGTH_BATCH", 3):
+            self.assertMatchesBruteForce()
+
+    def test_stats_follow_reindexing_and_deletes(self):
+        for cv_id in self.rng.sample(sorted(self.texts), 10):
+            self._store(CV.objects.get(pk=cv_id))
+        for cv_id in self.rng.sample(sorted(self.texts), 10):
+            CV.objects.filter(pk=cv_id).delete()
+        stats = IndexStats.objects.get(pk=1)
+        self.assertEqual(stats.documents, IndexedCV.objects.count())
+        self.assertEqual(stats.total_length, sum(IndexedCV.objects.values_list("length", flat=True)))
@@ -1,6 +1,9 @@
 from django.urls import path
-from .views import JobMatcherView
+from .views import BatchJobMatcherView, CVSearchView, JobMatcherView, job_match_async_view
 
 urlpatterns = [
     path("", JobMatcherView.as_view(), name="job_matcher"),
+    path("asgi/", job_match_async_view, name="job_matcher_asgi"),
+    path("batch/", BatchJobMatcherView.as_view(), name="job_matcher_batch"),
+    path("search/", CVSearchView.as_view(), name="cv_search"),
 ]
@@ -1,41 +1,365 @@
+import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework_simplejwt.authentication import JWTAuthentication
 
 from ai.ai_logic import extract_text_from_pdf
-from ai.ai_logic import analyze_job_match
+from ai.ai_logic import acached_job_match, cached_job_match, heuristic_job_match
+from ai.documents import UnsupportedDocumentError
+from ai.jobs import enqueue_job, is_truthy, job_accepted_response, job_handler
+from ai.similarity import score_cvs, score_jobs
+from ai.tasks import stored_cv_text
 from assessment.models import Assessment
+from cv.models import CV
+
+from .index import search
 
 class JobMatcherView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
         cv_file = request.FILES.get("cv")
+        cv_id = request.data.get("cv_id")
         job_description = request.data.get("job_description")
         position = request.data.get("position")
+        refresh = is_truthy(request.query_params.get("refresh") or request.data.get("refresh"))
+        exact = is_truthy(request.query_params.get("exact") or request.data.get("exact"))
 
-        if not (cv_file and job_description and position):
+        if not ((cv_file or cv_id) and job_description and position):
             return Response({"error": "Missing required fields."}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Step 1: Extract text from CV
-        cv_text = extract_text_from_pdf(cv_file)
-
-        # Step 2: AI Analysis
-        ai_result = analyze_job_match(cv_text, job_description, position)
-
-        # Step 3: Save to assessment history as a 'match' record (excluded from quiz dashboard)
-        Assessment.objects.create(
-            user=request.user,
-            kind="match",
-            position=position,
-            average_score=ai_result.get("match_score", 0) or 0,
-            # Keep original matcher payload shape; quiz UI won't consume these entries
-            skills_analyzed={
-                "missing_keywords": ai_result.get("missing_keywords", []),
-                "summary": ai_result.get("summary", ""),
-            },
-        )
+        stored_cv = None
+        if not cv_file:
+            stored_cv = _visible_cvs(request.user).filter(pk=cv_id).first()
+            if stored_cv is None:
+                return Response({"error": "CV not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        # Job mode: queue the match and let the client poll /api/ai/jobs/<id>/
+        if is_truthy(request.query_params.get("async") or request.data.get("async")):
+            job = enqueue_job(
+                "match",
+                user=request.user,
+                payload={
+                    "cv_id": stored_cv.pk if stored_cv else None,
+                    "job_description": job_description,
+                    "position": position,
+                    "refresh": refresh,
+                    "exact": exact,
+                },
+                upload=cv_file,
+            )
+            return job_accepted_response(request, job)
+
+        # Step 1: Extract text from CV (stored CVs are pre-extracted at upload)
+        try:
+            cv_text = stored_cv_text(stored_cv) if stored_cv else extract_text_from_pdf(cv_file)
+        except UnsupportedDocumentError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Steps 2-3: AI analysis (cached per CV/job/position) + history
+        ai_result, cached = run_match(request.user, cv_text, job_description, position, refresh, exact)
 
         # Step 4: Return result
-        return Response(ai_result, status=status.HTTP_200_OK)
+        response = Response(ai_result, status=status.HTTP_200_OK)
+        response["X-Cache"] = "HIT" if cached else "MISS"
+        return response
+
+
+@csrf_exempt
+async def job_match_async_view(request):
+    """
+    POST /api/matcher/asgi/
+    Async variant of JobMatcherView for ASGI deployments, with the same
+    fields and response (no job mode). Extraction runs on a worker thread
+    and the Groq call is awaited instead of holding a worker.
+    """
+    if request.method != "POST":
+        return JsonResponse({"error": "Invalid request method."}, status=405)
+
+    try:
+        auth = await sync_to_async(JWTAuthentication().authenticate)(request)
+    except AuthenticationFailed as e:
+        return JsonResponse({"detail": str(e.detail)}, status=401)
+    if auth is None:
+        return JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+    user = auth[0]
+
+    data = request.POST
+    if request.content_type and "application/json" in request.content_type:
+        try:
+            data = json.loads(request.body.decode("utf-8") or "{}")
+        except ValueError:
+            return JsonResponse({"error": "Invalid JSON body."}, status=400)
+
+    cv_file = request.FILES.get("cv")
+    cv_id = data.get("cv_id")
+    job_description = data.get("job_description")
+    position = data.get("position")
+    refresh = is_truthy(request.GET.get("refresh") or data.get("refresh"))
+    exact = is_truthy(request.GET.get("exact") or data.get("exact"))
+
+    if not ((cv_file or cv_id) and job_description and position):
+        return JsonResponse({"error": "Missing required fields."}, status=400)
+
+    try:
+        # Thread-sensitive (the default): extraction uses the database.
+        if cv_file:
+            cv_text = await sync_to_async(extract_text_from_pdf)(cv_file)
+        else:
+            stored_cv = await _visible_cvs(user).filter(pk=cv_id).afirst()
+            if stored_cv is None:
+                return JsonResponse({"error": "CV not found."}, status=404)
+            cv_text = await sync_to_async(stored_cv_text)(stored_cv)
+    except UnsupportedDocumentError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    ai_result, cached = await acached_job_match(cv_text, job_description, position, refresh, exact)
+    await Assessment.objects.acreate(**_match_assessment(user, position, ai_result))
+    response = JsonResponse(ai_result, status=200)
+    response["X-Cache"] = "HIT" if cached else "MISS"
+    return response
+
+
+class BatchJobMatcherView(APIView):
+    """
+    POST /api/matcher/batch/
+    Body: { "cv_id": <int> } or multipart "cv", plus
+          "jobs": [ { "job_description", "position", "id"? }, ... ]
+          (a JSON string in multipart requests) and optional "refresh",
+          "exact" and "min_similarity" (0-100, default MATCH_PREFILTER_MIN_SCORE).
+    The CV is extracted once and matched against every job, a few at a
+    time. With min_similarity, jobs whose local similarity to the CV is
+    lower skip the model and get the heuristic report ("prefiltered": true).
+    Results stream back as NDJSON in completion order, one line per
+    job ({ "index", "id"?, "position", "cached", ...match result } or
+    { "index", ..., "error" }), then { "done": true, "count", "failed" }.
+    All results are saved to history in one insert.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        cv_file = request.FILES.get("cv")
+        cv_id = request.data.get("cv_id")
+        refresh = is_truthy(request.query_params.get("refresh") or request.data.get("refresh"))
+        exact = is_truthy(request.query_params.get("exact") or request.data.get("exact"))
+        min_similarity = request.data.get("min_similarity")
+        if min_similarity in (None, ""):
+            min_similarity = settings.MATCH_PREFILTER_MIN_SCORE
+        try:
+            min_similarity = float(min_similarity)
+        except (TypeError, ValueError):
+            return Response({"error": "min_similarity must be a number."}, status=status.HTTP_400_BAD_REQUEST)
+
+        jobs = request.data.get("jobs")
+        if isinstance(jobs, str):
+            try:
+                jobs = json.loads(jobs)
+            except ValueError:
+                return Response({"error": "jobs must be a JSON list."}, status=status.HTTP_400_BAD_REQUEST)
+        if not (cv_file or cv_id) or not isinstance(jobs, list) or not jobs:
+            return Response({"error": "Missing required fields."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(jobs) > settings.MATCH_BATCH_MAX_JOBS:
+            return Response(
+                {"error": f"At most {settings.MATCH_BATCH_MAX_JOBS} jobs per batch."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        for job in jobs:
+            if not (isinstance(job, dict) and job.get("job_description") and job.get("position")):
+                return Response(
+                    {"error": "Each job needs a job_description and a position."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+        stored_cv = None
+        if not cv_file:
+            stored_cv = _visible_cvs(request.user).filter(pk=cv_id).first()
+            if stored_cv is None:
+                return Response({"error": "CV not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        # Extract once for the whole batch
+        try:
+            cv_text = stored_cv_text(stored_cv) if stored_cv else extract_text_from_pdf(cv_file)
+        except UnsupportedDocumentError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        response = StreamingHttpResponse(
+            _stream_batch_matches(request.user, cv_text, jobs, refresh, min_similarity, exact),
+            content_type="application/x-ndjson",
+        )
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+
+class CVSearchView(APIView):
+    """
+    POST /api/matcher/search/   (staff only)
+    Body: { "job_description", "position"?, "k"? }
+    Returns the k stored CVs (default 10, at most CV_SEARCH_MAX_RESULTS)
+    that best match the job, best first:
+    { "results": [ { "cv_id", "title", "user", "score", "similarity" }, ... ] }.
+    Scores are BM25 relevance, comparable within one query only;
+    similarity is the 0-100 local similarity of the CV to the job, the
+    same measure the batch matcher's min_similarity uses.
+    """
+    permission_classes = [IsAdminUser]
+
+    def post(self, request):
+        job_description = request.data.get("job_description")
+        position = request.data.get("position") or ""
+        if not job_description:
+            return Response({"error": "Missing required fields."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            k = int(request.data.get("k") or 10)
+        except (TypeError, ValueError):
+            return Response({"error": "k must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+        k = max(1, min(k, settings.CV_SEARCH_MAX_RESULTS))
+
+        ranked = search(job_description, position, k)
+        cvs = CV.objects.select_related("user").in_bulk([cv_id for cv_id, _ in ranked])
+        ranked = [(cv_id, score) for cv_id, score in ranked if cv_id in cvs]
+        similarities = score_cvs(job_description, position, [cvs[cv_id].extracted_text for cv_id, _ in ranked])
+        results = [
+            {
+                "cv_id": cv_id,
+                "title": cvs[cv_id].title,
+                "user": cvs[cv_id].user.username,
+                "score": round(score, 3),
+                "similarity": similarity,
+            }
+            for (cv_id, score), similarity in zip(ranked, similarities)
+        ]
+        return Response({"results": results}, status=status.HTTP_200_OK)
+
+
+def _stream_batch_matches(user, cv_text, jobs, refresh, min_similarity=0, exact=False):
+    """Match ``cv_text`` against each job, yielding NDJSON lines as matches finish.
+
+    At most ``MATCH_BATCH_CONCURRENCY`` matches run at once; the shared rate
+    limiter paces the Groq calls themselves. Jobs scoring below
+    ``min_similarity`` locally are answered first, without the model.
+    History is written in one ``bulk_create`` at the end, including when
+    the client disconnects.
+    """
+    assessments = []
+    failed = 0
+    selected = list(range(len(jobs)))
+    similarities = {}
+    if min_similarity > 0:
+        scores = score_jobs(cv_text, [(job["job_description"], job["position"]) for job in jobs])
+        similarities = dict(enumerate(scores))
+        selected = [index for index in selected if similarities[index] >= min_similarity]
+
+    def base_line(index):
+        job = jobs[index]
+        line = {"index": index, "position": job["position"]}
+        if "id" in job:
+            line["id"] = job["id"]
+        if index in similarities:
+            line["similarity"] = similarities[index]
+        return line
+
+    pool = ThreadPoolExecutor(max_workers=max(min(settings.MATCH_BATCH_CONCURRENCY, len(selected)), 1))
+    futures = {
+        pool.submit(
+            _batch_match, cv_text, jobs[index]["job_description"], jobs[index]["position"], refresh, exact
+        ): index
+        for index in selected
+    }
+    try:
+        for index in sorted(set(similarities) - set(selected)):
+            job = jobs[index]
+            ai_result = heuristic_job_match(
+                cv_text, job["job_description"], job["position"], "low similarity to the CV"
+            )
+            line = base_line(index)
+            line.update(ai_result, cached=False, prefiltered=True)
+            assessments.append(Assessment(**_match_assessment(user, job["position"], ai_result)))
+            yield json.dumps(line) + "\n"
+
+        for future in as_completed(futures):
+            index = futures[future]
+            job = jobs[index]
+            line = base_line(index)
+            try:
+                ai_result, cached = future.result()
+            except Exception as e:
+                failed += 1
+                line["error"] = str(e)
+            else:
+                line.update(ai_result, cached=cached)
+                assessments.append(Assessment(**_match_assessment(user, job["position"], ai_result)))
+            yield json.dumps(line) + "\n"
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+        if assessments:
+            Assessment.objects.bulk_create(assessments)
+
+    yield json.dumps({"done": True, "count": len(assessments), "failed": failed}) + "\n"
+
+
+def _batch_match(cv_text, job_description, position, refresh, exact):
+    try:
+        return cached_job_match(cv_text, job_description, position, refresh, exact)
+    finally:
+        # Pool threads are discarded after the batch; don't leak their connections.
+        connection.close()
+
+
+def run_match(user, cv_text, job_description, position, refresh=False, exact=False):
+    """Analyze a CV against a job and record it in the user's history.
+
+    Returns ``(ai_result, cached)``; cache hits are recorded in the history too.
+    ``exact`` disables reusing reports cached for near-identical CVs.
+    """
+    ai_result, cached = cached_job_match(cv_text, job_description, position, refresh, exact)
+    Assessment.objects.create(**_match_assessment(user, position, ai_result))
+    return ai_result, cached
+
+
+def _match_assessment(user, position, ai_result):
+    # Save to assessment history as a 'match' record (excluded from quiz dashboard)
+    return dict(
+        user=user,
+        kind="match",
+        position=position,
+        average_score=ai_result.get("match_score", 0) or 0,
+        # Keep original matcher payload shape; quiz UI won't consume these entries
+        skills_analyzed={
+            "missing_keywords": ai_result.get("missing_keywords", []),
+            "summary": ai_result.get("summary", ""),
+        },
+    )
+
+
+def _visible_cvs(user):
+    """Stored CVs ``user`` may match against: all of them for staff, else their own."""
+    return CV.objects.all() if user.is_staff else CV.objects.filter(user=user)
+
+
+@job_handler("match")
+def _match_job(job):
+    payload = job.payload
+    if payload.get("cv_id") is not None:
+        cv_text = stored_cv_text(CV.objects.get(pk=payload["cv_id"]))
+    else:
+        cv_text = extract_text_from_pdf(job.upload)
+    ai_result, _ = run_match(
+        job.user,
+        cv_text,
+        payload["job_description"],
+        payload["position"],
+        payload.get("refresh", False),
+        payload.get("exact", False),
+    )
+    return ai_result